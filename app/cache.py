@@ -0,0 +1,239 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+@dataclass
+class _Entry:
+    value: dict
+    slot: int
+    created_at: float
+
+
+class SemanticCache:
+    """A cache of chat responses keyed by the meaning of the query.
+
+    A query is looked up by its normalised text first, which costs neither an
+    embedding nor an LLM call. Failing that, the query is embedded and compared
+    against the embeddings of the cached queries, returning the cached response of
+    the most similar query if its cosine similarity is above the threshold.
+
+    Entries are evicted in least recently used order once ``max_entries`` is reached
+    and expire after ``ttl_seconds``. The embeddings live in a matrix preallocated
+    for ``max_entries`` rows, so the memory of the cache is bounded. The whole cache
+    is invalidated whenever the ``version_file`` written by the indexing pipeline
+    changes, since the cached responses may no longer reflect the collection.
+    """
+
+    def __init__(
+        self,
+        embedding_model: Embeddings,
+        similarity_threshold: float,
+        max_entries: int,
+        ttl_seconds: float,
+        version_file: str | None = None,
+    ):
+        self.embedding_model = embedding_model
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_file = version_file
+
+        self._lock = threading.RLock()
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._keys: list[str | None] = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self._matrix: np.ndarray | None = None
+        self._valid = np.zeros(max_entries, dtype=bool)
+        self._created_at = np.zeros(max_entries, dtype=np.float64)
+        self._version = self._read_version()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """
+        Normalises a query for the exact match lookup.
+
+        Args:
+            query (str): The query string.
+
+        Returns:
+            str: The lowercased query with whitespace collapsed.
+        """
+        return " ".join(query.lower().split())
+
+    @staticmethod
+    def unit(embedding: list[float]) -> np.ndarray:
+        """
+        Normalises an embedding to unit length for the similarity lookup.
+
+        Args:
+            embedding (list[float]): The embedding of the query.
+
+        Returns:
+            np.ndarray: The embedding scaled to unit length.
+        """
+        embedding = np.asarray(embedding, dtype=np.float32)
+        return embedding / np.linalg.norm(embedding)
+
+    def _read_version(self) -> int | None:
+        if self.version_file is None:
+            return None
+        try:
+            return os.stat(self.version_file).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _check_version(self) -> None:
+        version = self._read_version()
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+
+    def _evict(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self._keys[entry.slot] = None
+        self._valid[entry.slot] = False
+        self._free_slots.append(entry.slot)
+
+    def _expired(self, entry: _Entry) -> bool:
+        return time.monotonic() - entry.created_at > self.ttl_seconds
+
+    def _hit(self, key: str) -> dict | None:
+        entry = self._entries[key]
+        if self._expired(entry):
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def lookup_exact(self, query: str) -> dict | None:
+        """
+        Looks up a query by its normalised text.
+
+        Args:
+            query (str): The query string.
+
+        Returns:
+            dict | None: The cached response, or None if the query is not cached.
+        """
+        key = self.normalize(query)
+        with self._lock:
+            self._check_version()
+            if key in self._entries:
+                value = self._hit(key)
+                if value is not None:
+                    self.exact_hits += 1
+                    return value
+        return None
+
+    def lookup_similar(self, embedding: np.ndarray) -> dict | None:
+        """
+        Looks up the cached query most similar to the given query embedding.
+
+        Args:
+            embedding (np.ndarray): The normalised embedding of the query.
+
+        Returns:
+            dict | None: The cached response, or None if no cached query is similar enough.
+        """
+        with self._lock:
+            # Expired entries are masked out too, so they never hide a valid entry
+            fresh = time.monotonic() - self._created_at <= self.ttl_seconds
+            live = self._valid & fresh
+            if self._matrix is not None and live.any():
+                similarities = self._matrix @ embedding
+                similarities[~live] = -np.inf
+                slot = int(np.argmax(similarities))
+
+                if similarities[slot] >= self.similarity_threshold:
+                    value = self._hit(self._keys[slot])
+                    if value is not None:
+                        self.semantic_hits += 1
+                        return value
+
+            self.misses += 1
+        return None
+
+    async def alookup(self, query: str) -> tuple[dict | None, np.ndarray | None]:
+        """
+        Looks up a query, first by its normalised text and then by its meaning.
+
+        Args:
+            query (str): The query string.
+
+        Returns:
+            tuple[dict | None, np.ndarray | None]: A tuple containing two elements:
+                - The cached response, or None on a cache miss.
+                - The normalised embedding of the query, or None if it was not needed.
+                  Pass it on to ``update`` to avoid embedding the query twice.
+        """
+        value = self.lookup_exact(query)
+        if value is not None:
+            return value, None
+
+        embedding = self.unit(await self.embedding_model.aembed_query(query))
+
+        return self.lookup_similar(embedding), embedding
+
+    def update(self, query: str, embedding: np.ndarray, value: dict) -> None:
+        """
+        Caches the response to a query.
+
+        Args:
+            query (str): The query string.
+            embedding (np.ndarray): The normalised embedding of the query.
+            value (dict): The response to cache.
+        """
+        key = self.normalize(query)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            elif not self._free_slots:
+                self._evict(next(iter(self._entries)))
+
+            if self._matrix is None:
+                self._matrix = np.zeros(
+                    (self.max_entries, embedding.shape[0]), dtype=np.float32
+                )
+
+            slot = self._free_slots.pop()
+            created_at = time.monotonic()
+            self._matrix[slot] = embedding
+            self._valid[slot] = True
+            self._created_at[slot] = created_at
+            self._keys[slot] = key
+            self._entries[key] = _Entry(value, slot, created_at)
+
+    def invalidate(self) -> None:
+        """Evicts every entry from the cache."""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def stats(self) -> dict:
+        """
+        Gets the hit and miss counters of the cache.
+
+        Returns:
+            dict: A dictionary containing the size of the cache and its counters.
+        """
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": (self.exact_hits + self.semantic_hits) / lookups
+            if lookups
+            else 0.0,
+        }
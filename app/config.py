@@ -1,69 +1,24 @@
+import asyncio
 import os
+import threading
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
 
-import chromadb
-from chromadb.config import Settings
+from fastapi import Depends
 from kedro.config import OmegaConfigLoader
 from kedro.framework.project import settings
-from langchain.callbacks.streaming_stdout import StreamingStdOutCallbackHandler
 from langchain.chains import RetrievalQA
-from langchain.evaluation import load_evaluator
 from langchain.prompts import PromptTemplate
-from langchain_anthropic import ChatAnthropic
 from langchain_community.vectorstores import Chroma
 from langchain_openai.chat_models import ChatOpenAI
 from langchain_openai.embeddings import OpenAIEmbeddings
 
-conf_path = str(str(Path(os.getcwd()) / settings.CONF_SOURCE))
-conf_loader = OmegaConfigLoader(conf_source=conf_path)
-credentials = conf_loader["credentials"]
-
-# Load the OpenAI API key
-OPENAI_API_KEY = credentials["OPENAI_API_KEY"]
-ANTHROPIC_API_KEY = credentials["ANTHROPIC_API_KEY"]
-
-# Load the configurations required for the embedding model and LLM
-embedding_model_name = conf_loader["parameters"]["embedding_model_name"]
-model_name = conf_loader["parameters"]["model_name"]
-temperature = conf_loader["parameters"]["temperature"]
-max_tokens = conf_loader["parameters"]["max_tokens"]
-
-# Load configurations required for evaluation model
-eval_model = conf_loader["parameters"]["eval_model"]
-eval_model_name = conf_loader["parameters"]["eval_model_name"][eval_model]
-criterion = conf_loader["parameters"]["criterion"]
-labelled_criterion = conf_loader["parameters"]["labelled_criterion"]
-
-# Specify path to vector store
-persist_directory = conf_loader["parameters"]["vector_db"]["path"]
-
-# Specify collection name
-collection_name = conf_loader["parameters"]["vector_db"]["collection_name"]
-
-client = chromadb.Client(
-    Settings(
-        is_persistent=True,
-        persist_directory=persist_directory,
-    )
-)
-
-embedding_model = OpenAIEmbeddings(
-    model=embedding_model_name, openai_api_key=OPENAI_API_KEY
-)
-store = Chroma(
-    client=client,
-    collection_name=collection_name,
-    embedding_function=embedding_model,
-)
-
-llm = ChatOpenAI(
-    streaming=True,
-    callbacks=[StreamingStdOutCallbackHandler()],
-    model_name=model_name,
-    temperature=temperature,
-    openai_api_key=OPENAI_API_KEY,
-    max_tokens=max_tokens,
-)
+from app.cache import SemanticCache
+from app.retrieval import AsyncVectorStoreRetriever, IndexRetriever
+from app.vector_index import INDEXES, SnapshotIndex
+from healthcare_chatbot.embeddings import CachedEmbeddings
+from healthcare_chatbot.snapshots import SnapshotReader
 
 template = """
 You are a helpful conversational chatbot. Your goal is to provide accurate and helpful information about healthcare.
@@ -84,42 +39,327 @@ Question: {question}
 
 PROMPT = PromptTemplate(template=template, input_variables=["context", "question"])
 
-qa = RetrievalQA.from_chain_type(
-    llm=llm,
-    chain_type="stuff",
-    retriever=store.as_retriever(
-        search_type="mmr", search_kwargs={"k": 3, "fetch_k": 20, "lambda_mult": 0.5}
-    ),
-    chain_type_kwargs={"prompt": PROMPT},
-    return_source_documents=True,
-)
-
-if eval_model == "openai":
-    evaluation_llm = ChatOpenAI(
-        model_name=eval_model_name,
-        temperature=temperature,
-        openai_api_key=OPENAI_API_KEY,
-    )
-elif eval_model == "anthropic":
-    evaluation_llm = ChatAnthropic(
-        model_name=eval_model_name,
-        temperature=temperature,
-        anthropic_api_key=ANTHROPIC_API_KEY,
-    )
-
-# Create criterion evaluators
-criterion_evaluators = {
-    criteria: load_evaluator("criteria", criteria=criteria, llm=evaluation_llm)
-    for criteria in criterion
-}
-
-# Create labelled criterion evaluators
-labelled_criterion_evaluators = {
-    labelled_criteria: load_evaluator(
-        "labeled_criteria",
-        criteria=labelled_criteria,
-        llm=evaluation_llm,
-        requires_reference=True,
-    )
-    for labelled_criteria in labelled_criterion
-}
+
+class lazy_component:
+    """Decorates a method of ``Components`` to build its component on first access.
+
+    The component is built at most once, even when it is first accessed from several
+    threads at the same time (e.g. a request and the background warm-up), and then
+    cached on the instance.
+    """
+
+    def __init__(self, factory: Callable[["Components"], Any]):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, instance: "Components | None", owner: type) -> Any:
+        if instance is None:
+            return self
+
+        with instance._locks_lock:
+            lock = instance._locks.setdefault(self.name, threading.Lock())
+
+        with lock:
+            # Components are cached in the instance dictionary, which takes
+            # precedence over this (non-data) descriptor from then on
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.factory(instance)
+
+        return instance.__dict__[self.name]
+
+
+class Components:
+    """The components of the application, each built lazily on first use.
+
+    Nothing is built when the application is imported. A worker only pays for the
+    components its endpoints actually use, e.g. a worker which only serves /chat never
+    builds the evaluators. Components can also be built ahead of the first request in
+    a background thread with ``warm_up``.
+    """
+
+    def __init__(self, project_path: str | None = None):
+        self.project_path = Path(project_path or os.getcwd())
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    @lazy_component
+    def conf_loader(self) -> OmegaConfigLoader:
+        conf_path = str(self.project_path / settings.CONF_SOURCE)
+        return OmegaConfigLoader(conf_source=conf_path)
+
+    @lazy_component
+    def parameters(self) -> dict:
+        return self.conf_loader["parameters"]
+
+    @lazy_component
+    def credentials(self) -> dict:
+        return self.conf_loader["credentials"]
+
+    @lazy_component
+    def client(self):
+        # Imported here so the application starts without loading chromadb
+        import chromadb  # noqa: PLC0415
+        from chromadb.config import Settings  # noqa: PLC0415
+
+        return chromadb.Client(
+            Settings(
+                is_persistent=True,
+                persist_directory=self.parameters["vector_db"]["path"],
+            )
+        )
+
+    @lazy_component
+    def embedding_model(self) -> CachedEmbeddings:
+        embedding_model_name = self.parameters["embedding_model_name"]
+        embedding_cache_params = self.parameters["embedding_cache"]
+
+        return CachedEmbeddings(
+            OpenAIEmbeddings(
+                model=embedding_model_name,
+                openai_api_key=self.credentials["OPENAI_API_KEY"],
+            ),
+            namespace=embedding_model_name,
+            max_entries=embedding_cache_params["max_entries"],
+            path=embedding_cache_params["path"],
+        )
+
+    @lazy_component
+    def store(self) -> Chroma:
+        return Chroma(
+            client=self.client,
+            collection_name=self.parameters["vector_db"]["collection_name"],
+            embedding_function=self.embedding_model,
+        )
+
+    @lazy_component
+    def response_cache(self) -> SemanticCache | None:
+        response_cache_params = self.parameters["response_cache"]
+        if not response_cache_params["enabled"]:
+            return None
+
+        return SemanticCache(
+            embedding_model=self.embedding_model,
+            similarity_threshold=response_cache_params["similarity_threshold"],
+            max_entries=response_cache_params["max_entries"],
+            ttl_seconds=response_cache_params["ttl_seconds"],
+            version_file=self.parameters["vector_db"]["version_file"],
+        )
+
+    @lazy_component
+    def llm(self) -> ChatOpenAI:
+        # Tokens are streamed to the callbacks passed in per request (see the
+        # /chat/stream endpoint) rather than to a shared handler on the model
+        return ChatOpenAI(
+            streaming=True,
+            model_name=self.parameters["model_name"],
+            temperature=self.parameters["temperature"],
+            openai_api_key=self.credentials["OPENAI_API_KEY"],
+            max_tokens=self.parameters["max_tokens"],
+        )
+
+    @lazy_component
+    def retriever(self) -> AsyncVectorStoreRetriever | IndexRetriever:
+        retriever_params = self.parameters["serving"]["retriever"]
+        backend = retriever_params["backend"]
+        search_kwargs = {"k": 3, "fetch_k": 20, "lambda_mult": 0.5}
+
+        if backend == "chroma":
+            return AsyncVectorStoreRetriever(
+                vectorstore=self.store,
+                collection=self.client.get_or_create_collection(
+                    self.parameters["vector_db"]["collection_name"]
+                ),
+                search_type="mmr",
+                search_kwargs=search_kwargs,
+            )
+
+        engine = retriever_params["engine"]
+        engine_kwargs = retriever_params.get(engine) or {}
+
+        # Search the read-only snapshot shared by all the workers, which never
+        # opens the vector database (see the `vector_db.snapshot_dir` parameter)
+        if backend == "snapshot":
+            # Builds the index of the current snapshot, so the retriever fails as
+            # soon as it is built, e.g. on warm-up, if no snapshot was exported yet
+            index = SnapshotIndex(
+                SnapshotReader(self.parameters["vector_db"]["snapshot_dir"]),
+                engine,
+                **engine_kwargs,
+            )
+        # Load the collection into this worker's memory once
+        elif backend == "memory":
+            collection = self.client.get_collection(
+                self.parameters["vector_db"]["collection_name"]
+            )
+            loaded = INDEXES[engine].from_collection(collection, **engine_kwargs)
+
+            def index():
+                return loaded
+
+        else:
+            raise ValueError(f"Unknown retriever backend: {backend}")
+
+        return IndexRetriever(
+            index=index,
+            embeddings=self.embedding_model,
+            search_type="mmr",
+            search_kwargs=search_kwargs,
+        )
+
+    @lazy_component
+    def qa(self) -> RetrievalQA:
+        return RetrievalQA.from_chain_type(
+            llm=self.llm,
+            chain_type="stuff",
+            retriever=self.retriever,
+            chain_type_kwargs={"prompt": PROMPT},
+            return_source_documents=True,
+        )
+
+    @lazy_component
+    def chat_limiter(self) -> asyncio.Semaphore:
+        # Caps the number of chat requests in-flight against the LLM at once, any
+        # request over the limit waits for a slot instead of piling onto upstream
+        return asyncio.Semaphore(self.parameters["serving"]["max_concurrency"])
+
+    @lazy_component
+    def batch_parallelism(self) -> int:
+        return self.parameters["serving"]["batch_parallelism"]
+
+    @lazy_component
+    def evaluation_llm(self):
+        eval_model = self.parameters["eval_model"]
+        eval_model_name = self.parameters["eval_model_name"][eval_model]
+        temperature = self.parameters["temperature"]
+
+        if eval_model == "openai":
+            return ChatOpenAI(
+                model_name=eval_model_name,
+                temperature=temperature,
+                openai_api_key=self.credentials["OPENAI_API_KEY"],
+            )
+        elif eval_model == "anthropic":
+            # Imported here so a worker evaluating with OpenAI never loads it
+            from langchain_anthropic import ChatAnthropic  # noqa: PLC0415
+
+            return ChatAnthropic(
+                model_name=eval_model_name,
+                temperature=temperature,
+                anthropic_api_key=self.credentials["ANTHROPIC_API_KEY"],
+            )
+
+    @lazy_component
+    def criterion_evaluators(self) -> dict:
+        # Imported here so a worker which only serves /chat never loads the
+        # evaluation chains
+        from langchain.evaluation import load_evaluator  # noqa: PLC0415
+
+        return {
+            criteria: load_evaluator(
+                "criteria", criteria=criteria, llm=self.evaluation_llm
+            )
+            for criteria in self.parameters["criterion"]
+        }
+
+    @lazy_component
+    def labelled_criterion_evaluators(self) -> dict:
+        # Imported here for the same reason as in `criterion_evaluators`
+        from langchain.evaluation import load_evaluator  # noqa: PLC0415
+
+        return {
+            labelled_criteria: load_evaluator(
+                "labeled_criteria",
+                criteria=labelled_criteria,
+                llm=self.evaluation_llm,
+                requires_reference=True,
+            )
+            for labelled_criteria in self.parameters["labelled_criterion"]
+        }
+
+    @lazy_component
+    def eval_timeout(self) -> float:
+        return self.parameters["eval_timeout"]
+
+    def warm_up(self, names: list[str] | None = None) -> None:
+        """
+        Builds components ahead of their first use.
+
+        Args:
+            names (list[str] | None): The names of the components to build, or None to
+                build those listed under ``serving.warm_up`` in the parameters. Defaults to None.
+        """
+        if names is None:
+            names = self.parameters["serving"]["warm_up"]
+
+        _check_names(names)
+        for name in names:
+            getattr(self, name)
+
+
+def _check_names(names: list[str] | tuple[str, ...]) -> None:
+    """
+    Checks that the names are the names of components.
+
+    Args:
+        names (list[str] | tuple[str, ...]): The names of the components.
+
+    Raises:
+        ValueError: If any of the names is not the name of a component.
+    """
+    unknown = [
+        name
+        for name in names
+        if not isinstance(vars(Components).get(name), lazy_component)
+    ]
+    if unknown:
+        available = sorted(
+            name
+            for name, value in vars(Components).items()
+            if isinstance(value, lazy_component)
+        )
+        raise ValueError(
+            f"Unknown components: {', '.join(unknown)}. "
+            f"The components are: {', '.join(available)}."
+        )
+
+
+components = Components()
+
+
+def get_components() -> Components:
+    """
+    Gets the components of the application. Override this dependency to swap the
+    components out, e.g. for fakes in tests and benchmarks.
+
+    Returns:
+        Components: The components of the application.
+    """
+    return components
+
+
+def require(*names: str) -> Callable[[Components], Components]:
+    """
+    Creates a dependency which builds the named components before the endpoint runs.
+
+    The dependency is a plain function, so FastAPI runs it in its threadpool and the
+    first request to need a component builds it without blocking the event loop.
+
+    Args:
+        *names (str): The names of the components the endpoint uses.
+
+    Returns:
+        Callable[[Components], Components]: The dependency, which returns the components.
+
+    Raises:
+        ValueError: If any of the names is not the name of a component, so a typo fails
+            when the application is imported rather than on the first request.
+    """
+    _check_names(names)
+
+    def dependency(components: Components = Depends(get_components)) -> Components:
+        for name in names:
+            getattr(components, name)
+        return components
+
+    return dependency
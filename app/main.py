@@ -1,12 +1,71 @@
 # https://github.com/jina-ai/langchain-serve
 
-from fastapi import FastAPI, status
+import asyncio
+import json
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+from fastapi import Depends, FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from langchain.callbacks.streaming_aiter import AsyncIteratorCallbackHandler
+
+from app.cache import SemanticCache
+from app.config import Components, get_components, require
+from app.schemas import BatchEvalMessage, BatchMessage, EvalMessage, Message
+
+if TYPE_CHECKING:
+    from langchain.evaluation import StringEvaluator
+
+logger = logging.getLogger(__name__)
+
+# The components used by each group of endpoints
+CHAT_COMPONENTS = ("qa", "response_cache", "chat_limiter")
+BATCH_CHAT_COMPONENTS = (*CHAT_COMPONENTS, "embedding_model", "batch_parallelism")
+EVAL_COMPONENTS = (
+    "criterion_evaluators",
+    "labelled_criterion_evaluators",
+    "eval_timeout",
+)
+BATCH_EVAL_COMPONENTS = (*EVAL_COMPONENTS, "batch_parallelism")
 
-from app.config import criterion_evaluators, labelled_criterion_evaluators, qa
-from app.schemas import EvalMessage, Message
 
-app = FastAPI()
+def _warm_up(components: Components) -> None:
+    """
+    Builds the components listed under ``serving.warm_up`` in the parameters.
+
+    Args:
+        components (Components): The components of the application.
+    """
+    start = time.perf_counter()
+    try:
+        components.warm_up()
+    except Exception:
+        # The components are built again on first use, which surfaces the error
+        logger.exception("Failed to warm up the components.")
+        return
+    logger.info(f"Warmed up the components in {time.perf_counter() - start:.2f}s.")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Starts warming up the components in the background, so the application accepts
+    requests straight away instead of once everything is built.
+
+    Args:
+        app (FastAPI): The application.
+    """
+    components = app.dependency_overrides.get(get_components, get_components)()
+    warm_up = asyncio.create_task(asyncio.to_thread(_warm_up, components))
+    yield
+    warm_up.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -32,12 +91,20 @@ def index() -> dict:
 
 
 @app.post("/chat", status_code=status.HTTP_201_CREATED)
-def ask(question: Message) -> dict:
+async def ask(
+    question: Message, components: Components = Depends(require(*CHAT_COMPONENTS))
+) -> dict:
     """
     Endpoint for asking a question and getting a response.
 
+    The chain is awaited rather than invoked so the retrieval and LLM calls do not
+    hold up a threadpool slot for the whole round-trip. At most ``max_concurrency``
+    requests run the chain at any one time. Repeated or paraphrased questions are
+    answered from the response cache without calling the chain at all.
+
     Args:
         question (Message): The question to be asked.
+        components (Components): The components of the application.
 
     Returns:
         dict: A dictionary containing the query, response, and source documents.
@@ -47,25 +114,352 @@ def ask(question: Message) -> dict:
     """
 
     query = question.query
-    response = qa.invoke(question.query)
+    response_cache = components.response_cache
+
+    if response_cache is not None:
+        cached, embedding = await response_cache.alookup(query)
+        if cached is not None:
+            return {**cached, "query": query}
+
+    async with components.chat_limiter:
+        response = await components.qa.ainvoke(question.query)
     result = response["result"].replace("\n", " ")
     source_documents = response["source_documents"]
     source_documents = [dict(doc) for doc in source_documents]
 
-    return {
+    chat_response = {
         "query": query,
         "response": result,
         "source_documents": source_documents,
     }
 
+    if response_cache is not None:
+        response_cache.update(query, embedding, chat_response)
 
-@app.post("/evaluate")
-def evaluate(eval_message: EvalMessage) -> dict:
+    return chat_response
+
+
+def _sse_event(event: str, data: dict) -> str:
     """
-    Endpoint for evaluating a query and response.
+    Formats a Server-Sent Event.
+
+    Args:
+        event (str): The name of the event.
+        data (dict): The payload of the event, sent as JSON.
+
+    Returns:
+        str: The event in the Server-Sent Events wire format.
+    """
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_chat(query: str, components: Components) -> AsyncIterator[str]:
+    """
+    Streams the response to a query as Server-Sent Events.
+
+    A ``token`` event is sent for every token as the LLM generates it, followed by a
+    final ``sources`` event carrying the full response and the source documents.
+    An ``error`` event is sent instead if the chain fails. A cached response is sent
+    as a single ``token`` event.
+
+    Args:
+        query (str): The query string.
+        components (Components): The components of the application.
+
+    Yields:
+        str: The Server-Sent Events.
+    """
+    response_cache = components.response_cache
+
+    if response_cache is not None:
+        cached, embedding = await response_cache.alookup(query)
+        if cached is not None:
+            yield _sse_event("token", {"token": cached["response"]})
+            yield _sse_event("sources", {**cached, "query": query})
+            return
+
+    handler = AsyncIteratorCallbackHandler()
+
+    async with components.chat_limiter:
+        task = asyncio.create_task(
+            components.qa.ainvoke(query, config={"callbacks": [handler]})
+        )
+        # Stop waiting on tokens if the chain ends without the LLM ever running
+        task.add_done_callback(lambda _: handler.done.set())
+
+        try:
+            async for token in handler.aiter():
+                yield _sse_event("token", {"token": token})
+
+            response = await task
+        except Exception as e:
+            yield _sse_event("error", {"detail": str(e)})
+            return
+        finally:
+            # The client may have disconnected mid-stream
+            task.cancel()
+
+    chat_response = {
+        "query": query,
+        "response": response["result"].replace("\n", " "),
+        "source_documents": [dict(doc) for doc in response["source_documents"]],
+    }
+
+    if response_cache is not None:
+        response_cache.update(query, embedding, chat_response)
+
+    yield _sse_event("sources", chat_response)
+
+
+@app.post("/chat/stream")
+async def ask_stream(
+    question: Message, components: Components = Depends(require(*CHAT_COMPONENTS))
+) -> StreamingResponse:
+    """
+    Endpoint for asking a question and streaming the response.
+
+    The tokens are sent to the client as Server-Sent Events as soon as the LLM
+    generates them, so the client sees the time-to-first-token rather than the
+    latency of the full generation.
+
+    Args:
+        question (Message): The question to be asked.
+        components (Components): The components of the application.
+
+    Returns:
+        StreamingResponse: A ``text/event-stream`` response with the events.
+            - token: A dictionary with the ``token`` generated.
+            - sources: A dictionary with the query, response and source documents.
+            - error: A dictionary with the ``detail`` of the error.
+    """
+    return StreamingResponse(
+        _stream_chat(question.query, components), media_type="text/event-stream"
+    )
+
+
+def _ndjson_line(data: dict) -> str:
+    """
+    Formats a line of newline-delimited JSON.
+
+    Args:
+        data (dict): The payload of the line.
+
+    Returns:
+        str: The payload as JSON followed by a newline.
+    """
+    return json.dumps(data) + "\n"
+
+
+async def _answer(
+    index: int,
+    query: str,
+    documents: list,
+    limiter: asyncio.Semaphore,
+    components: Components,
+) -> dict:
+    """
+    Answers a query from documents which have already been retrieved.
+
+    Args:
+        index (int): The position of the query in the batch.
+        query (str): The query string.
+        documents (list[Document]): The documents retrieved for the query.
+        limiter (asyncio.Semaphore): The parallelism cap of the batch.
+        components (Components): The components of the application.
+
+    Returns:
+        dict: A dictionary containing the index, query, response and source documents,
+            or the index, query and ``error`` if the LLM call failed.
+    """
+    try:
+        async with limiter, components.chat_limiter:
+            response = await components.qa.combine_documents_chain.ainvoke(
+                {"input_documents": documents, "question": query}
+            )
+    except Exception as e:
+        return {"index": index, "query": query, "error": str(e)}
+
+    return {
+        "index": index,
+        "query": query,
+        "response": response["output_text"].replace("\n", " "),
+        "source_documents": [dict(doc) for doc in documents],
+    }
+
+
+async def _batch_chat(queries: list[str], components: Components) -> AsyncIterator[str]:
+    """
+    Answers a batch of queries, yielding each answer as soon as it is ready.
+
+    Cached queries are answered straight away. Queries which only differ by case or
+    whitespace are answered once and the answer is sent for each of them. The
+    remaining queries are embedded in a single call to the embedding model and their
+    documents retrieved in a single search before the LLM calls are dispatched
+    concurrently, at most ``batch_parallelism`` at a time.
+
+    Args:
+        queries (list[str]): The query strings.
+        components (Components): The components of the application.
+
+    Yields:
+        str: The answers as newline-delimited JSON, in the order they complete.
+    """
+    response_cache = components.response_cache
+
+    # The queries to answer, keyed by the position of the first of their repeats
+    repeats: dict[int, list[tuple[int, str]]] = {}
+    first_indexes: dict[str, int] = {}
+    for index, query in enumerate(queries):
+        cached = response_cache.lookup_exact(query) if response_cache else None
+        if cached is not None:
+            yield _ndjson_line({**cached, "index": index, "query": query})
+            continue
+
+        first_index = first_indexes.setdefault(SemanticCache.normalize(query), index)
+        repeats.setdefault(first_index, []).append((index, query))
+
+    if not repeats:
+        return
+
+    pending = [(index, queries[index]) for index in repeats]
+    embeddings = await components.embedding_model.aembed_documents(
+        [query for _, query in pending]
+    )
+
+    uncached = []
+    for (index, query), embedding in zip(pending, embeddings):
+        unit_embedding = response_cache.unit(embedding) if response_cache else None
+        cached = (
+            response_cache.lookup_similar(unit_embedding) if response_cache else None
+        )
+        if cached is not None:
+            for repeat_index, repeat_query in repeats[index]:
+                yield _ndjson_line(
+                    {**cached, "index": repeat_index, "query": repeat_query}
+                )
+        else:
+            uncached.append((index, query, embedding, unit_embedding))
+
+    if not uncached:
+        return
+
+    retriever = components.qa.retriever
+    batch_documents = await retriever.abatch_get_relevant_documents_by_vector(
+        [embedding for _, _, embedding, _ in uncached]
+    )
+
+    limiter = asyncio.Semaphore(components.batch_parallelism)
+    unit_embeddings = {
+        index: unit_embedding for index, _, _, unit_embedding in uncached
+    }
+    answers = [
+        _answer(index, query, documents, limiter, components)
+        for (index, query, _, _), documents in zip(uncached, batch_documents)
+    ]
+
+    for answer in asyncio.as_completed(answers):
+        chat_response = await answer
+
+        if response_cache is not None and "error" not in chat_response:
+            response_cache.update(
+                chat_response["query"],
+                unit_embeddings[chat_response["index"]],
+                {key: value for key, value in chat_response.items() if key != "index"},
+            )
+
+        for repeat_index, repeat_query in repeats[chat_response["index"]]:
+            yield _ndjson_line(
+                {**chat_response, "index": repeat_index, "query": repeat_query}
+            )
+
+
+@app.post("/chat/batch")
+async def ask_batch(
+    batch: BatchMessage,
+    components: Components = Depends(require(*BATCH_CHAT_COMPONENTS)),
+) -> StreamingResponse:
+    """
+    Endpoint for asking a batch of questions in one round-trip.
+
+    Args:
+        batch (BatchMessage): The questions to be asked.
+        components (Components): The components of the application.
+
+    Returns:
+        StreamingResponse: A newline-delimited JSON response with one line per question,
+            in the order the answers complete.
+            - index (int): The position of the question in the batch.
+            - query (str): The query string.
+            - response (str): The response string.
+            - source_documents (List[dict]): A list of dictionaries representing the source documents.
+            - error (str): The error, in place of the response and source documents, if the question failed.
+    """
+    return StreamingResponse(
+        _batch_chat(batch.queries, components), media_type="application/x-ndjson"
+    )
+
+
+@app.get("/cache/stats", status_code=status.HTTP_200_OK)
+def cache_stats(
+    components: Components = Depends(require("response_cache")),
+) -> dict:
+    """
+    Gets the statistics of the response cache.
+
+    Args:
+        components (Components): The components of the application.
+
+    Returns:
+        dict: A dictionary containing the size of the cache and its hit and miss counters,
+            or an empty dictionary if the cache is disabled.
+    """
+    response_cache = components.response_cache
+    return response_cache.stats() if response_cache is not None else {}
+
+
+async def _evaluate_criteria(
+    criteria: str, evaluator: "StringEvaluator", timeout: float, **kwargs
+) -> tuple[str, dict, float]:
+    """
+    Evaluates a single criteria, giving up after the timeout.
+
+    Args:
+        criteria (str): The name of the criteria.
+        evaluator (StringEvaluator): The evaluator of the criteria.
+        timeout (float): The number of seconds to wait for the evaluation.
+        **kwargs: The strings to evaluate, passed on to ``aevaluate_strings``.
+
+    Returns:
+        tuple[str, dict, float]: A tuple containing three elements:
+            - The name of the criteria.
+            - The evaluation result, or a dictionary with the ``error`` if the evaluation failed.
+            - The number of seconds the evaluation took.
+    """
+    start = time.perf_counter()
+    try:
+        eval_result = await asyncio.wait_for(
+            evaluator.aevaluate_strings(**kwargs), timeout=timeout
+        )
+    except TimeoutError:
+        eval_result = {"error": f"Evaluation timed out after {timeout} seconds."}
+    except Exception as e:
+        eval_result = {"error": str(e)}
+
+    return criteria, eval_result, time.perf_counter() - start
+
+
+async def _evaluate(eval_message: EvalMessage, components: Components) -> dict:
+    """
+    Evaluates a query and response.
+
+    All the criterion and labelled criterion are evaluated concurrently, so the latency
+    is that of the slowest evaluation rather than the sum of them. A criteria that fails
+    or takes longer than ``eval_timeout`` seconds is reported with an ``error`` instead
+    of failing the whole request.
 
     Args:
         eval_message (EvalMessage): The evaluation message containing the query, response, and page content.
+        components (Components): The components of the application.
 
     Returns:
         dict: A dictionary containing the evaluation results.
@@ -74,6 +468,7 @@ def evaluate(eval_message: EvalMessage) -> dict:
             - page_content (str): The page content string.
             - criterion_evaluators (dict): A dictionary mapping criterion names to their evaluation results.
             - labelled_criterion_evaluators (dict): A dictionary mapping labelled criterion names to their evaluation results.
+            - timings (dict): A dictionary mapping the criterion names to the number of seconds their evaluation took.
     """
     eval_results = {
         "query": eval_message.query,
@@ -82,22 +477,105 @@ def evaluate(eval_message: EvalMessage) -> dict:
     }
 
     # Evaluate criterion evaluators
-    for criteria in criterion_evaluators:
-        eval_result = criterion_evaluators[criteria].evaluate_strings(
+    evaluations = [
+        _evaluate_criteria(
+            criteria,
+            evaluator,
+            components.eval_timeout,
             prediction=eval_message.response,
             input=eval_message.query,
         )
-
-        eval_results[criteria] = eval_result
+        for criteria, evaluator in components.criterion_evaluators.items()
+    ]
 
     # Evaluate labelled criterion evaluators
-    for labelled_criteria in labelled_criterion_evaluators:
-        eval_result = labelled_criterion_evaluators[labelled_criteria].evaluate_strings(
+    evaluations += [
+        _evaluate_criteria(
+            labelled_criteria,
+            evaluator,
+            components.eval_timeout,
             prediction=eval_message.response,
             input=eval_message.query,
             reference=eval_message.page_content,
         )
+        for labelled_criteria, evaluator in (
+            components.labelled_criterion_evaluators.items()
+        )
+    ]
 
-        eval_results[labelled_criteria] = eval_result
+    timings = {}
+    for criteria, eval_result, seconds in await asyncio.gather(*evaluations):
+        eval_results[criteria] = eval_result
+        timings[criteria] = seconds
+
+    eval_results["timings"] = timings
 
     return eval_results
+
+
+@app.post("/evaluate")
+async def evaluate(
+    eval_message: EvalMessage,
+    components: Components = Depends(require(*EVAL_COMPONENTS)),
+) -> dict:
+    """
+    Endpoint for evaluating a query and response.
+
+    Args:
+        eval_message (EvalMessage): The evaluation message containing the query, response, and page content.
+        components (Components): The components of the application.
+
+    Returns:
+        dict: A dictionary containing the evaluation results, see ``_evaluate``.
+    """
+    return await _evaluate(eval_message, components)
+
+
+async def _batch_evaluate(
+    messages: list[EvalMessage], components: Components
+) -> AsyncIterator[str]:
+    """
+    Evaluates a batch of query and response pairs, yielding each evaluation as soon as
+    it is ready. At most ``batch_parallelism`` pairs are evaluated at a time.
+
+    Args:
+        messages (list[EvalMessage]): The evaluation messages.
+        components (Components): The components of the application.
+
+    Yields:
+        str: The evaluations as newline-delimited JSON, in the order they complete.
+    """
+    limiter = asyncio.Semaphore(components.batch_parallelism)
+
+    async def _evaluate_one(index: int, eval_message: EvalMessage) -> dict:
+        async with limiter:
+            return {"index": index, **await _evaluate(eval_message, components)}
+
+    evaluations = [
+        _evaluate_one(index, eval_message)
+        for index, eval_message in enumerate(messages)
+    ]
+    for evaluation in asyncio.as_completed(evaluations):
+        yield _ndjson_line(await evaluation)
+
+
+@app.post("/evaluate/batch")
+async def evaluate_batch(
+    batch: BatchEvalMessage,
+    components: Components = Depends(require(*BATCH_EVAL_COMPONENTS)),
+) -> StreamingResponse:
+    """
+    Endpoint for evaluating a batch of queries and responses in one round-trip.
+
+    Args:
+        batch (BatchEvalMessage): The evaluation messages containing the query, response, and page content.
+        components (Components): The components of the application.
+
+    Returns:
+        StreamingResponse: A newline-delimited JSON response with one line per message,
+            in the order the evaluations complete. Each line has the same fields as the
+            response of the ``/evaluate`` endpoint plus the ``index`` of the message in the batch.
+    """
+    return StreamingResponse(
+        _batch_evaluate(batch.messages, components), media_type="application/x-ndjson"
+    )
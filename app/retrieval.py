@@ -0,0 +1,234 @@
+import asyncio
+from collections.abc import Callable
+from typing import TYPE_CHECKING, Any
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.pydantic_v1 import Field
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStoreRetriever
+
+from app.vector_index import VectorIndex, normalize
+from healthcare_chatbot.mmr import batch_maximal_marginal_relevance
+
+if TYPE_CHECKING:
+    from chromadb import Collection
+
+
+def batch_max_marginal_relevance_search(
+    collection: "Collection",
+    embeddings: list[list[float]],
+    k: int = 4,
+    fetch_k: int = 20,
+    lambda_mult: float = 0.5,
+) -> list[list[Document]]:
+    """
+    Runs a maximal marginal relevance search for many query embeddings at once.
+
+    The candidates of all the queries are fetched from the collection in a single
+    query instead of one query per embedding, then re-ranked for all the queries at once.
+
+    Args:
+        collection (Collection): The Chroma collection to search.
+        embeddings (list[list[float]]): The embeddings of the queries.
+        k (int): The number of documents to return per query. Defaults to 4.
+        fetch_k (int): The number of candidates to fetch per query. Defaults to 20.
+        lambda_mult (float): The trade-off between relevance (1) and diversity (0). Defaults to 0.5.
+
+    Returns:
+        list[list[Document]]: The documents selected for each query, in the order of the embeddings.
+    """
+    if not embeddings:
+        return []
+
+    results = collection.query(
+        query_embeddings=embeddings,
+        n_results=fetch_k,
+        include=["metadatas", "documents", "embeddings"],
+    )
+
+    batch_selected = batch_maximal_marginal_relevance(
+        np.asarray(embeddings, dtype=np.float32),
+        np.asarray(results["embeddings"], dtype=np.float32),
+        k=k,
+        lambda_mult=lambda_mult,
+    )
+
+    return [
+        [
+            Document(
+                page_content=results["documents"][i][j],
+                metadata=results["metadatas"][i][j] or {},
+            )
+            for j in selected
+        ]
+        for i, selected in enumerate(batch_selected)
+    ]
+
+
+class AsyncVectorStoreRetriever(VectorStoreRetriever):
+    """A vector store retriever with a non-blocking async path.
+
+    The default async path of a ``VectorStoreRetriever`` runs the whole search,
+    including the network round-trip to embed the query, inside a worker thread.
+    This retriever awaits the embedding model's native async client instead and
+    only hands the (local) vector search over to a worker thread, so no thread is
+    held up while waiting on the embedding provider.
+
+    When given the Chroma collection of the vector store, maximal marginal relevance
+    searches fetch the candidates of many queries from it in a single query.
+    """
+
+    collection: Any = None
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        embedding = await self.vectorstore.embeddings.aembed_query(query)
+
+        if self.search_type == "mmr" and self.collection is not None:
+            batch_docs = await asyncio.to_thread(
+                batch_max_marginal_relevance_search,
+                self.collection,
+                [embedding],
+                **self.search_kwargs,
+            )
+            return batch_docs[0]
+
+        if self.search_type == "mmr":
+            return await asyncio.to_thread(
+                self.vectorstore.max_marginal_relevance_search_by_vector,
+                embedding,
+                **self.search_kwargs,
+            )
+
+        if self.search_type == "similarity":
+            return await asyncio.to_thread(
+                self.vectorstore.similarity_search_by_vector,
+                embedding,
+                **self.search_kwargs,
+            )
+
+        return await super()._aget_relevant_documents(query, run_manager=run_manager)
+
+    async def abatch_get_relevant_documents_by_vector(
+        self, embeddings: list[list[float]]
+    ) -> list[list[Document]]:
+        """
+        Retrieves the relevant documents for many already embedded queries at once.
+
+        Args:
+            embeddings (list[list[float]]): The embeddings of the queries.
+
+        Returns:
+            list[list[Document]]: The relevant documents for each query, in the order of the embeddings.
+        """
+        if self.search_type == "mmr" and self.collection is not None:
+            return await asyncio.to_thread(
+                batch_max_marginal_relevance_search,
+                self.collection,
+                embeddings,
+                **self.search_kwargs,
+            )
+
+        search = (
+            self.vectorstore.max_marginal_relevance_search_by_vector
+            if self.search_type == "mmr"
+            else self.vectorstore.similarity_search_by_vector
+        )
+        return await asyncio.gather(
+            *(
+                asyncio.to_thread(search, embedding, **self.search_kwargs)
+                for embedding in embeddings
+            )
+        )
+
+
+class IndexRetriever(BaseRetriever):
+    """A retriever searching an in-process vector index of the collection.
+
+    The index (see ``app.vector_index``) is either loaded from the collection once, or
+    kept up to date with the latest snapshot shared by all the workers, in which case
+    the workers never open the vector database at all. The candidates are re-ranked
+    with maximal marginal relevance when ``search_type`` is ``"mmr"``.
+    """
+
+    index: Callable[[], VectorIndex]
+    embeddings: Embeddings
+    search_type: str = "similarity"
+    search_kwargs: dict = Field(default_factory=dict)
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def search_by_vector(self, embeddings: list[list[float]]) -> list[list[Document]]:
+        """
+        Searches the index for many query embeddings at once.
+
+        Args:
+            embeddings (list[list[float]]): The embeddings of the queries.
+
+        Returns:
+            list[list[Document]]: The relevant documents for each query, in the order of the embeddings.
+        """
+        index = self.index()
+        if not embeddings or not len(index):
+            return [[] for _ in embeddings]
+
+        k = self.search_kwargs.get("k", 4)
+        n = self.search_kwargs.get("fetch_k", 20) if self.search_type == "mmr" else k
+
+        queries = normalize(embeddings)
+        batch_indices, _ = index.search(queries, min(n, len(index)))
+
+        if self.search_type == "mmr":
+            batch_selected = batch_maximal_marginal_relevance(
+                queries,
+                index.vectors[batch_indices],
+                k=k,
+                lambda_mult=self.search_kwargs.get("lambda_mult", 0.5),
+            )
+            batch_indices = np.take_along_axis(
+                batch_indices, np.asarray(batch_selected, dtype=np.intp), axis=1
+            )
+
+        return [
+            [
+                Document(
+                    page_content=index.documents[i],
+                    metadata=index.metadatas[i] or {},
+                )
+                for i in indices
+            ]
+            for indices in batch_indices
+        ]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        return self.search_by_vector([self.embeddings.embed_query(query)])[0]
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        embedding = await self.embeddings.aembed_query(query)
+        return (await asyncio.to_thread(self.search_by_vector, [embedding]))[0]
+
+    async def abatch_get_relevant_documents_by_vector(
+        self, embeddings: list[list[float]]
+    ) -> list[list[Document]]:
+        """
+        Retrieves the relevant documents for many already embedded queries at once.
+
+        Args:
+            embeddings (list[list[float]]): The embeddings of the queries.
+
+        Returns:
+            list[list[Document]]: The relevant documents for each query, in the order of the embeddings.
+        """
+        return await asyncio.to_thread(self.search_by_vector, embeddings)
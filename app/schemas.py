@@ -10,3 +10,13 @@ class EvalMessage(Message):
     page_content: str = Field(
         description="The page content that makes up the context to the chatbot."
     )
+
+
+class BatchMessage(BaseModel):
+    queries: list[str] = Field(description="The queries to ask the chatbot.")
+
+
+class BatchEvalMessage(BaseModel):
+    messages: list[EvalMessage] = Field(
+        description="The query, response and page content triples to evaluate."
+    )
@@ -0,0 +1,238 @@
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from healthcare_chatbot.snapshots import SnapshotReader, VectorSnapshot
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+
+logger = logging.getLogger(__name__)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Scales vectors to unit length, so their dot product is their cosine similarity.
+
+    Args:
+        vectors (np.ndarray): The vectors, one per row.
+
+    Returns:
+        np.ndarray: A contiguous float32 copy of the vectors scaled to unit length.
+    """
+    vectors = np.array(vectors, dtype=np.float32, order="C", ndmin=2)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+class VectorIndex(ABC):
+    """An in-process index of the chunks of the collection.
+
+    Searches by cosine similarity over the unit length ``vectors``, which are kept
+    alongside the documents and metadata they belong to so the search never goes
+    through the vector database.
+    """
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        documents: list[str],
+        metadatas: list[dict | None],
+    ):
+        """
+        Args:
+            vectors (np.ndarray): The unit length vectors of the chunks, one per row.
+            documents (list[str]): The documents of the chunks, in the order of the vectors.
+            metadatas (list[dict | None]): The metadata of the chunks, in the order of the vectors.
+        """
+        self.vectors = vectors
+        self.documents = documents
+        self.metadatas = metadatas
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    @classmethod
+    def from_collection(cls, collection: "Collection", **kwargs) -> "VectorIndex":
+        """
+        Loads the index from a collection of the vector database.
+
+        Args:
+            collection (Collection): The collection to load.
+            **kwargs: The parameters of the index.
+
+        Returns:
+            VectorIndex: The index.
+        """
+        results = collection.get(include=["embeddings", "documents", "metadatas"])
+        return cls(
+            normalize(results["embeddings"]),
+            results["documents"],
+            results["metadatas"],
+            **kwargs,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: VectorSnapshot, **kwargs) -> "VectorIndex":
+        """
+        Loads the index from a snapshot of the collection, keeping its vectors memory-mapped.
+
+        Args:
+            snapshot (VectorSnapshot): The snapshot to load.
+            **kwargs: The parameters of the index.
+
+        Returns:
+            VectorIndex: The index.
+        """
+        return cls(snapshot.vectors, snapshot.documents, snapshot.metadatas, **kwargs)
+
+    @abstractmethod
+    def search(self, queries: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Searches the index for the chunks most similar to each query.
+
+        Args:
+            queries (np.ndarray): The unit length query embeddings, one per row.
+            n (int): The number of chunks to return per query, at most the size of the index.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: A tuple containing two elements:
+                - The indices of the chunks, one row per query, most similar first.
+                - The cosine similarities of the chunks to the queries.
+        """
+
+
+class ExactIndex(VectorIndex):
+    """An exact search over a contiguous matrix of the vectors.
+
+    The similarities of a whole batch of queries are computed with a single matrix
+    multiplication, and only the top ``n`` of each query are sorted.
+    """
+
+    def search(self, queries: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+        similarities = queries @ self.vectors.T
+
+        indices = np.argpartition(-similarities, n - 1, axis=1)[:, :n]
+        top = np.take_along_axis(similarities, indices, axis=1)
+        order = np.argsort(-top, axis=1)
+
+        return (
+            np.take_along_axis(indices, order, axis=1),
+            np.take_along_axis(top, order, axis=1),
+        )
+
+
+class HnswIndex(VectorIndex):
+    """An approximate search over a hierarchical navigable small world graph.
+
+    Uses the same HNSW library as Chroma, minus its client and SQLite layers. The
+    graph is built when the index is loaded.
+    """
+
+    def __init__(  # noqa: PLR0913 - the parameters of the graph, passed by keyword
+        self,
+        vectors: np.ndarray,
+        documents: list[str],
+        metadatas: list[dict | None],
+        *,
+        M: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        num_threads: int = 1,
+    ):
+        """
+        Args:
+            vectors (np.ndarray): The unit length vectors of the chunks, one per row.
+            documents (list[str]): The documents of the chunks, in the order of the vectors.
+            metadatas (list[dict | None]): The metadata of the chunks, in the order of the vectors.
+            M (int): The number of links per node of the graph. Defaults to 16.
+            ef_construction (int): The size of the candidate list when building the graph. Defaults to 200.
+            ef_search (int): The size of the candidate list when searching the graph,
+                trading recall for speed. Defaults to 64.
+            num_threads (int): The number of threads used to build the graph. Defaults to 1.
+        """
+        super().__init__(vectors, documents, metadatas)
+
+        # Installed alongside chromadb, imported here so the exact index doesn't need it
+        import hnswlib  # noqa: PLC0415
+
+        self._graph = None
+        if len(documents):
+            self._graph = hnswlib.Index(space="ip", dim=vectors.shape[1])
+            self._graph.init_index(
+                max_elements=len(vectors), ef_construction=ef_construction, M=M
+            )
+            self._graph.add_items(
+                vectors, np.arange(len(vectors)), num_threads=num_threads
+            )
+            # Searches use max(ef_search, n) candidates
+            self._graph.set_ef(ef_search)
+
+    def search(self, queries: np.ndarray, n: int) -> tuple[np.ndarray, np.ndarray]:
+        indices, distances = self._graph.knn_query(queries, k=n)
+        # The inner product distance is 1 - the cosine similarity of unit vectors
+        return indices.astype(np.intp), 1 - distances
+
+
+INDEXES: dict[str, type[VectorIndex]] = {"numpy": ExactIndex, "hnsw": HnswIndex}
+
+
+class SnapshotIndex:
+    """Keeps an index of the current snapshot of the collection, rebuilding it whenever
+    the indexing pipeline exports a new snapshot.
+
+    The index of the snapshot current when it is created is built straight away. The
+    index of a newer snapshot is built in a background thread and swapped in once it
+    is ready, so the searches keep using the previous index in the meantime rather
+    than waiting on the build, e.g. of an HNSW graph.
+    """
+
+    def __init__(self, snapshots: SnapshotReader, engine: str = "numpy", **kwargs):
+        """
+        Args:
+            snapshots (SnapshotReader): The reader of the snapshots.
+            engine (str): The engine of the index, see ``INDEXES``. Defaults to "numpy".
+            **kwargs: The parameters of the index.
+        """
+        self.snapshots = snapshots
+        self.index_cls = INDEXES[engine]
+        self.kwargs = kwargs
+
+        self._lock = threading.Lock()
+        self._building: str | None = None
+        self._failed: str | None = None
+        snapshot = snapshots.current()
+        # Swapped as a whole, so the name always matches the index
+        self._current: tuple[str, VectorIndex] = (
+            snapshot.name,
+            self.index_cls.from_snapshot(snapshot, **kwargs),
+        )
+
+    def _build(self, snapshot: VectorSnapshot) -> None:
+        try:
+            index = self.index_cls.from_snapshot(snapshot, **self.kwargs)
+        except Exception:
+            # The searches keep using the previous index until the next snapshot
+            logger.exception(f"Failed to build the index of snapshot {snapshot.name}.")
+            self._failed = snapshot.name
+        else:
+            self._current = (snapshot.name, index)
+            logger.info(f"Swapped to the index of snapshot {snapshot.name}.")
+        finally:
+            with self._lock:
+                self._building = None
+
+    def __call__(self) -> VectorIndex:
+        snapshot = self.snapshots.current()
+        name, index = self._current
+        if snapshot.name not in (name, self._failed):
+            with self._lock:
+                if self._building is None:
+                    self._building = snapshot.name
+                    threading.Thread(
+                        target=self._build, args=(snapshot,), daemon=True
+                    ).start()
+        return index
@@ -0,0 +1,122 @@
+"""Time of building the evaluation report from the evaluations, before and after vectorising it.
+
+Builds the table of scores of synthetic evaluations the way ``generate_barplot`` used
+to, filling an empty DataFrame one cell at a time from the list of evaluations, and
+the way it does now, pivoting the rows of the evaluations dataset, one per criteria
+of each evaluation, into one column of scores per criteria and summarising them with
+``summarise_scores``. The previous way is only timed up to ``--previous-max``
+evaluations, as it slows down with every row. Drawing the figure is left out, as it
+takes the same time however many evaluations there are.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.barplot --evaluations 1000 10000 100000
+"""
+
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from healthcare_chatbot.evaluations import evaluation_rows
+from healthcare_chatbot.pipelines.model_evaluation.nodes import (
+    _criteria_scores,
+    summarise_scores,
+)
+
+CRITERION = ["coherence", "helpfulness"]
+LABELLED_CRITERION = ["correctness", "relevance"]
+# One evaluation in a hundred times out
+TIMEOUT_RATE = 0.01
+
+
+def evaluation(rng: random.Random, i: int) -> dict:
+    def criteria_result() -> dict:
+        if rng.random() < TIMEOUT_RATE:
+            return {"error": "Evaluation timed out after 120 seconds."}
+        score = rng.choice([0, 1])
+        return {
+            "reasoning": "The response answers the query using the context. " * 4,
+            "value": "Y" if score else "N",
+            "score": score,
+        }
+
+    return {
+        "query": f"What is query {i} about?",
+        "response": "Diabetes is a chronic condition. " * 20,
+        "page_content": "Diabetes care tips for the feet. " * 60,
+        **{criteria: criteria_result() for criteria in CRITERION + LABELLED_CRITERION},
+    }
+
+
+def previous_report(evaluations_file: list[dict]) -> pd.DataFrame:
+    # The table generate_barplot used to build before plotting the means
+    eval_df = pd.DataFrame(
+        columns=[
+            "queries",
+            "responses",
+            "page_contents",
+            *CRITERION,
+            *LABELLED_CRITERION,
+        ]
+    )
+
+    for i, eval in enumerate(evaluations_file):
+        eval_df.at[i, "queries"] = eval["query"]
+        eval_df.at[i, "responses"] = eval["response"]
+        eval_df.at[i, "page_contents"] = eval["page_content"]
+
+        for criteria in CRITERION:
+            eval_df.at[i, criteria] = eval[criteria].get("score")
+
+        for labelled_criteria in LABELLED_CRITERION:
+            eval_df.at[i, labelled_criteria] = eval[labelled_criteria].get("score")
+
+    eval_df[[*CRITERION, *LABELLED_CRITERION]] = eval_df[
+        [*CRITERION, *LABELLED_CRITERION]
+    ].astype(float)
+
+    return eval_df[[*CRITERION, *LABELLED_CRITERION]].describe().T
+
+
+def report(evaluations_df: pd.DataFrame) -> pd.DataFrame:
+    scores_df = _criteria_scores(evaluations_df, CRITERION + LABELLED_CRITERION)
+    return summarise_scores(scores_df)
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(0)
+    evaluations = [evaluation(rng, i) for i in range(max(args.evaluations))]
+    # As loaded from the evaluations dataset, with a row per criteria
+    evaluations_df = evaluation_rows(
+        {str(i): evaluation for i, evaluation in enumerate(evaluations)}
+    )
+    rows_per_evaluation = len(CRITERION + LABELLED_CRITERION)
+
+    print(f"{'evaluations':>12} {'previous (s)':>13} {'vectorised (s)':>15}")
+    for n in args.evaluations:
+        if n <= args.previous_max:
+            start = time.perf_counter()
+            previous = previous_report(evaluations[:n])
+            previous_seconds = f"{time.perf_counter() - start:>13.3f}"
+        else:
+            previous, previous_seconds = None, f"{'-':>13}"
+
+        start = time.perf_counter()
+        summary = report(evaluations_df.iloc[: n * rows_per_evaluation])
+        seconds = time.perf_counter() - start
+
+        if previous is not None:
+            pd.testing.assert_series_equal(
+                previous["mean"], summary["mean"], check_names=False
+            )
+        print(f"{n:>12} {previous_seconds} {seconds:>15.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--evaluations", type=int, nargs="+", default=[1000, 10000, 100000]
+    )
+    parser.add_argument("--previous-max", type=int, default=10000)
+    main(parser.parse_args())
@@ -0,0 +1,112 @@
+"""Throughput of embedding chunks against a rate limited embedding endpoint.
+
+Embeds synthetic chunks through a local embedding endpoint (see ``fakes.py``) which
+rate limits the requests over a token budget per second, first the way the pipeline
+used to, sending the chunks of every upsert batch in one request, and then with the
+``BatchEmbedder`` at different concurrencies. Finally a run is interrupted half way
+and resumed from the embedding cache, reporting how many chunks had to be embedded
+again.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.embedding_batching --chunks 5000 --concurrency 1 4 8
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.fakes import FakeEmbeddingServer, HttpEmbeddings
+from healthcare_chatbot.embeddings import CachedEmbeddings
+from healthcare_chatbot.pipelines.data_processing.embedder import (
+    BatchEmbedder,
+)
+
+SENTENCE = "Check your feet daily for cuts, blisters and swelling. "
+
+
+def main(args: argparse.Namespace) -> None:
+    texts = [f"Chunk {i}. " + SENTENCE * 18 for i in range(args.chunks)]
+
+    with FakeEmbeddingServer(tokens_per_second=args.tokens_per_second) as server:
+        model = HttpEmbeddings(server.url)
+        print(
+            f"Embedding {len(texts)} chunks at {args.tokens_per_second:.0f} tokens/s\n"
+        )
+        print(
+            f"{'approach':>16} {'seconds':>8} {'chunks/s':>9} "
+            f"{'requests':>9} {'429s':>6}"
+        )
+
+        def report(name: str, elapsed: float, requests: int, rate_limited: int):
+            print(
+                f"{name:>16} {elapsed:>8.2f} {len(texts) / elapsed:>9.1f} "
+                f"{requests:>9} {rate_limited:>6}"
+            )
+
+        # One request per upsert batch of 1,000 chunks, as before
+        start = time.perf_counter()
+        try:
+            for i in range(0, len(texts), 1000):
+                model.embed_documents(texts[i : i + 1000])
+            report(
+                "unbatched",
+                time.perf_counter() - start,
+                server.server.requests,
+                server.server.rate_limited,
+            )
+        except httpx.HTTPStatusError as e:
+            print(f"{'unbatched':>16} failed with {e.response.status_code}")
+
+        for concurrency in args.concurrency:
+            time.sleep(1)  # Let the token bucket refill
+            embedder = BatchEmbedder(
+                model, max_concurrency=concurrency, backoff=args.backoff
+            )
+            start = time.perf_counter()
+            embedder.embed_documents(texts)
+            report(
+                f"batched x{concurrency}",
+                time.perf_counter() - start,
+                embedder.requests,
+                embedder.rate_limited,
+            )
+
+        with tempfile.TemporaryDirectory() as tmp:
+
+            def cached_embedder() -> BatchEmbedder:
+                cached = CachedEmbeddings(model, "fake", path=f"{tmp}/cache.db")
+                return BatchEmbedder(cached, backoff=args.backoff)
+
+            time.sleep(1)
+            start = time.perf_counter()
+            interrupted = cached_embedder()
+            try:
+                asyncio.run(
+                    asyncio.wait_for(
+                        interrupted.aembed_documents(texts), args.interrupt_after
+                    )
+                )
+            except TimeoutError:
+                pass
+
+            resumed = cached_embedder()
+            resumed.embed_documents(texts)
+            misses = resumed.underlying.misses
+            print(
+                f"\nInterrupted after {args.interrupt_after}s and resumed, "
+                f"re-embedding {misses} of {len(texts)} chunks "
+                f"in {time.perf_counter() - start:.2f}s in total"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--tokens-per-second", type=float, default=200_000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--backoff", type=float, default=0.2)
+    parser.add_argument("--interrupt-after", type=float, default=2.0)
+    main(parser.parse_args())
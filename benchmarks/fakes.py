@@ -0,0 +1,265 @@
+"""Local stand-ins for the OpenAI models used by the benchmarks.
+
+The fakes mimic the latency profile of the real models without any network access
+or API keys, so benchmark numbers reflect the serving code rather than upstream.
+"""
+
+import asyncio
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import httpx
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class FakeLatencyChatModel(BaseChatModel):
+    """A chat model that answers with a canned response after a fixed delay."""
+
+    response: str = (
+        "Diabetes is a chronic condition where the body cannot regulate blood sugar "
+        "levels properly. Please consult your doctor for personalised advice."
+    )
+    latency: float = 0.5
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-latency-chat-model"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=self.response))]
+        )
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        # Spread the latency over the tokens so streaming clients see them trickle in
+        tokens = self.response.split(" ")
+        for i, token in enumerate(tokens):
+            await asyncio.sleep(self.latency / len(tokens))
+            if run_manager:
+                await run_manager.on_llm_new_token(token if i == 0 else " " + token)
+
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=self.response))]
+        )
+
+
+class FakeLatencyEmbeddings(DeterministicFakeEmbedding):
+    """Deterministic embeddings that take a fixed delay per request."""
+
+    latency: float = 0.05
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await asyncio.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await asyncio.sleep(self.latency)
+        return super().embed_query(text)
+
+
+class _EmbeddingHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        texts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = texts["input"]
+        tokens = sum(len(text) // 4 + 1 for text in texts)
+
+        with server.lock:
+            server.requests += 1
+            # Refill the token bucket for the time passed since the last request
+            now = time.monotonic()
+            server.tokens = min(
+                server.tokens_per_second,
+                server.tokens + (now - server.refilled_at) * server.tokens_per_second,
+            )
+            server.refilled_at = now
+            rate_limited = tokens > server.tokens
+            if rate_limited:
+                server.rate_limited += 1
+            else:
+                server.tokens -= tokens
+
+        if rate_limited:
+            self._send(429, {"error": "rate limited"})
+            return
+
+        time.sleep(server.latency + server.latency_per_token * tokens)
+        data = [{"embedding": [float(len(text)), 1.0]} for text in texts]
+        self._send(200, {"data": data})
+
+    def _send(self, status: int, body: dict):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on the request, e.g. it was interrupted
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeEmbeddingServer:
+    """A local embedding endpoint, serving ``POST /embeddings`` with a fixed latency
+    per request plus a latency per token, which rate limits (429) the requests over
+    a budget of ``tokens_per_second`` estimated tokens."""
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        latency_per_token: float = 1e-6,
+        tokens_per_second: float = 200_000,
+    ):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _EmbeddingHandler)
+        self.server.lock = threading.Lock()
+        self.server.latency = latency
+        self.server.latency_per_token = latency_per_token
+        self.server.tokens_per_second = tokens_per_second
+        self.server.tokens = tokens_per_second
+        self.server.refilled_at = time.monotonic()
+        self.server.requests = 0
+        self.server.rate_limited = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/embeddings"
+
+    def __enter__(self) -> "FakeEmbeddingServer":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _ChatHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        query = query["query"]
+
+        with server.lock:
+            server.requests += 1
+            failed = server.random.random() < server.failure_rate
+            if failed:
+                server.failed += 1
+
+        time.sleep(server.latency)
+        if failed:
+            self._send(503, {"detail": "Service Unavailable"})
+            return
+        self._send(
+            201,
+            {
+                "query": query,
+                "response": FakeLatencyChatModel().response,
+                "source_documents": [
+                    {
+                        "page_content": f"Context for {query}",
+                        "metadata": {"source": "https://www.healthhub.sg"},
+                    }
+                ],
+            },
+        )
+
+    def _send(self, status: int, body: dict):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.end_headers()
+            self.wfile.write(json.dumps(body).encode())
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on the request, e.g. it was interrupted
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ChatServer(ThreadingHTTPServer):
+    # Accept as many pending connections as uvicorn rather than the default of 5,
+    # past which the clients' connections are dropped and retried a second later
+    request_queue_size = 2048
+
+
+class FakeChatServer:
+    """A local chat endpoint, serving ``POST /chat`` like the application with a
+    fixed latency per request, which fails a ``failure_rate`` fraction of the
+    requests with a 503."""
+
+    def __init__(self, latency: float = 0.5, failure_rate: float = 0.0):
+        self.server = _ChatServer(("127.0.0.1", 0), _ChatHandler)
+        self.server.lock = threading.Lock()
+        self.server.random = random.Random(0)
+        self.server.latency = latency
+        self.server.failure_rate = failure_rate
+        self.server.requests = 0
+        self.server.failed = 0
+
+    @property
+    def domain(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self) -> "FakeChatServer":
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpEmbeddings(Embeddings):
+    """Embeddings from an endpoint serving the ``input`` texts of a POST request,
+    such as ``FakeEmbeddingServer``."""
+
+    def __init__(self, url: str):
+        self.url = url
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        response = httpx.post(self.url, json={"input": texts}, timeout=60)
+        response.raise_for_status()
+        return [item["embedding"] for item in response.json()["data"]]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        async with httpx.AsyncClient(timeout=60) as client:
+            response = await client.post(self.url, json={"input": texts})
+        response.raise_for_status()
+        return [item["embedding"] for item in response.json()["data"]]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
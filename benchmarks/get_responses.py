@@ -0,0 +1,78 @@
+"""Wall time of getting the chatbot's responses to the queries, one at a time and concurrently.
+
+Sends the queries to a stand-in ``/chat`` endpoint which takes ``--latency`` seconds
+to answer each one, first one after another with ``requests.post`` as
+``get_responses`` used to, then with ``get_responses``, which sends them concurrently
+and checkpoints every response. Pass ``--failure-rate`` to have a fraction of the
+requests fail with a 503, which the previous loop dropped and ``get_responses``
+retries.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.get_responses --queries 237 --latency 0.2
+"""
+
+import argparse
+import tempfile
+import time
+from http import HTTPStatus
+
+import pandas as pd
+import requests
+
+from benchmarks.fakes import FakeChatServer
+from healthcare_chatbot.pipelines.data_science.nodes import (
+    get_responses,
+)
+
+
+def previous_get_responses(queries: list[str], chat_url: str) -> int:
+    # The loop get_responses used to run, returning the number of responses
+    responses = 0
+    for query in queries:
+        try:
+            response = requests.post(chat_url, json={"query": query})
+            if response.status_code == HTTPStatus.CREATED:
+                responses += 1
+        except Exception:
+            break
+    return responses
+
+
+def main(args: argparse.Namespace) -> None:
+    queries = [f"What is query {i} about?" for i in range(args.queries)]
+
+    print(f"{'client':>12} {'seconds':>8} {'responses':>10}")
+    with FakeChatServer(args.latency, args.failure_rate) as server:
+        start = time.perf_counter()
+        responses = previous_get_responses(queries, server.domain + "/chat")
+        print(f"{'sequential':>12} {time.perf_counter() - start:>8.2f} {responses:>10}")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            responses_df = get_responses(
+                pd.DataFrame({"queries": queries}),
+                None,
+                {"domain": server.domain, "chat_endpoint": "/chat"},
+                {
+                    "checkpoint_path": f"{tmp}/responses.checkpoint.jsonl",
+                    "mode": "http",
+                    "max_concurrency": args.max_concurrency,
+                    "retries": 3,
+                    "backoff": 0.1,
+                    "max_backoff": 1,
+                    "timeout": 120,
+                },
+                None,
+                None,
+            )
+            elapsed = time.perf_counter() - start
+        print(f"{'concurrent':>12} {elapsed:>8.2f} {len(responses_df):>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=237)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    main(parser.parse_args())
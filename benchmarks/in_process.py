@@ -0,0 +1,121 @@
+"""Throughput of evaluating responses through the application's server and in-process.
+
+Runs ``get_evaluations`` over ``--responses`` responses, first against the
+``/evaluate`` endpoint of the application served by uvicorn on a local port, as the
+``model_evaluation`` pipeline does by default, then with the ``in_process`` mode,
+which calls the same endpoint code directly. The evaluators are stand-ins which take
+``--eval-latency`` seconds, so with the default of 0 the numbers only reflect the
+overhead of going through the server: the HTTP round-trip and serializing the page
+content and the evaluation both ways.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.in_process --responses 2000
+"""
+
+import argparse
+import asyncio
+import socket
+import tempfile
+import threading
+import time
+
+import pandas as pd
+import uvicorn
+
+from app import main
+from app.config import Components, get_components
+from healthcare_chatbot.pipelines.model_evaluation.nodes import (
+    get_evaluations,
+)
+
+CRITERION = ["coherence", "helpfulness", "correctness", "relevance"]
+
+
+class FakeLatencyEvaluator:
+    """An evaluator that scores every response 1 after a fixed delay."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def aevaluate_strings(self, **kwargs) -> dict:
+        await asyncio.sleep(self.latency)
+        return {"reasoning": "The response is helpful.", "value": "Y", "score": 1}
+
+
+def build_fake_components(eval_latency: float) -> Components:
+    # Components assigned up front are never built from the configuration
+    components = Components()
+    components.criterion_evaluators = {
+        criteria: FakeLatencyEvaluator(eval_latency) for criteria in CRITERION[:2]
+    }
+    components.labelled_criterion_evaluators = {
+        criteria: FakeLatencyEvaluator(eval_latency) for criteria in CRITERION[2:]
+    }
+    components.eval_timeout = 120
+    return components
+
+
+def serve() -> tuple[uvicorn.Server, str]:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    # Without the lifespan, which would warm up the real components
+    config = uvicorn.Config(
+        main.app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def run(args: argparse.Namespace) -> None:
+    components = build_fake_components(args.eval_latency)
+    main.app.dependency_overrides[get_components] = lambda: components
+    # The in-process handlers look the components up in the application's module
+    main.get_components = lambda: components
+
+    responses_df = pd.DataFrame(
+        {
+            "queries": [f"What is query {i} about?" for i in range(args.responses)],
+            "responses": ["Diabetes is a chronic condition. " * 20] * args.responses,
+            "page_contents": ["Diabetes care tips for the feet. " * 120]
+            * args.responses,
+        }
+    )
+    server, domain = serve()
+
+    print(f"{'mode':>12} {'seconds':>8} {'rows/s':>8}")
+    for mode in ["http", "in_process"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            evaluations = get_evaluations(
+                responses_df,
+                None,
+                {"domain": domain, "eval_endpoint": "/evaluate"},
+                {
+                    "mode": mode,
+                    "checkpoint_path": f"{tmp}/evaluations.checkpoint.jsonl",
+                    "max_concurrency": args.max_concurrency,
+                    "retries": 3,
+                    "backoff": 0.1,
+                    "max_backoff": 1,
+                    "timeout": 300,
+                },
+                None,
+                None,
+            )
+            elapsed = time.perf_counter() - start
+        assert evaluations["key"].nunique() == args.responses
+        print(f"{mode:>12} {elapsed:>8.2f} {args.responses / elapsed:>8.0f}")
+
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=2000)
+    parser.add_argument("--eval-latency", type=float, default=0.0)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    run(parser.parse_args())
@@ -0,0 +1,61 @@
+"""Overhead of creating a nested Kedro session inside a node.
+
+``get_responses`` and ``get_evaluations`` used to create a ``KedroSession`` and load
+its context inside the running node, only to load the responses or evaluations saved
+by the previous runs from the catalog. This times that against loading the same
+dataset as a node input through the ``previous_*`` catalog entries, which is all the
+nodes do now.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.kedro_session --runs 10
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from kedro.framework.session import KedroSession
+from kedro.framework.startup import bootstrap_project
+
+PROJECT_PATH = Path(__file__).resolve().parents[1]
+
+
+def nested_session(dataset_name: str) -> None:
+    # What the nodes used to do on every run
+    with KedroSession.create(project_path=PROJECT_PATH) as session:
+        context = session.load_context()
+        catalog = context.catalog
+    catalog.load(dataset_name)
+
+
+def main(args: argparse.Namespace) -> None:
+    bootstrap_project(PROJECT_PATH)
+    with KedroSession.create(project_path=PROJECT_PATH) as session:
+        catalog = session.load_context().catalog
+
+    print(f"{'dataset':>26} {'nested ms':>10} {'input ms':>9}")
+    for nested_name, input_name in [
+        ("responses_file", "previous_responses_file"),
+        ("evaluations_file", "previous_evaluations_file"),
+    ]:
+        nested, as_input = [], []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            nested_session(nested_name)
+            nested.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            catalog.load(input_name)
+            as_input.append(time.perf_counter() - start)
+
+        print(
+            f"{input_name:>26} {statistics.median(nested) * 1000:>10.1f} "
+            f"{statistics.median(as_input) * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    main(parser.parse_args())
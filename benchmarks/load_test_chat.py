@@ -0,0 +1,199 @@
+"""Load test for the /chat endpoint.
+
+Drives the FastAPI application in-process with a fake local LLM and embedding model
+(see ``benchmarks/fakes.py``) and reports requests per second and latency percentiles
+at different numbers of concurrent clients. With ``--stream`` the /chat/stream
+endpoint is used instead and the time-to-first-token is reported as well.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.load_test_chat --concurrency 1 10 100 --llm-latency 0.5
+    PYTHONPATH=src python -m benchmarks.load_test_chat --concurrency 1 10 100 --stream
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import chromadb
+import httpx
+import uvicorn
+from langchain.chains import RetrievalQA
+from langchain.prompts import PromptTemplate
+from langchain_community.vectorstores import Chroma
+
+from app.config import Components, get_components
+from app.main import app
+from app.retrieval import AsyncVectorStoreRetriever
+from benchmarks.fakes import FakeLatencyChatModel, FakeLatencyEmbeddings
+
+PROMPT = PromptTemplate(
+    template="{context}\n=========\nQuestion: {question}",
+    input_variables=["context", "question"],
+)
+
+
+def build_fake_components(
+    llm_latency: float, embedding_latency: float, max_concurrency: int
+) -> Components:
+    """Builds the components of the application backed by fake local models.
+
+    Args:
+        llm_latency (float): Seconds the fake LLM takes to answer.
+        embedding_latency (float): Seconds the fake embedding model takes per call.
+        max_concurrency (int): The concurrency limit of the chat endpoint.
+
+    Returns:
+        Components: The components, with every component the chat and evaluation
+            endpoints use already built.
+    """
+    embedding_model = FakeLatencyEmbeddings(size=256, latency=embedding_latency)
+    texts = [
+        f"Article {i}: diabetes care tip number {i} about diet, exercise and insulin."
+        for i in range(500)
+    ]
+    client = chromadb.EphemeralClient()
+    store = Chroma.from_texts(
+        texts,
+        embedding_model,
+        metadatas=[{"source": f"article-{i}"} for i in range(len(texts))],
+        collection_name="load-test",
+        client=client,
+    )
+
+    qa = RetrievalQA.from_chain_type(
+        llm=FakeLatencyChatModel(latency=llm_latency),
+        chain_type="stuff",
+        retriever=AsyncVectorStoreRetriever(
+            vectorstore=store,
+            collection=client.get_collection("load-test"),
+            search_type="mmr",
+            search_kwargs={"k": 3, "fetch_k": 20, "lambda_mult": 0.5},
+        ),
+        chain_type_kwargs={"prompt": PROMPT},
+        return_source_documents=True,
+    )
+
+    # Components assigned up front are never built from the configuration
+    components = Components()
+    components.qa = qa
+    components.embedding_model = embedding_model
+    components.chat_limiter = asyncio.Semaphore(max_concurrency)
+    components.batch_parallelism = max_concurrency
+    components.response_cache = None
+    components.criterion_evaluators = {}
+    components.eval_timeout = 120
+    components.labelled_criterion_evaluators = {}
+    return components
+
+
+async def run_level(
+    client: httpx.AsyncClient, concurrency: int, requests: int, stream: bool = False
+) -> dict:
+    """Sends ``requests`` chat requests using ``concurrency`` concurrent clients.
+
+    Args:
+        client (httpx.AsyncClient): The client bound to the application.
+        concurrency (int): The number of concurrent clients.
+        requests (int): The total number of requests to send.
+        stream (bool): Whether to use the streaming endpoint. Defaults to False.
+
+    Returns:
+        dict: The throughput and latency statistics of the run.
+    """
+    latencies = []
+    first_tokens = []
+    remaining = iter(range(requests))
+
+    async def send(i: int) -> None:
+        payload = {"query": f"Question {i}?"}
+        if not stream:
+            response = await client.post("/chat", json=payload)
+            response.raise_for_status()
+            return
+
+        start = time.perf_counter()
+        async with client.stream("POST", "/chat/stream", json=payload) as response:
+            response.raise_for_status()
+            # A stream can only be iterated once, so the same iterator is drained
+            lines = response.aiter_lines()
+            async for line in lines:
+                if line == "event: token":
+                    first_tokens.append(time.perf_counter() - start)
+                    break
+            async for _ in lines:
+                pass
+
+    async def worker():
+        for i in remaining:
+            start = time.perf_counter()
+            await send(i)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        "ttft": statistics.median(first_tokens) if first_tokens else float("nan"),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    components = build_fake_components(
+        args.llm_latency, args.embedding_latency, args.max_concurrency
+    )
+    app.dependency_overrides[get_components] = lambda: components
+
+    # The ASGI transport only returns a response once its whole body is sent, so the
+    # tokens are streamed over a local socket served by uvicorn instead
+    server = None
+    if args.stream:
+        server = uvicorn.Server(
+            uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning")
+        )
+        serving = asyncio.create_task(server.serve())
+        while not server.started:
+            await asyncio.sleep(0.01)
+        port = server.servers[0].sockets[0].getsockname()[1]
+        client = httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=None)
+    else:
+        transport = httpx.ASGITransport(app=app)
+        client = httpx.AsyncClient(
+            transport=transport, base_url="http://test", timeout=None
+        )
+
+    async with client:
+        print(
+            f"{'clients':>8} {'requests':>9} {'req/s':>9} {'p50 (s)':>9} "
+            f"{'p95 (s)':>9} {'ttft (s)':>9}"
+        )
+        for concurrency in args.concurrency:
+            requests = max(args.requests_per_client * concurrency, args.min_requests)
+            stats = await run_level(client, concurrency, requests, args.stream)
+            print(
+                f"{stats['concurrency']:>8} {stats['requests']:>9} {stats['rps']:>9.2f} "
+                f"{stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['ttft']:>9.3f}"
+            )
+
+    if server is not None:
+        server.should_exit = True
+        await serving
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    parser.add_argument("--min-requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--embedding-latency", type=float, default=0.05)
+    parser.add_argument("--max-concurrency", type=int, default=100)
+    parser.add_argument("--stream", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,84 @@
+"""Micro-benchmark of the maximal marginal relevance re-ranking.
+
+Compares LangChain's implementation against ``healthcare_chatbot.mmr``, both one
+query at a time and for a whole batch of queries at once, and checks that they
+select the same candidates.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.mmr --queries 100 --fetch-k 20 --k 3
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+import numpy as np
+from langchain_community.vectorstores.utils import (
+    maximal_marginal_relevance as langchain_maximal_marginal_relevance,
+)
+
+from healthcare_chatbot.mmr import (
+    batch_maximal_marginal_relevance,
+    maximal_marginal_relevance,
+)
+
+
+def best_of(run: Callable[[], list], repeat: int) -> tuple[float, list]:
+    """Runs a function several times.
+
+    Args:
+        run (Callable[[], list]): The function to run.
+        repeat (int): The number of times to run it.
+
+    Returns:
+        tuple[float, list]: The fastest time in seconds and the result of the function.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = run()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+    candidates = rng.normal(size=(args.queries, args.fetch_k, args.dim)).astype(
+        np.float32
+    )
+
+    implementations = {
+        "langchain": lambda: [
+            langchain_maximal_marginal_relevance(q, c, args.lambda_mult, args.k)
+            for q, c in zip(queries, candidates)
+        ],
+        "ours": lambda: [
+            maximal_marginal_relevance(q, c, args.lambda_mult, args.k)
+            for q, c in zip(queries, candidates)
+        ],
+        "ours (batch)": lambda: batch_maximal_marginal_relevance(
+            queries, candidates, args.lambda_mult, args.k
+        ),
+    }
+
+    results = {name: best_of(run, args.repeat) for name, run in implementations.items()}
+    baseline, expected = results["langchain"]
+
+    print(f"{'implementation':>14} {'per query (us)':>15} {'speedup':>8} {'same':>5}")
+    for name, (elapsed, selected) in results.items():
+        print(
+            f"{name:>14} {1e6 * elapsed / args.queries:>15.1f} "
+            f"{baseline / elapsed:>7.1f}x {str(selected == expected):>5}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--lambda-mult", type=float, default=0.5)
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
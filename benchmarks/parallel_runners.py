@@ -0,0 +1,133 @@
+"""Time of the data_processing pipeline under Kedro's sequential, thread and parallel runners.
+
+Runs the pipeline into a fresh persistent Chroma collection with each runner. The
+websites and PDFs are stand-ins which take ``--source-latency`` seconds each to fetch or
+parse, and the embedding model takes ``--embedding-latency`` seconds per request, so the
+two indexing nodes spend most of their time waiting like they do against the real
+websites and the OpenAI API. Every run checks that all the chunks of both nodes made it
+into the collection's vector index.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.parallel_runners --sources 20 --chunks-per-source 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import chromadb
+import langchain_openai
+from kedro.io import DataCatalog
+from kedro.runner import ParallelRunner, SequentialRunner, ThreadRunner
+from langchain_core.documents.base import Document
+
+from benchmarks.fakes import FakeLatencyEmbeddings
+from healthcare_chatbot.datasets import JSONLinesDataset
+from healthcare_chatbot.pipelines.data_processing import (
+    create_pipeline,
+    nodes,
+)
+from healthcare_chatbot.vector_store import VectorStoreDataset
+
+DB_PARAMS = {
+    "path": "db",
+    "collection_name": "healthcare",
+    "version_file": "db/healthcare.version",
+    "registry_path": "db/healthcare.registry.db",
+    "snapshot_dir": "db/snapshots",
+    "snapshots_to_keep": 1,
+}
+
+
+def fake_docs(args: argparse.Namespace, prefix: str):
+    def iter_docs(sources, *_, **__):
+        for i in range(args.sources):
+            source = f"{prefix}-{i}"
+            time.sleep(args.source_latency)
+            yield (
+                source,
+                [
+                    Document(
+                        page_content=f"{source} chunk {j}",
+                        metadata={"source": source},
+                    )
+                    for j in range(args.chunks_per_source)
+                ],
+            )
+
+    return iter_docs
+
+
+def catalog(args: argparse.Namespace) -> DataCatalog:
+    return DataCatalog(
+        datasets={
+            "vector_store": VectorStoreDataset(
+                db_params=DB_PARAMS,
+                embedding_model_name="text-embedding-ada-002",
+                embedding_cache_params={"max_entries": 0, "path": None},
+                embedding_batching_params={"max_texts_per_batch": 32},
+                credentials={"OPENAI_API_KEY": "sk-benchmark"},
+            ),
+            "docs_dict": JSONLinesDataset(filepath="data/websites.jsonl"),
+            "pdfs_dict": JSONLinesDataset(filepath="data/pdfs.jsonl"),
+        },
+        feed_dict={
+            "params:websites": [],
+            "params:fetcher": {"cache_dir": "data/http_cache"},
+            "params:pdfs_dir_path": "data/pdfs",
+            "params:pdf_parsing": {},
+            "params:vector_db": DB_PARAMS,
+            "params:splitter": {
+                "chunk_size": 1000,
+                "chunk_overlap": 100,
+                "separators": ["\n\n", "\n", " ", ""],
+            },
+            "params:ingestion": {"queue_size": 8, "batch_size": 100},
+        },
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    class FakeOpenAIEmbeddings(FakeLatencyEmbeddings):
+        def __init__(self, **_):
+            super().__init__(size=16, latency=args.embedding_latency)
+
+    # Inherited by the forked processes of the ParallelRunner
+    langchain_openai.OpenAIEmbeddings = FakeOpenAIEmbeddings
+    nodes.iter_website_docs = fake_docs(args, "https://site")
+    nodes.iter_pdf_docs = fake_docs(args, "data/pdfs/doc")
+
+    total = 2 * args.sources * args.chunks_per_source
+    print(f"{'runner':>16} {'seconds':>8} {'indexed':>8}")
+    # Two workers, one per indexing node, whatever the number of CPUs
+    for runner in [
+        SequentialRunner(),
+        ThreadRunner(max_workers=2),
+        ParallelRunner(max_workers=2),
+    ]:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            start = time.perf_counter()
+            runner.run(create_pipeline(), catalog(args))
+            elapsed = time.perf_counter() - start
+
+            collection = chromadb.PersistentClient(path="db").get_collection(
+                "healthcare"
+            )
+            indexed = len(
+                collection.query(
+                    query_embeddings=[[0.0] * 16], n_results=total, include=[]
+                )["ids"][0]
+            )
+            chromadb.api.client.SharedSystemClient.clear_system_cache()
+        print(f"{type(runner).__name__:>16} {elapsed:>8.2f} {indexed:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sources", type=int, default=20)
+    parser.add_argument("--chunks-per-source", type=int, default=50)
+    parser.add_argument("--source-latency", type=float, default=0.1)
+    parser.add_argument("--embedding-latency", type=float, default=0.2)
+    main(parser.parse_args())
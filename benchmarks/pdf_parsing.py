@@ -0,0 +1,115 @@
+"""Throughput of parsing and chunking PDFs against the number of worker processes.
+
+Runs ``pdfs_to_docs`` over a directory of PDFs with different numbers of workers and
+reports the pages parsed per second. Without ``--pdfs-dir`` a set of synthetic
+multi-page PDFs is generated in a temporary directory.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.pdf_parsing --workers 1 2 4 8
+    PYTHONPATH=src python -m benchmarks.pdf_parsing --pdfs-dir data/01_raw/pdfs --workers 1 4
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from pypdf import PdfReader
+
+from healthcare_chatbot.pipelines.data_processing.utils import (
+    pdfs_to_docs,
+)
+
+SENTENCE = (
+    "Patients with diabetes should check their feet daily for cuts, blisters and "
+    "swelling, and see a doctor if a wound does not heal within a few days. "
+)
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int = 40) -> None:
+    """Writes a PDF with text on every page, without any PDF library.
+
+    Args:
+        path (str): The path to write the PDF to.
+        pages (int): The number of pages.
+        lines_per_page (int): The number of lines of text per page. Defaults to 40.
+    """
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # The page tree, once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        lines = [
+            f"Page {page + 1}. " + SENTENCE[: 60 + (i * 7) % 60]
+            for i in range(lines_per_page)
+        ]
+        text = " T* ".join(f"({line}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 40 800 Td {text} ET".encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(content)
+    content += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    content += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    content += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        pdfs_dir = args.pdfs_dir or tmp
+        if args.pdfs_dir is None:
+            for i in range(args.pdfs):
+                write_pdf(os.path.join(tmp, f"synthetic-{i}.pdf"), args.pages)
+
+        pdfs_paths = sorted(glob.glob(os.path.join(pdfs_dir, "*.pdf")))
+        pages = sum(len(PdfReader(path).pages) for path in pdfs_paths)
+        print(f"Parsing {len(pdfs_paths)} PDFs with {pages} pages\n")
+
+        print(f"{'workers':>8} {'seconds':>8} {'pages/s':>8} {'chunks':>7}")
+        for workers in args.workers:
+            start = time.perf_counter()
+            all_data_splits, _ = pdfs_to_docs(
+                pdfs_paths,
+                chunk_size=1000,
+                chunk_overlap=100,
+                separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""],
+                workers=workers,
+                chunksize=args.chunksize,
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"{workers:>8} {elapsed:>8.2f} {pages / elapsed:>8.1f} "
+                f"{len(all_data_splits):>7}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs-dir", default=None)
+    parser.add_argument("--pdfs", type=int, default=64)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--chunksize", type=int, default=1)
+    main(parser.parse_args())
@@ -0,0 +1,143 @@
+"""Latency and recall of the retriever backends.
+
+Indexes a synthetic corpus into an in-memory Chroma collection, loads the in-process
+indexes (see ``app/vector_index.py``) from that same collection, and reports the
+per-query search latency and recall@k of each against the exact nearest neighbours.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.retrieval --chunks 5000 --queries 200 --k 20
+"""
+
+import argparse
+import statistics
+import time
+from collections.abc import Callable
+
+import chromadb
+import numpy as np
+
+from app.vector_index import ExactIndex, HnswIndex, normalize
+
+
+def build_collection(vectors: np.ndarray) -> chromadb.Collection:
+    """Adds the vectors to an in-memory Chroma collection.
+
+    Args:
+        vectors (np.ndarray): The vectors of the chunks, one per row.
+
+    Returns:
+        chromadb.Collection: The collection, using the cosine distance.
+    """
+    collection = chromadb.EphemeralClient().create_collection(
+        "retrieval-benchmark", metadata={"hnsw:space": "cosine"}
+    )
+    for i in range(0, len(vectors), 5000):
+        batch = vectors[i : i + 5000]
+        collection.add(
+            ids=[str(j) for j in range(i, i + len(batch))],
+            embeddings=batch.tolist(),
+            documents=[f"Chunk {j}" for j in range(i, i + len(batch))],
+            metadatas=[{"source": f"chunk-{j}"} for j in range(i, i + len(batch))],
+        )
+    return collection
+
+
+def measure(
+    search: Callable[[np.ndarray], np.ndarray], queries: np.ndarray
+) -> tuple[list[float], np.ndarray]:
+    """Searches for each query on its own, as the application does per request.
+
+    Args:
+        search (Callable[[np.ndarray], np.ndarray]): Searches for a single query,
+            returning the indices of the chunks found.
+        queries (np.ndarray): The queries, one per row.
+
+    Returns:
+        tuple[list[float], np.ndarray]: The latency of each query and the indices found.
+    """
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        found.append(search(query[None, :]))
+        latencies.append(time.perf_counter() - start)
+    return latencies, np.vstack(found)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    """Computes the mean fraction of the true nearest neighbours found per query.
+
+    Args:
+        found (np.ndarray): The indices found, one row per query.
+        truth (np.ndarray): The indices of the true nearest neighbours, one row per query.
+
+    Returns:
+        float: The recall@k.
+    """
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = np.random.default_rng(0)
+    # Clustered vectors resemble the embeddings of related chunks better than
+    # uniformly random ones, which are all nearly orthogonal to each other
+    centres = rng.normal(size=(max(args.chunks // 50, 1), args.dim))
+    vectors = normalize(
+        centres[rng.integers(len(centres), size=args.chunks)]
+        + 0.5 * rng.normal(size=(args.chunks, args.dim))
+    )
+    queries = normalize(
+        centres[rng.integers(len(centres), size=args.queries)]
+        + 0.5 * rng.normal(size=(args.queries, args.dim))
+    )
+
+    start = time.perf_counter()
+    collection = build_collection(vectors)
+    elapsed = time.perf_counter() - start
+    print(f"Indexed {args.chunks} chunks into Chroma in {elapsed:.1f}s")
+
+    start = time.perf_counter()
+    exact = ExactIndex.from_collection(collection)
+    print(f"Loaded the numpy index in {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    hnsw = HnswIndex.from_collection(collection, ef_search=args.ef_search)
+    print(f"Loaded the hnsw index in {time.perf_counter() - start:.2f}s\n")
+
+    # Chroma returns the IDs of the chunks, which are their positions in `vectors`
+    # but not necessarily in the indexes loaded from the collection
+    ids = np.array([int(i) for i in collection.get()["ids"]])
+
+    def chroma_search(query: np.ndarray) -> np.ndarray:
+        results = collection.query(query_embeddings=query.tolist(), n_results=args.k)
+        return np.array([[int(i) for i in results["ids"][0]]])
+
+    truth, _ = ExactIndex(vectors, [""] * len(vectors), []).search(queries, args.k)
+
+    engines = {
+        "chroma": chroma_search,
+        "numpy": lambda query: ids[exact.search(query, args.k)[0]],
+        "hnsw": lambda query: ids[hnsw.search(query, args.k)[0]],
+    }
+
+    print(
+        f"{'engine':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'recall@' + str(args.k):>10}"
+    )
+    for name, search in engines.items():
+        latencies, found = measure(search, queries)
+        latencies.sort()
+        print(
+            f"{name:>8} {1000 * statistics.median(latencies):>9.3f} "
+            f"{1000 * latencies[int(0.95 * (len(latencies) - 1))]:>9.3f} "
+            f"{recall(found, truth):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--ef-search", type=int, default=64)
+    main(parser.parse_args())
@@ -0,0 +1,118 @@
+"""Time taken to find the new, changed and removed sources before re-indexing.
+
+Indexes a synthetic corpus of chunks spread over many sources into a persistent Chroma
+collection and records the same sources in a ``SourceRegistry``. Then compares the
+previous approach, which pulled every chunk out of the collection with an unfiltered
+``collection.get()`` to build the set of indexed sources, with looking the input
+sources up in the registry.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.source_registry --chunks 100000 --sources 2000
+"""
+
+import argparse
+import hashlib
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+import numpy as np
+
+from healthcare_chatbot.pipelines.data_processing.registry import (
+    SourceRecord,
+    SourceRegistry,
+)
+
+
+def build(
+    db_dir: str, chunks: int, sources: int, dimensions: int
+) -> tuple[chromadb.Collection, SourceRegistry]:
+    """Indexes the synthetic chunks and registers their sources.
+
+    Args:
+        db_dir (str): The directory to persist the collection and registry in.
+        chunks (int): The number of chunks.
+        sources (int): The number of sources the chunks are spread over.
+        dimensions (int): The dimensions of the embeddings.
+
+    Returns:
+        tuple[chromadb.Collection, SourceRegistry]: The collection and the registry.
+    """
+    collection = chromadb.PersistentClient(path=db_dir).get_or_create_collection(
+        "registry-benchmark"
+    )
+    registry = SourceRegistry(str(Path(db_dir) / "registry.db"))
+
+    rng = np.random.default_rng(0)
+    chunk_ids = {f"source-{i}.pdf": [] for i in range(sources)}
+    for i in range(0, chunks, 5000):
+        ids = [str(j) for j in range(i, min(i + 5000, chunks))]
+        metadatas = [{"source": f"source-{int(j) % sources}.pdf"} for j in ids]
+        collection.add(
+            ids=ids,
+            embeddings=rng.standard_normal((len(ids), dimensions)).tolist(),
+            documents=[f"Chunk {j} " * 40 for j in ids],
+            metadatas=metadatas,
+        )
+        for id, metadata in zip(ids, metadatas):
+            chunk_ids[metadata["source"]].append(id)
+
+    registry.update(
+        [
+            SourceRecord(
+                source,
+                "pdf",
+                hashlib.sha256("".join(ids).encode()).hexdigest(),
+                ids,
+            )
+            for source, ids in chunk_ids.items()
+        ]
+    )
+    return collection, registry
+
+
+def scan_collection(collection: chromadb.Collection, inputs: list[str]) -> set[str]:
+    """The previous approach, reading every chunk to find the indexed sources."""
+    existing = {metadata["source"] for metadata in collection.get()["metadatas"]}
+    return set(inputs) - existing
+
+
+def lookup_registry(registry: SourceRegistry, inputs: list[str]) -> set[str]:
+    """Looks up the input sources, and the registered sources no longer given."""
+    registered = registry.lookup(inputs)
+    removed = set(registry.sources_of_type("pdf")) - set(inputs)
+    return (set(inputs) - registered.keys()) | removed
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"Indexing {args.chunks} chunks from {args.sources} sources\n")
+        collection, registry = build(tmp, args.chunks, args.sources, args.dimensions)
+        inputs = [f"source-{i}.pdf" for i in range(args.sources)]
+
+        print(f"{'approach':>16} {'median ms':>10} {'new or removed':>15}")
+        for name, find in [
+            ("collection scan", lambda: scan_collection(collection, inputs)),
+            ("registry lookup", lambda: lookup_registry(registry, inputs)),
+        ]:
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                changed = find()
+                timings.append(time.perf_counter() - start)
+            print(
+                f"{name:>16} {statistics.median(timings) * 1000:>10.1f} "
+                f"{len(changed):>15}"
+            )
+        registry.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--sources", type=int, default=2000)
+    parser.add_argument("--dimensions", type=int, default=16)
+    parser.add_argument("--runs", type=int, default=5)
+    main(parser.parse_args())
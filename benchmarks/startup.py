@@ -0,0 +1,90 @@
+"""Startup time of the application.
+
+Starts the application with uvicorn in a fresh process and measures the time until
+it first answers a request, then reports the median over several runs. The time to
+import ``app.main`` alone is reported as well.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.startup --runs 5
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+
+def time_import() -> float:
+    """Measures the time to import ``app.main`` in a fresh interpreter.
+
+    Returns:
+        float: The time to import the application in seconds.
+    """
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "import app.main"], check=True)
+    return time.perf_counter() - start
+
+
+def time_first_response(port: int, timeout: float) -> float:
+    """Measures the time from starting the server until it first answers ``GET /``.
+
+    Args:
+        port (int): The port to serve the application on.
+        timeout (float): Seconds to wait for the server before giving up.
+
+    Returns:
+        float: The time to the first response in seconds.
+    """
+    url = f"http://127.0.0.1:{port}/"
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--port",
+            str(port),
+            "--log-level",
+            "warning",
+        ]
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                if httpx.get(url).is_success:
+                    return time.perf_counter() - start
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None:
+                raise RuntimeError("The server exited before answering a request.")
+            time.sleep(0.01)
+        raise TimeoutError(f"The server did not answer within {timeout}s.")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(args: argparse.Namespace) -> None:
+    imports = [time_import() for _ in range(args.runs)]
+    first_responses = [
+        time_first_response(args.port, args.timeout) for _ in range(args.runs)
+    ]
+
+    print(f"{'':>16} {'median (s)':>11} {'min (s)':>9} {'max (s)':>9}")
+    for name, timings in (("import", imports), ("first response", first_responses)):
+        print(
+            f"{name:>16} {statistics.median(timings):>11.3f} "
+            f"{min(timings):>9.3f} {max(timings):>9.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=120)
+    main(parser.parse_args())
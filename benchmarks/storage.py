@@ -0,0 +1,175 @@
+"""Time of saving a run of responses and evaluations, as CSV and JSON files and as partitioned Parquet datasets.
+
+Builds a history of synthetic responses and evaluations, saved by earlier runs, and
+times saving one more run the way the pipelines used to, loading ``responses.csv``
+and ``evaluations.json`` in full and rewriting them with the new run appended, and
+the way they do now, loading only the ``queries`` and ``key`` columns of the
+previous runs and appending the new run to the ``PartitionedParquetDataset`` of the
+responses and of the evaluations. It also times reading the scores of one criteria,
+from the whole ``evaluations.json`` and from the files of that criteria alone.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.storage --history 1000 10000 100000 --run 237
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from healthcare_chatbot.datasets import PartitionedParquetDataset
+from healthcare_chatbot.evaluations import evaluation_key, evaluation_rows
+
+CRITERIA = ["coherence", "helpfulness", "correctness", "relevance"]
+
+
+def response(rng: random.Random, i: int) -> dict:
+    return {
+        "queries": f"What is query {i} about?",
+        "responses": "Diabetes is a chronic condition, ß-cells… " * 20,
+        "page_contents": "Diabetes care tips for the feet. " * 60,
+        "sources": rng.choice(["https://www.healthhub.sg", "data/01_raw/pdfs/a.pdf"]),
+    }
+
+
+def evaluation(rng: random.Random, record: dict) -> dict:
+    return {
+        "query": record["queries"],
+        "response": record["responses"],
+        "page_content": record["page_contents"],
+        **{
+            criteria: {
+                "reasoning": "The response answers the query using the context. " * 4,
+                "value": "Y",
+                "score": rng.choice([0, 1]),
+            }
+            for criteria in CRITERIA
+        },
+        "timings": dict.fromkeys(CRITERIA, 3.2),
+    }
+
+
+def keyed(evaluations: list[dict]) -> dict[str, dict]:
+    return {
+        evaluation_key(e["query"], e["response"], e["page_content"]): e
+        for e in evaluations
+    }
+
+
+def previous_save(directory: Path, responses: list[dict], evaluations: list[dict]):
+    # What get_responses and get_evaluations used to load and save on every run
+    responses_path = directory / "responses.csv"
+    evaluations_path = directory / "evaluations.json"
+    previous_df = pd.read_csv(responses_path, encoding="latin_1")
+    pd.concat([previous_df, pd.DataFrame(responses)], ignore_index=True).to_csv(
+        responses_path, index=False
+    )
+    with open(evaluations_path) as f:
+        previous_evaluations = json.load(f)
+    with open(evaluations_path, "w") as f:
+        json.dump([*previous_evaluations, *evaluations], f)
+
+
+def save(directory: Path, responses: list[dict], evaluations: list[dict]):
+    responses_dataset, evaluations_dataset = datasets(directory)
+    previous_responses = datasets(directory, columns=["queries"])[0].load()
+    previous_evaluations = datasets(directory, columns=["key"])[1].load()
+    assert len(previous_responses) and len(previous_evaluations)
+    responses_dataset.save(
+        pd.DataFrame(responses, dtype="string").assign(run_id=f"{time.time_ns()}")
+    )
+    evaluations_dataset.save(
+        evaluation_rows(keyed(evaluations)).assign(run_id=f"{time.time_ns()}")
+    )
+
+
+def datasets(directory: Path, **load_args) -> list[PartitionedParquetDataset]:
+    return [
+        PartitionedParquetDataset(
+            path=str(directory / "responses"),
+            partition_cols=["run_id"],
+            load_args=load_args,
+        ),
+        PartitionedParquetDataset(
+            path=str(directory / "evaluations"),
+            partition_cols=["criteria", "run_id"],
+            load_args=load_args,
+        ),
+    ]
+
+
+def previous_scores(directory: Path) -> list:
+    with open(directory / "evaluations.json") as f:
+        return [evaluation["relevance"]["score"] for evaluation in json.load(f)]
+
+
+def scores(directory: Path) -> list:
+    dataset = datasets(
+        directory,
+        columns=["score"],
+        filters=[["criteria", "==", "relevance"]],
+    )[1]
+    return dataset.load()["score"].to_list()
+
+
+def timed(function, *args) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(0)
+
+    print(
+        f"{'history':>8} {'previous save (s)':>18} {'parquet save (s)':>17} "
+        f"{'previous read (s)':>18} {'parquet read (s)':>17}"
+    )
+    for history in args.history:
+        records = [response(rng, i) for i in range(history + args.run)]
+        evaluations = [evaluation(rng, record) for record in records]
+        new_records, new_evaluations = records[history:], evaluations[history:]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            # The history, saved by the previous runs in batches of a run
+            pd.DataFrame(records[:history]).to_csv(
+                directory / "responses.csv", index=False
+            )
+            with open(directory / "evaluations.json", "w") as f:
+                json.dump(evaluations[:history], f)
+            responses_dataset, evaluations_dataset = datasets(directory)
+            for start in range(0, history, args.run):
+                end, run_id = min(start + args.run, history), f"{start:012d}"
+                responses_dataset.save(
+                    pd.DataFrame(records[start:end], dtype="string").assign(
+                        run_id=run_id
+                    )
+                )
+                evaluations_dataset.save(
+                    evaluation_rows(keyed(evaluations[start:end])).assign(run_id=run_id)
+                )
+
+            previous_save_seconds, _ = timed(
+                previous_save, directory, new_records, new_evaluations
+            )
+            save_seconds, _ = timed(save, directory, new_records, new_evaluations)
+            previous_read_seconds, expected = timed(previous_scores, directory)
+            read_seconds, actual = timed(scores, directory)
+            assert sorted(expected) == sorted(actual)
+
+        print(
+            f"{history:>8} {previous_save_seconds:>18.3f} {save_seconds:>17.3f} "
+            f"{previous_read_seconds:>18.3f} {read_seconds:>17.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--history", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--run", type=int, default=237)
+    main(parser.parse_args())
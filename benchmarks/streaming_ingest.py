@@ -0,0 +1,116 @@
+"""Peak memory and time of indexing PDFs, materialised against streamed.
+
+Indexes synthetic PDFs into a fresh persistent Chroma collection twice per corpus
+size: first the way the pipeline used to, parsing every PDF into one list of chunks
+(and a JSON serializable copy of it) before syncing the collection, then streaming the
+PDFs one at a time through ``iter_pdf_docs`` and ``CollectionSync`` with bounded
+queues between the stages. The peak memory allocated by Python is traced with
+``tracemalloc``, which leaves out Chroma's native allocations.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.streaming_ingest --pdfs 25 100 400 --pages 20
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+
+import chromadb
+from langchain_community.embeddings import DeterministicFakeEmbedding
+
+from benchmarks.pdf_parsing import write_pdf
+from healthcare_chatbot.pipelines.data_processing.registry import (
+    SourceRegistry,
+)
+from healthcare_chatbot.pipelines.data_processing.streaming import (
+    prefetch,
+)
+from healthcare_chatbot.pipelines.data_processing.utils import (
+    CollectionSync,
+    SourceType,
+    iter_pdf_docs,
+    pdfs_to_docs,
+    sync_collection,
+)
+
+SPLITTER = {
+    "chunk_size": 1000,
+    "chunk_overlap": 100,
+    "separators": ["\n\n", "\n", ".", "!", "?", ",", " ", ""],
+}
+
+
+def materialised(pdfs_paths: list[str], collection, registry, embedding_model) -> int:
+    all_data_splits, pdfs_dict = pdfs_to_docs(pdfs_paths, **SPLITTER)
+    sync_collection(
+        collection,
+        all_data_splits,
+        SourceType.PDF,
+        pdfs_paths,
+        embedding_model,
+        registry,
+    )
+    return len(pdfs_dict)
+
+
+def streamed(pdfs_paths: list[str], collection, registry, embedding_model) -> int:
+    sync = CollectionSync(collection, SourceType.PDF, embedding_model, registry)
+    chunks = 0
+    for pdf_path, data_split in prefetch(iter_pdf_docs(pdfs_paths, **SPLITTER)):
+        sync.add(pdf_path, data_split)
+        chunks += len([dict(ds) for ds in data_split])
+    sync.finish()
+    return chunks
+
+
+def measure(index: Callable, pdfs_paths: list[str]) -> tuple[float, float, int]:
+    """Indexes the PDFs into a fresh collection.
+
+    Args:
+        index (Callable): Indexes the PDFs, returning the number of chunks.
+        pdfs_paths (list[str]): The paths to the PDFs.
+
+    Returns:
+        tuple[float, float, int]: The seconds taken, the peak traced memory in MB
+            and the number of chunks.
+    """
+    with tempfile.TemporaryDirectory() as db_dir:
+        collection = chromadb.PersistentClient(path=db_dir).create_collection("pdfs")
+        registry = SourceRegistry(os.path.join(db_dir, "registry.db"))
+        embedding_model = DeterministicFakeEmbedding(size=16)
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        chunks = index(pdfs_paths, collection, registry, embedding_model)
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        registry.close()
+    return elapsed, peak / 2**20, chunks
+
+
+def main(args: argparse.Namespace) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(max(args.pdfs)):
+            write_pdf(os.path.join(tmp, f"synthetic-{i:05d}.pdf"), args.pages)
+        all_pdfs_paths = sorted(glob.glob(os.path.join(tmp, "*.pdf")))
+
+        print(
+            f"{'pdfs':>6} {'chunks':>7} {'approach':>13} {'seconds':>8} {'peak MB':>8}"
+        )
+        for pdfs in args.pdfs:
+            for name, index in [("materialised", materialised), ("streamed", streamed)]:
+                elapsed, peak, chunks = measure(index, all_pdfs_paths[:pdfs])
+                print(f"{pdfs:>6} {chunks:>7} {name:>13} {elapsed:>8.2f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pdfs", type=int, nargs="+", default=[25, 100, 400])
+    parser.add_argument("--pages", type=int, default=20)
+    main(parser.parse_args())
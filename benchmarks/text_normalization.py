@@ -0,0 +1,106 @@
+"""Throughput of cleaning web page and PDF text, before and after the normalize module.
+
+Cleans synthetic pages the way ``strip_content`` and ``parse_pdf`` used to, with a
+``re.sub`` pass per step, and with ``clean_web_text`` and ``clean_pdf_text``, and
+reports the MB of text cleaned per second. The pages are laid out like text extracted
+from a PDF, with line breaks in the middle of sentences, words hyphenated across lines
+and blank lines between paragraphs. Pass ``--unicode`` to make one word in fifty a
+ligature, accented letter or mojibake, which takes the slower normalizing path.
+
+Usage:
+    PYTHONPATH=src python -m benchmarks.text_normalization --pages 2000
+    PYTHONPATH=src python -m benchmarks.text_normalization --pages 2000 --unicode
+"""
+
+import argparse
+import random
+import re
+import statistics
+import time
+from collections.abc import Callable
+
+from healthcare_chatbot.pipelines.data_processing.normalize import (
+    clean_pdf_text,
+    clean_web_text,
+)
+
+WORDS = (
+    "patients with diabetes should check their feet daily for cuts blisters and "
+    "swelling and see a doctor if a wound does not heal within a few days"
+).split()
+UNICODE_WORDS = ["ﬁbre", "café", "β-cell", "√ü-cell", "patientâ€™s", "37°C"]
+# The share of words with Unicode to normalise and of hyphenated line ends
+UNICODE_RATE = 0.02
+HYPHENATED_RATE = 0.2
+
+
+def previous_strip_content(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def previous_parse_pdf_page(text: str) -> str:
+    text = re.sub(r"(\w+)-\n(\w+)", r"\1\2", text)
+    text = re.sub(r"(?<!\n\s)\n(?!\n\s)", " ", text.strip())
+    return re.sub(r"\n\s*\n", "\n\n", text)
+
+
+def word(rng: random.Random, unicode: bool) -> str:
+    if unicode and rng.random() < UNICODE_RATE:
+        return rng.choice(UNICODE_WORDS)
+    return rng.choice(WORDS)
+
+
+def page(rng: random.Random, unicode: bool) -> str:
+    paragraphs = []
+    for _ in range(4):
+        lines = []
+        for _ in range(10):
+            line = " ".join(word(rng, unicode) for _ in range(12))
+            # Some lines end on a word hyphenated across the line break
+            lines.append(line[:-3] + "-" if rng.random() < HYPHENATED_RATE else line)
+        paragraphs.append("\n".join(lines))
+    return "\n\n".join(paragraphs)
+
+
+def throughput(clean: Callable[[str], str], pages: list[str], runs: int) -> float:
+    """Cleans the pages, returning the median MB of text cleaned per second.
+
+    Args:
+        clean (Callable[[str], str]): Cleans the text of a page.
+        pages (list[str]): The pages to clean.
+        runs (int): The number of times to clean the pages.
+
+    Returns:
+        float: The median MB of text cleaned per second.
+    """
+    mb = sum(len(page.encode()) for page in pages) / 2**20
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for text in pages:
+            clean(text)
+        timings.append(time.perf_counter() - start)
+    return mb / statistics.median(timings)
+
+
+def main(args: argparse.Namespace) -> None:
+    rng = random.Random(0)
+    pages = [page(rng, args.unicode) for _ in range(args.pages)]
+
+    print(f"{'cleaning':>8} {'previous MB/s':>14} {'normalize MB/s':>15}")
+    for name, previous, current in [
+        ("web", previous_strip_content, clean_web_text),
+        ("pdf", previous_parse_pdf_page, clean_pdf_text),
+    ]:
+        print(
+            f"{name:>8} {throughput(previous, pages, args.runs):>14.1f} "
+            f"{throughput(current, pages, args.runs):>15.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--unicode", action="store_true")
+    main(parser.parse_args())
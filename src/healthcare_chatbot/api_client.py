@@ -0,0 +1,226 @@
+"""A concurrent client for the endpoints of the application, used by the pipelines."""
+
+import asyncio
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+
+import httpx
+import openai
+from tqdm import tqdm
+
+# Responses worth retrying, everything else fails the request straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _is_retryable(error: Exception) -> bool:
+    # Like a response of the endpoint, an error response of the model's API is only
+    # retried for the statuses worth retrying
+    status_code = getattr(error, "status_code", None)
+    return status_code is None or status_code in RETRY_STATUSES
+
+
+class ApiClient:
+    """Posts payloads to an endpoint of the application concurrently.
+
+    All the payloads are posted over one pool of connections, with at most
+    ``max_concurrency`` of them in flight at once. Requests that fail with a
+    connection error or a retryable status, such as a rate limit, are retried with
+    exponential backoff or after the ``Retry-After`` delay of the response, waiting
+    at most ``max_backoff`` seconds. A payload which still fails is reported back
+    rather than raised, so it does not stop the others.
+    """
+
+    # The errors of a payload which fails, any other error is raised
+    _errors = (httpx.HTTPError, ValueError)
+
+    def __init__(  # noqa: PLR0913 - the posting parameters, passed by keyword
+        self,
+        url: str,
+        *,
+        max_concurrency: int = 8,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 60,
+        timeout: float = 120,
+    ):
+        """
+        Args:
+            url (str): The URL of the endpoint.
+            max_concurrency (int): The maximum number of requests in flight at once. Defaults to 8.
+            retries (int): The number of times to retry a failed request. Defaults to 3.
+            backoff (float): The delay before the first retry in seconds, doubling on every retry. Defaults to 1.0.
+            max_backoff (float): The longest delay before a retry in seconds, however long
+                the ``Retry-After`` header of the response asks to wait. Defaults to 60.
+            timeout (float): The timeout of each request in seconds. Defaults to 120.
+        """
+        self.url = url
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return min(self.backoff * 2**attempt, self.max_backoff)
+
+    @asynccontextmanager
+    async def _open(self) -> AsyncIterator[Callable[[dict], Awaitable[dict]]]:
+        # Yields the coroutine function which posts a payload, retrying it
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        limits = httpx.Limits(
+            max_connections=self.max_concurrency,
+            max_keepalive_connections=self.max_concurrency,
+        )
+        async with httpx.AsyncClient(limits=limits, timeout=self.timeout) as client:
+            yield lambda payload: self._post(client, payload, limiter)
+
+    async def _post(
+        self, client: httpx.AsyncClient, payload: dict, limiter: asyncio.Semaphore
+    ) -> dict:
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                async with limiter:
+                    response = await client.post(self.url, json=payload)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt == self.retries
+                ):
+                    response.raise_for_status()
+                    return response.json()
+
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def apost(
+        self,
+        payloads: dict[str, dict],
+        on_response: Callable[[str, dict], None],
+        desc: str | None = None,
+    ) -> dict[str, str]:
+        """
+        Posts payloads to the endpoint concurrently.
+
+        Args:
+            payloads (dict[str, dict]): The payloads to post, by a key identifying them.
+            on_response (Callable[[str, dict], None]): Called with the key of each
+                payload and its response as soon as the response arrives, in the order
+                they complete.
+            desc (str | None): The description of the progress bar. Defaults to None.
+
+        Returns:
+            dict[str, str]: The error of every payload which failed, even after retrying,
+                by its key.
+        """
+        failures = {}
+
+        async def post(key: str, payload: dict) -> tuple[str, dict | None]:
+            try:
+                return key, await send(payload)
+            except self._errors as e:
+                failures[key] = repr(e)
+                return key, None
+
+        async with self._open() as send:
+            for completed in tqdm(
+                asyncio.as_completed(
+                    [post(key, payload) for key, payload in payloads.items()]
+                ),
+                total=len(payloads),
+                desc=desc,
+            ):
+                key, response = await completed
+                if response is not None:
+                    on_response(key, response)
+
+        return failures
+
+    def post(
+        self,
+        payloads: dict[str, dict],
+        on_response: Callable[[str, dict], None],
+        desc: str | None = None,
+    ) -> dict[str, str]:
+        """
+        Posts payloads to the endpoint concurrently, blocking until all of them are
+        answered or have failed.
+
+        Args:
+            payloads (dict[str, dict]): The payloads to post, by a key identifying them.
+            on_response (Callable[[str, dict], None]): Called with the key of each
+                payload and its response as soon as the response arrives, in the order
+                they complete.
+            desc (str | None): The description of the progress bar. Defaults to None.
+
+        Returns:
+            dict[str, str]: The error of every payload which failed, even after retrying,
+                by its key.
+        """
+        return asyncio.run(self.apost(payloads, on_response, desc))
+
+
+class InProcessClient(ApiClient):
+    """Runs the handler of an endpoint of the application on payloads concurrently,
+    in this process rather than through the application's server.
+
+    Takes the same payloads and gives the same responses as the ``ApiClient`` of the
+    endpoint, with at most ``max_concurrency`` of them in flight at once. Payloads
+    whose handler fails with a connection error or a retryable status of the model's
+    API, or takes longer than ``timeout`` seconds, are retried with exponential
+    backoff and reported back if they still fail. Any other error, such as a bug in
+    the handler, is raised straight away.
+    """
+
+    # The errors of a payload which fails, the ones the ApiClient gets as a response
+    # from the endpoint, any other error is raised
+    _errors = (openai.APIError, httpx.TransportError, asyncio.TimeoutError)
+
+    def __init__(  # noqa: PLR0913 - the posting parameters, passed by keyword
+        self,
+        handler: Callable[[dict], Awaitable[dict]],
+        *,
+        max_concurrency: int = 8,
+        retries: int = 3,
+        backoff: float = 1.0,
+        max_backoff: float = 60,
+        timeout: float = 120,
+    ):
+        """
+        Args:
+            handler (Callable[[dict], Awaitable[dict]]): Handles a payload like the endpoint, returning its response.
+            max_concurrency (int): The maximum number of payloads in flight at once. Defaults to 8.
+            retries (int): The number of times to retry a failed payload. Defaults to 3.
+            backoff (float): The delay before the first retry in seconds, doubling on every retry. Defaults to 1.0.
+            max_backoff (float): The longest delay before a retry in seconds. Defaults to 60.
+            timeout (float): The timeout of each payload in seconds. Defaults to 120.
+        """
+        self.handler = handler
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+
+    @asynccontextmanager
+    async def _open(self) -> AsyncIterator[Callable[[dict], Awaitable[dict]]]:
+        limiter = asyncio.Semaphore(self.max_concurrency)
+        yield lambda payload: self._handle(payload, limiter)
+
+    async def _handle(self, payload: dict, limiter: asyncio.Semaphore) -> dict:
+        for attempt in range(self.retries + 1):
+            try:
+                async with limiter:
+                    return await asyncio.wait_for(
+                        self.handler(payload), timeout=self.timeout
+                    )
+            except self._errors as e:
+                if attempt == self.retries or not _is_retryable(e):
+                    raise
+
+            await asyncio.sleep(self._retry_delay(attempt, None))
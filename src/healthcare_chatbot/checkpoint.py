@@ -0,0 +1,74 @@
+"""Append-only checkpoints of the records completed by a long running node."""
+
+import json
+import threading
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Any
+
+
+class JSONLinesCheckpoint:
+    """An append-only JSON Lines file of the records a node has completed so far.
+
+    Every record is written and flushed as soon as it is appended, so the records
+    completed before a crash are still there when the node runs again. A line cut
+    short by the crash is skipped when loading. Appending is thread-safe.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The path to the checkpoint file.
+        """
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def load(self) -> list[dict[str, Any]]:
+        """
+        Loads the records in the checkpoint.
+
+        Returns:
+            list[dict[str, Any]]: The records, in the order they were appended, or an
+                empty list if there is no checkpoint.
+        """
+        records = []
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # The last line of a run which crashed while writing it
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def append(self, record: dict[str, Any]) -> None:
+        """
+        Appends a record to the checkpoint and flushes it to disk.
+
+        Args:
+            record (dict[str, Any]): The record to append.
+        """
+        line = json.dumps(record) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def rewrite(self, records: Iterable[dict[str, Any]]) -> None:
+        """
+        Replaces the records in the checkpoint, atomically so a crash leaves either
+        the old records or the new ones.
+
+        Args:
+            records (Iterable[dict[str, Any]]): The records to keep.
+        """
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record) + "\n")
+            tmp.replace(self.path)
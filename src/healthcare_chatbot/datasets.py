@@ -0,0 +1,183 @@
+"""Custom Kedro datasets of the project."""
+
+import json
+import uuid
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from kedro.io import AbstractDataset
+
+
+class JSONLinesDataset(AbstractDataset[Iterable[Any], Iterator[Any]]):
+    """Saves and loads records as JSON Lines, one JSON record per line.
+
+    Made for generator nodes, which Kedro saves one yielded item at a time. Each item
+    is an iterable of records, which are written as they are iterated over. The first
+    save of a run replaces the file and every save after it appends to it, so the file
+    is written incrementally and never held in memory as a whole. Loading yields the
+    records lazily, one line at a time.
+
+    Example catalog entry:
+
+        pdfs_dict:
+          type: healthcare_chatbot.datasets.JSONLinesDataset
+          filepath: data/02_intermediate/pdfs.jsonl
+    """
+
+    def __init__(self, filepath: str, metadata: dict[str, Any] | None = None):
+        """
+        Args:
+            filepath (str): The path to the JSON Lines file.
+            metadata (dict[str, Any] | None): Any arbitrary metadata, ignored by Kedro. Defaults to None.
+        """
+        self._filepath = Path(filepath)
+        self.metadata = metadata
+        self._started = False
+
+    def _describe(self) -> dict[str, Any]:
+        return {"filepath": str(self._filepath)}
+
+    def _exists(self) -> bool:
+        return self._filepath.is_file()
+
+    def _load(self) -> Iterator[Any]:
+        with open(self._filepath, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    def _save(self, data: Iterable[Any]) -> None:
+        self._filepath.parent.mkdir(parents=True, exist_ok=True)
+        mode = "a" if self._started else "w"
+        with open(self._filepath, mode, encoding="utf-8") as f:
+            for record in data:
+                f.write(json.dumps(record) + "\n")
+        self._started = True
+
+
+class OptionalDataset(AbstractDataset[Any, Any]):
+    """Wraps a dataset which may not exist yet, loading ``None`` instead of raising.
+
+    Lets a node take the state saved by the previous runs as an input, through a
+    second catalog entry pointing at the same file as its output, on the first run
+    too when there is no file yet.
+
+    Example catalog entry:
+
+        previous_responses_file:
+          type: healthcare_chatbot.datasets.OptionalDataset
+          dataset:
+            type: pandas.CSVDataset
+            filepath: data/07_model_output/responses.csv
+    """
+
+    def __init__(self, dataset: dict[str, Any], metadata: dict[str, Any] | None = None):
+        """
+        Args:
+            dataset (dict[str, Any]): The catalog entry of the wrapped dataset.
+            metadata (dict[str, Any] | None): Any arbitrary metadata, ignored by Kedro. Defaults to None.
+        """
+        self._dataset = AbstractDataset.from_config("dataset", dataset)
+        self.metadata = metadata
+
+    def _describe(self) -> dict[str, Any]:
+        return {"dataset": self._dataset._describe()}
+
+    def _exists(self) -> bool:
+        return self._dataset.exists()
+
+    def _load(self) -> Any:
+        return self._dataset.load() if self._dataset.exists() else None
+
+    def _save(self, data: Any) -> None:
+        self._dataset.save(data)
+
+
+class PartitionedParquetDataset(AbstractDataset[pd.DataFrame, pd.DataFrame]):
+    """Appends DataFrames to a Parquet dataset partitioned by some of their columns.
+
+    Every save writes its rows to new files in the directory of their partition, e.g.
+    ``run_id=<run ID>/part-<UUID>-0.parquet``, and never reads or rewrites the files
+    already there, so saving costs the same however many rows were saved before.
+    Loading reads the files of every partition in the order of their paths, as one
+    DataFrame. The ``filters`` of ``load_args`` on the partition columns skip the
+    files of the other partitions without opening them, the ones on other columns
+    skip the row groups ruled out by their statistics, and only the ``columns`` of
+    ``load_args`` are read.
+
+    The values of the partition columns are always strings.
+
+    Example catalog entry:
+
+        responses_file:
+          type: healthcare_chatbot.datasets.PartitionedParquetDataset
+          path: data/07_model_output/responses
+          partition_cols:
+            - run_id
+          load_args:
+            filters:
+              - [run_id, "==", "2024-04-17T10.21.04.512Z"]
+    """
+
+    def __init__(
+        self,
+        path: str,
+        partition_cols: list[str],
+        load_args: dict[str, Any] | None = None,
+        save_args: dict[str, Any] | None = None,
+        metadata: dict[str, Any] | None = None,
+    ):
+        """
+        Args:
+            path (str): The path to the directory of the dataset.
+            partition_cols (list[str]): The columns to partition the rows by, nesting the directory of each column in the one of the column before it.
+            load_args (dict[str, Any] | None): Passed on to ``pyarrow.parquet.read_table``, e.g. ``columns`` and ``filters``. Defaults to None.
+            save_args (dict[str, Any] | None): Passed on to ``pyarrow.dataset.write_dataset``, e.g. ``max_rows_per_group``. Defaults to None.
+            metadata (dict[str, Any] | None): Any arbitrary metadata, ignored by Kedro. Defaults to None.
+        """
+        self._path = Path(path)
+        self._partition_cols = list(partition_cols)
+        self._load_args = load_args or {}
+        self._save_args = save_args or {}
+        self.metadata = metadata
+
+    def _partitioning(self) -> ds.Partitioning:
+        # Declared rather than inferred, so a run ID which looks like a number is
+        # still loaded as a string
+        schema = pa.schema([(column, pa.string()) for column in self._partition_cols])
+        return ds.partitioning(schema, flavor="hive")
+
+    def _describe(self) -> dict[str, Any]:
+        return {
+            "path": str(self._path),
+            "partition_cols": self._partition_cols,
+            "load_args": self._load_args,
+            "save_args": self._save_args,
+        }
+
+    def _exists(self) -> bool:
+        return self._path.is_dir() and any(self._path.rglob("*.parquet"))
+
+    def _load(self) -> pd.DataFrame:
+        table = pq.read_table(
+            self._path, partitioning=self._partitioning(), **self._load_args
+        )
+        return table.to_pandas()
+
+    def _save(self, data: pd.DataFrame) -> None:
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        ds.write_dataset(
+            table,
+            self._path,
+            format="parquet",
+            partitioning=self._partitioning(),
+            # Unique, so the files of the previous saves are left alone
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+            **self._save_args,
+        )
@@ -0,0 +1,213 @@
+"""Embedding models shared by the application and the pipelines."""
+
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+class CachedEmbeddings(Embeddings):
+    """An embedding model that caches the embeddings of the underlying model.
+
+    The embeddings are keyed by a hash of the namespace (usually the name of the
+    embedding model) and the text, so a text is only ever sent to the underlying
+    model once. Lookups go through an in-memory LRU tier first and then through an
+    optional on-disk SQLite tier, which survives restarts and can be shared between
+    the application and the indexing pipeline. The async methods read and write the
+    SQLite tier in a worker thread, so they never block the event loop on disk.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        namespace: str,
+        max_entries: int = 10_000,
+        path: str | None = None,
+    ):
+        """
+        Args:
+            underlying (Embeddings): The embedding model to cache.
+            namespace (str): The namespace of the keys, usually the name of the embedding model.
+            max_entries (int): The maximum number of embeddings kept in memory. Defaults to 10,000.
+            path (str | None): The path to the SQLite database of the on-disk tier,
+                or None to only cache in memory. Defaults to None.
+        """
+        self.underlying = underlying
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.path = path
+
+        self._lock = threading.Lock()
+        self._connection_lock = threading.Lock()
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._connection = self._connect(path) if path is not None else None
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(path, check_same_thread=False)
+        # Let the application read while the pipeline writes
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+        )
+        connection.commit()
+        return connection
+
+    def key(self, text: str) -> str:
+        """
+        Gets the cache key of a text.
+
+        Args:
+            text (str): The text to embed.
+
+        Returns:
+            str: The SHA-256 hash of the namespace and the text.
+        """
+        return hashlib.sha256(f"{self.namespace}\0{text}".encode()).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, keys: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+        return found
+
+    def _lookup_disk(self, keys: list[str]) -> dict[str, np.ndarray]:
+        found = {}
+        with self._connection_lock:
+            # Stay well under SQLite's limit on the number of bound parameters
+            for i in range(0, len(keys), 500):
+                batch = keys[i : i + 500]
+                rows = self._connection.execute(
+                    "SELECT key, vector FROM embeddings WHERE key IN "
+                    f"({', '.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, vector in rows:
+                    found[key] = np.frombuffer(vector, dtype=np.float32)
+
+        with self._lock:
+            for key, vector in found.items():
+                self._remember(key, vector)
+        return found
+
+    def _store_disk(self, vectors: dict[str, np.ndarray]) -> None:
+        with self._connection_lock:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in vectors.items()],
+            )
+            self._connection.commit()
+
+    def _store_memory(self, vectors: dict[str, np.ndarray]) -> None:
+        with self._lock:
+            for key, vector in vectors.items():
+                self._remember(key, vector)
+
+    def _missing(
+        self, keys: list[str], texts: list[str], found: dict[str, np.ndarray]
+    ) -> list[tuple[str, str]]:
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(keys) - found.keys())
+        # Only send each distinct text to the underlying model once
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        return list(missing.items())
+
+    def _missing_texts(
+        self, texts: list[str]
+    ) -> tuple[list[str], dict[str, np.ndarray], list[tuple[str, str]]]:
+        keys = [self.key(text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        found = self._lookup_memory(unique)
+        not_in_memory = [key for key in unique if key not in found]
+        if self._connection is not None and not_in_memory:
+            found.update(self._lookup_disk(not_in_memory))
+        return keys, found, self._missing(keys, texts, found)
+
+    async def _amissing_texts(
+        self, texts: list[str]
+    ) -> tuple[list[str], dict[str, np.ndarray], list[tuple[str, str]]]:
+        keys = [self.key(text) for text in texts]
+        unique = list(dict.fromkeys(keys))
+        found = self._lookup_memory(unique)
+        not_in_memory = [key for key in unique if key not in found]
+        if self._connection is not None and not_in_memory:
+            # Reading from disk in this thread would block the event loop
+            found.update(await asyncio.to_thread(self._lookup_disk, not_in_memory))
+        return keys, found, self._missing(keys, texts, found)
+
+    def _store(self, vectors: dict[str, np.ndarray]) -> None:
+        self._store_memory(vectors)
+        if self._connection is not None:
+            self._store_disk(vectors)
+
+    async def _astore(self, vectors: dict[str, np.ndarray]) -> None:
+        self._store_memory(vectors)
+        if self._connection is not None:
+            await asyncio.to_thread(self._store_disk, vectors)
+
+    @staticmethod
+    def _to_vectors(embeddings: list[list[float]]) -> list[np.ndarray]:
+        return [np.asarray(embedding, dtype=np.float32) for embedding in embeddings]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, missing = self._missing_texts(texts)
+
+        if missing:
+            embeddings = self.underlying.embed_documents([text for _, text in missing])
+            new = dict(zip([key for key, _ in missing], self._to_vectors(embeddings)))
+            self._store(new)
+            found.update(new)
+
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> list[float]:
+        (key,), found, missing = self._missing_texts([text])
+
+        if missing:
+            found[key] = np.asarray(self.underlying.embed_query(text), dtype=np.float32)
+            self._store({key: found[key]})
+
+        return found[key].tolist()
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        keys, found, missing = await self._amissing_texts(texts)
+
+        if missing:
+            embeddings = await self.underlying.aembed_documents(
+                [text for _, text in missing]
+            )
+            new = dict(zip([key for key, _ in missing], self._to_vectors(embeddings)))
+            await self._astore(new)
+            found.update(new)
+
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        (key,), found, missing = await self._amissing_texts([text])
+
+        if missing:
+            found[key] = np.asarray(
+                await self.underlying.aembed_query(text), dtype=np.float32
+            )
+            await self._astore({key: found[key]})
+
+        return found[key].tolist()
@@ -0,0 +1,106 @@
+"""The evaluations of the responses, as the pipelines which save them store them."""
+
+import hashlib
+import json
+
+import pandas as pd
+
+# The fields of an evaluation which are not the result of a criteria
+_EVALUATION_FIELDS = {"query", "response", "page_content", "timings"}
+_TEXT_COLUMNS = ["key", "query", "response", "page_content", "criteria"]
+_RESULT_TEXT_COLUMNS = ["value", "reasoning", "error"]
+
+
+def evaluation_key(query: str, response: str, page_content: str) -> str:
+    """
+    Identifies the evaluation of a response, whichever run it was evaluated in.
+
+    Args:
+        query (str): The query.
+        response (str): The response to the query.
+        page_content (str): The page content of the document the response is based on.
+
+    Returns:
+        str: The SHA-256 hash of the query, response and page content.
+    """
+    content = json.dumps([query, response, page_content])
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def unique_evaluations(evaluations: list[dict]) -> dict[str, dict]:
+    """
+    Keys the evaluations, keeping the first evaluation of each response.
+
+    Args:
+        evaluations (list[dict]): The evaluations, as the ``/evaluate`` endpoint
+            returns them.
+
+    Returns:
+        dict[str, dict]: The first evaluation of each response, by its key.
+    """
+    unique = {}
+    for evaluation in evaluations:
+        key = evaluation_key(
+            evaluation["query"], evaluation["response"], evaluation["page_content"]
+        )
+        unique.setdefault(key, evaluation)
+    return unique
+
+
+def failed_criteria(evaluation: dict) -> list[str]:
+    """
+    Lists the criteria of an evaluation which timed out or failed, and have an
+    ``error`` instead of a score.
+
+    Args:
+        evaluation (dict): The evaluation, as the ``/evaluate`` endpoint returns it.
+
+    Returns:
+        list[str]: The names of the criteria which failed.
+    """
+    return [
+        criteria
+        for criteria, result in evaluation.items()
+        if criteria not in _EVALUATION_FIELDS and "error" in result
+    ]
+
+
+def evaluation_rows(evaluations: dict[str, dict]) -> pd.DataFrame:
+    """
+    Flattens evaluations into one row per criteria of every evaluation, so the
+    criteria can be read on their own.
+
+    Args:
+        evaluations (dict[str, dict]): The evaluations, by their key.
+
+    Returns:
+        pd.DataFrame: The ``key``, query, response, page content and ``criteria`` of
+            every row, with its score, value, reasoning or error and the seconds it
+            took. The columns have the same types even where every value is missing,
+            so the rows of all the runs have the same schema.
+    """
+    rows = []
+    for key, evaluation in evaluations.items():
+        timings = evaluation.get("timings", {})
+        for criteria, result in evaluation.items():
+            if criteria in _EVALUATION_FIELDS:
+                continue
+            rows.append(
+                {
+                    "key": key,
+                    "query": evaluation["query"],
+                    "response": evaluation["response"],
+                    "page_content": evaluation["page_content"],
+                    "criteria": criteria,
+                    "score": result.get("score"),
+                    **{column: result.get(column) for column in _RESULT_TEXT_COLUMNS},
+                    "seconds": timings.get(criteria),
+                }
+            )
+    columns = [*_TEXT_COLUMNS, "score", *_RESULT_TEXT_COLUMNS, "seconds"]
+    types = {
+        **dict.fromkeys([*_TEXT_COLUMNS, *_RESULT_TEXT_COLUMNS], "string"),
+        "score": float,
+        "seconds": float,
+    }
+    return pd.DataFrame(rows, columns=columns).astype(types)
@@ -0,0 +1,32 @@
+"""Project hooks."""
+
+from typing import Any
+
+from kedro.framework.hooks import hook_impl
+from kedro.io import DataCatalog
+
+from healthcare_chatbot.vector_store import VectorStoreDataset
+
+
+class VectorStoreHooks:
+    """Registers the ``vector_store`` dataset, shared by the nodes of a run, in the
+    catalog from the parameters and credentials of the run."""
+
+    @hook_impl
+    def after_catalog_created(
+        self,
+        catalog: DataCatalog,
+        conf_creds: dict[str, Any],
+        feed_dict: dict[str, Any],
+    ) -> None:
+        parameters = feed_dict["parameters"]
+        catalog.add(
+            "vector_store",
+            VectorStoreDataset(
+                db_params=parameters["vector_db"],
+                embedding_model_name=parameters["embedding_model_name"],
+                embedding_cache_params=parameters["embedding_cache"],
+                embedding_batching_params=parameters["embedding_batching"],
+                credentials=conf_creds,
+            ),
+        )
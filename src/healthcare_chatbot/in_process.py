@@ -0,0 +1,47 @@
+"""Handlers running the endpoints of the application in the pipeline's own process."""
+
+from collections.abc import Awaitable, Callable
+
+from fastapi.encoders import jsonable_encoder
+
+# Installed with the project, see the packages of pyproject.toml
+from app import main
+
+
+def chat_handler() -> Callable[[dict], Awaitable[dict]]:
+    """
+    Creates a handler answering a query like the ``/chat`` endpoint, with the chain,
+    response cache and concurrency limit of the application built in this process
+    from the same configuration.
+
+    Returns:
+        Callable[[dict], Awaitable[dict]]: Answers the payload of a ``/chat`` request,
+            returning the same response as the endpoint.
+    """
+    components = main.get_components()
+    components.warm_up(list(main.CHAT_COMPONENTS))
+
+    async def chat(payload: dict) -> dict:
+        response = await main.ask(main.Message(**payload), components)
+        return jsonable_encoder(response)
+
+    return chat
+
+
+def evaluate_handler() -> Callable[[dict], Awaitable[dict]]:
+    """
+    Creates a handler evaluating a response like the ``/evaluate`` endpoint, with the
+    evaluators of the application built in this process from the same configuration.
+
+    Returns:
+        Callable[[dict], Awaitable[dict]]: Evaluates the payload of an ``/evaluate``
+            request, returning the same response as the endpoint.
+    """
+    components = main.get_components()
+    components.warm_up(list(main.EVAL_COMPONENTS))
+
+    async def evaluate(payload: dict) -> dict:
+        response = await main.evaluate(main.EvalMessage(**payload), components)
+        return jsonable_encoder(response)
+
+    return evaluate
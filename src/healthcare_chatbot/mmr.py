@@ -0,0 +1,94 @@
+"""Maximal marginal relevance re-ranking of the candidates of vector searches."""
+
+import numpy as np
+
+
+def _unit(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1)
+
+
+def batch_maximal_marginal_relevance(
+    query_embeddings: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    lambda_mult: float = 0.5,
+    k: int = 4,
+) -> list[list[int]]:
+    """
+    Selects the candidates of many queries at once by maximal marginal relevance.
+
+    Each step picks the candidate maximising
+    ``lambda_mult * similarity to the query - (1 - lambda_mult) * similarity to the
+    closest candidate already picked``, by cosine similarity. Rather than computing the
+    similarities to the picked candidates again on every step, the similarities between
+    all the candidates are computed once and the similarity of each candidate to its
+    closest picked candidate is updated with the latest pick only. Selects the same
+    candidates as ``langchain_community.vectorstores.utils.maximal_marginal_relevance``.
+
+    Args:
+        query_embeddings (np.ndarray): The embeddings of the queries, of shape (queries, dim).
+        candidate_embeddings (np.ndarray): The embeddings of the candidates of each query,
+            of shape (queries, candidates, dim).
+        lambda_mult (float): The trade-off between relevance (1) and diversity (0). Defaults to 0.5.
+        k (int): The number of candidates to select per query. Defaults to 4.
+
+    Returns:
+        list[list[int]]: The indices of the selected candidates of each query, in the order they were selected.
+    """
+    query_embeddings = _unit(np.asarray(query_embeddings, dtype=np.float32))
+    candidate_embeddings = _unit(np.asarray(candidate_embeddings, dtype=np.float32))
+
+    n_queries, n_candidates = candidate_embeddings.shape[:2]
+    k = min(k, n_candidates)
+    if k <= 0:
+        return [[] for _ in range(n_queries)]
+
+    rows = np.arange(n_queries)
+    relevance = (candidate_embeddings @ query_embeddings[:, :, None])[:, :, 0]
+    # The (candidates x candidates) similarities of each query, computed once
+    similarities = candidate_embeddings @ candidate_embeddings.transpose(0, 2, 1)
+
+    selected = np.empty((n_queries, k), dtype=np.intp)
+    selected[:, 0] = np.argmax(relevance, axis=1)
+    redundancy = np.full((n_queries, n_candidates), -np.inf, dtype=np.float32)
+    picked = np.zeros((n_queries, n_candidates), dtype=bool)
+    picked[rows, selected[:, 0]] = True
+
+    for step in range(1, k):
+        latest = similarities[rows, selected[:, step - 1]]
+        np.maximum(redundancy, latest, out=redundancy)
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[picked] = -np.inf
+        selected[:, step] = np.argmax(scores, axis=1)
+        picked[rows, selected[:, step]] = True
+
+    return selected.tolist()
+
+
+def maximal_marginal_relevance(
+    query_embedding: np.ndarray,
+    candidate_embeddings: np.ndarray,
+    lambda_mult: float = 0.5,
+    k: int = 4,
+) -> list[int]:
+    """
+    Selects the candidates of a query by maximal marginal relevance.
+
+    Args:
+        query_embedding (np.ndarray): The embedding of the query, of shape (dim,).
+        candidate_embeddings (np.ndarray): The embeddings of the candidates, of shape (candidates, dim).
+        lambda_mult (float): The trade-off between relevance (1) and diversity (0). Defaults to 0.5.
+        k (int): The number of candidates to select. Defaults to 4.
+
+    Returns:
+        list[int]: The indices of the selected candidates, in the order they were selected.
+    """
+    if len(candidate_embeddings) == 0:
+        return []
+
+    return batch_maximal_marginal_relevance(
+        np.asarray(query_embedding)[None],
+        np.asarray(candidate_embeddings)[None],
+        lambda_mult=lambda_mult,
+        k=k,
+    )[0]
@@ -13,5 +13,9 @@ def register_pipelines() -> Dict[str, Pipeline]:
         A mapping from pipeline names to ``Pipeline`` objects.
     """
     pipelines = find_pipelines()
-    pipelines["__default__"] = sum(pipelines.values())
+    # The migration is only run on its own, once, as it saves the same datasets as
+    # the data_science and model_evaluation pipelines
+    pipelines["__default__"] = sum(
+        pipeline for name, pipeline in pipelines.items() if name != "migration"
+    )
     return pipelines
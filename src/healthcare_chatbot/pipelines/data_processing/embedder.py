@@ -0,0 +1,221 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+from http import HTTPStatus
+
+import httpx
+import openai
+from langchain_core.embeddings import Embeddings
+
+from healthcare_chatbot.pipelines.data_processing.fetcher import RETRY_STATUSES
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in a text, at roughly four characters per token
+    for English text.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The estimated number of tokens.
+    """
+    return len(text) // 4 + 1
+
+
+def _status_code(error: Exception) -> int | None:
+    status_code = getattr(error, "status_code", None)
+    if status_code is None and getattr(error, "response", None) is not None:
+        status_code = getattr(error.response, "status_code", None)
+    return status_code
+
+
+def _retry_after(error: Exception) -> float | None:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is not None and retry_after.isdigit():
+        return float(retry_after)
+    return None
+
+
+class _AdaptiveLimiter:
+    """Caps the number of requests in flight, halving the cap and pausing every
+    request whenever one is rate limited, and growing the cap back by one with every
+    request that succeeds."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.limit = max_concurrency
+        self.in_flight = 0
+        self._resume_at = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        while (delay := self._resume_at - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self, rate_limited: bool = False, delay: float = 0) -> None:
+        async with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._resume_at = max(self._resume_at, time.monotonic() + delay)
+            else:
+                self.limit = min(self.max_concurrency, self.limit + 1)
+            self._condition.notify_all()
+
+
+class BatchEmbedder(Embeddings):
+    """Embeds large numbers of documents in batches, within the provider's limits.
+
+    The texts are packed into batches of at most ``max_tokens_per_batch`` estimated
+    tokens and ``max_texts_per_batch`` texts, and at most ``max_concurrency`` batches
+    are sent to the underlying model at once. A rate limited (429) batch halves the
+    number of batches in flight and pauses the others for the ``Retry-After`` of the
+    response or an exponential backoff, at most ``max_backoff`` seconds, and the
+    concurrency grows back as batches succeed. Other server and connection errors are
+    retried with the same backoff.
+
+    When the underlying model is a ``CachedEmbeddings`` with an on-disk tier, every
+    batch is saved as soon as it is embedded. A run which fails part way (the other
+    batches still run to completion first) therefore resumes from the cache on the
+    next run, only embedding the batches that were not done yet.
+    """
+
+    def __init__(  # noqa: PLR0913 - the batching parameters, passed by keyword
+        self,
+        underlying: Embeddings,
+        *,
+        max_tokens_per_batch: int = 20_000,
+        max_texts_per_batch: int = 512,
+        max_concurrency: int = 4,
+        retries: int = 6,
+        backoff: float = 1.0,
+        max_backoff: float = 60,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+    ):
+        """
+        Args:
+            underlying (Embeddings): The embedding model to embed the batches with.
+            max_tokens_per_batch (int): The maximum number of tokens in a batch. Defaults to 20,000.
+            max_texts_per_batch (int): The maximum number of texts in a batch. Defaults to 512.
+            max_concurrency (int): The maximum number of batches in flight. Defaults to 4.
+            retries (int): The number of times to retry a failed batch. Defaults to 6.
+            backoff (float): The delay before the first retry in seconds, doubling on every retry. Defaults to 1.
+            max_backoff (float): The longest delay before a retry in seconds, however long
+                the ``Retry-After`` header of the response asks to wait. Defaults to 60.
+            count_tokens (Callable[[str], int]): Counts the tokens in a text. Defaults to
+                ``estimate_tokens``.
+        """
+        self.underlying = underlying
+        self.max_tokens_per_batch = max_tokens_per_batch
+        self.max_texts_per_batch = max_texts_per_batch
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.count_tokens = count_tokens
+
+        self.requests = 0
+        self.rate_limited = 0
+
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        # The async clients of the underlying model hold connections bound to the
+        # event loop they were first used in, so every synchronous call is run on the
+        # same loop, in a background thread, rather than on a new one each time
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+            return self._loop
+
+    def batches(self, texts: list[str]) -> list[tuple[int, int]]:
+        """
+        Packs the texts into batches in order, within the token and text budgets. A
+        text over the token budget on its own is sent in a batch of its own.
+
+        Args:
+            texts (list[str]): The texts to embed.
+
+        Returns:
+            list[tuple[int, int]]: The start and end index of each batch.
+        """
+        batches, start, tokens = [], 0, 0
+        for i, text in enumerate(texts):
+            count = self.count_tokens(text)
+            if i > start and (
+                tokens + count > self.max_tokens_per_batch
+                or i - start == self.max_texts_per_batch
+            ):
+                batches.append((start, i))
+                start, tokens = i, 0
+            tokens += count
+        if start < len(texts):
+            batches.append((start, len(texts)))
+        return batches
+
+    def _is_retryable(self, error: Exception) -> bool:
+        return _status_code(error) in RETRY_STATUSES or isinstance(
+            error, (httpx.TransportError, openai.APIConnectionError)
+        )
+
+    async def _embed_batch(
+        self, texts: list[str], limiter: _AdaptiveLimiter
+    ) -> list[list[float]]:
+        for attempt in range(self.retries + 1):
+            await limiter.acquire()
+            try:
+                self.requests += 1
+                embeddings = await self.underlying.aembed_documents(texts)
+            except Exception as e:
+                if attempt == self.retries or not self._is_retryable(e):
+                    await limiter.release()
+                    raise
+                rate_limited = _status_code(e) == HTTPStatus.TOO_MANY_REQUESTS
+                self.rate_limited += rate_limited
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = self.backoff * 2**attempt
+                delay = min(delay, self.max_backoff)
+                await limiter.release(rate_limited, delay)
+                if not rate_limited:
+                    await asyncio.sleep(delay)
+            else:
+                await limiter.release()
+                return embeddings
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        limiter = _AdaptiveLimiter(self.max_concurrency)
+        results = await asyncio.gather(
+            *(
+                self._embed_batch(texts[start:end], limiter)
+                for start, end in self.batches(texts)
+            ),
+            # Let the other batches finish, and be cached, before raising
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return [embedding for batch in results for embedding in batch]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return asyncio.run_coroutine_threadsafe(
+            self.aembed_documents(texts), self._event_loop()
+        ).result()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.underlying.embed_query(text)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return await self.underlying.aembed_query(text)
@@ -0,0 +1,205 @@
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from http import HTTPStatus
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+# Responses worth retrying, everything else is returned (or raised) straight away
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class FetchedPage:
+    """A fetched web page.
+
+    Attributes:
+        url (str): The URL of the page.
+        html (str): The HTML of the page.
+        not_modified (bool): Whether the page was unchanged since it was last fetched,
+            in which case ``html`` was read from the cache.
+    """
+
+    url: str
+    html: str
+    not_modified: bool = False
+
+
+class WebsiteFetcher:
+    """Fetches web pages concurrently.
+
+    All the pages are fetched over one pool of connections, with at most
+    ``max_per_host`` requests in flight to the same host at once. Requests that fail
+    with a connection error or a retryable status are retried with exponential
+    backoff, or after the ``Retry-After`` delay of the response, waiting at most
+    ``max_backoff`` seconds. When a ``cache_dir`` is given, the ``ETag`` and ``Last-Modified`` headers
+    of every page are saved alongside its HTML and sent back on the next fetch, so a
+    page which has not changed costs a ``304 Not Modified`` instead of a full download.
+    """
+
+    def __init__(  # noqa: PLR0913 - the fetching parameters, passed by keyword
+        self,
+        cache_dir: str | None = None,
+        *,
+        max_per_host: int = 4,
+        max_connections: int = 16,
+        retries: int = 3,
+        backoff: float = 0.5,
+        max_backoff: float = 60,
+        timeout: float = 30,
+        headers: dict | None = None,
+    ):
+        """
+        Args:
+            cache_dir (str | None): The directory to cache the pages in, or None to
+                always fetch the full pages. Defaults to None.
+            max_per_host (int): The maximum number of concurrent requests per host. Defaults to 4.
+            max_connections (int): The maximum number of open connections. Defaults to 16.
+            retries (int): The number of times to retry a failed request. Defaults to 3.
+            backoff (float): The delay before the first retry in seconds, doubling on every retry. Defaults to 0.5.
+            max_backoff (float): The longest delay before a retry in seconds, however long
+                the ``Retry-After`` header of the response asks to wait. Defaults to 60.
+            timeout (float): The timeout of each request in seconds. Defaults to 30.
+            headers (dict | None): Extra headers to send with every request. Defaults to None.
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_per_host = max_per_host
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = {"User-Agent": "healthcare-chatbot", **(headers or {})}
+
+    def _cache_path(self, url: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(url.encode()).hexdigest()}.json"
+
+    def _read_cache(self, url: str) -> dict | None:
+        if self.cache_dir is None:
+            return None
+        try:
+            with open(self._cache_path(url)) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write_cache(self, url: str, response: httpx.Response) -> None:
+        if self.cache_dir is None:
+            return
+        validators = {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+        # Pages without validators can't be revalidated, so there is nothing to gain
+        if not any(validators.values()):
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._cache_path(url)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"url": url, "html": response.text, **validators}, f)
+        tmp.replace(path)
+
+    def _retry_delay(self, attempt: int, response: httpx.Response | None) -> float:
+        retry_after = response.headers.get("Retry-After") if response else None
+        if retry_after is not None and retry_after.isdigit():
+            return min(float(retry_after), self.max_backoff)
+        return min(self.backoff * 2**attempt, self.max_backoff)
+
+    async def _fetch(
+        self, client: httpx.AsyncClient, url: str, limiter: asyncio.Semaphore
+    ) -> FetchedPage:
+        cached = self._read_cache(url)
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        for attempt in range(self.retries + 1):
+            response = None
+            try:
+                async with limiter:
+                    response = await client.get(url, headers=headers)
+            except httpx.TransportError:
+                if attempt == self.retries:
+                    raise
+            else:
+                if (
+                    response.status_code == HTTPStatus.NOT_MODIFIED
+                    and cached is not None
+                ):
+                    return FetchedPage(url, cached["html"], not_modified=True)
+                if (
+                    response.status_code not in RETRY_STATUSES
+                    or attempt == self.retries
+                ):
+                    response.raise_for_status()
+                    self._write_cache(url, response)
+                    return FetchedPage(url, response.text)
+
+            await asyncio.sleep(self._retry_delay(attempt, response))
+
+    async def afetch(
+        self, urls: list[str], return_exceptions: bool = False
+    ) -> list[FetchedPage | Exception]:
+        """
+        Fetches web pages concurrently.
+
+        Args:
+            urls (list[str]): The URLs of the pages.
+            return_exceptions (bool): Whether to return the error of a page which could
+                not be fetched in place of the page, rather than raise it and give up on
+                the other pages. Defaults to False.
+
+        Returns:
+            list[FetchedPage | Exception]: The fetched pages, in the order of the URLs,
+                with the errors in place of the pages which failed if ``return_exceptions``.
+
+        Raises:
+            httpx.HTTPError: If a page could not be fetched, even after retrying, and
+                ``return_exceptions`` is False.
+        """
+        limiters = {
+            host: asyncio.Semaphore(self.max_per_host)
+            for host in {urlsplit(url).netloc for url in urls}
+        }
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections,
+        )
+
+        async with httpx.AsyncClient(
+            headers=self.headers,
+            limits=limits,
+            timeout=self.timeout,
+            follow_redirects=True,
+        ) as client:
+            return await asyncio.gather(
+                *(
+                    self._fetch(client, url, limiters[urlsplit(url).netloc])
+                    for url in urls
+                ),
+                return_exceptions=return_exceptions,
+            )
+
+    def fetch(
+        self, urls: list[str], return_exceptions: bool = False
+    ) -> list[FetchedPage | Exception]:
+        """
+        Fetches web pages concurrently, blocking until all of them are fetched.
+
+        Args:
+            urls (list[str]): The URLs of the pages.
+            return_exceptions (bool): Whether to return the error of a page which could
+                not be fetched in place of the page, see ``afetch``. Defaults to False.
+
+        Returns:
+            list[FetchedPage | Exception]: The fetched pages, in the order of the URLs.
+        """
+        return asyncio.run(self.afetch(urls, return_exceptions))
@@ -4,234 +4,232 @@ generated using Kedro 0.19.3
 """
 
 import glob
+import logging
 import os
+from collections.abc import Iterator
 from pathlib import Path
 
-import chromadb
-from chromadb.config import Settings
-from kedro.config import OmegaConfigLoader
-from kedro.framework.project import settings
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
-
+from healthcare_chatbot.pipelines.data_processing.fetcher import WebsiteFetcher
+from healthcare_chatbot.pipelines.data_processing.registry import SourceRegistry
+from healthcare_chatbot.pipelines.data_processing.streaming import prefetch
 from healthcare_chatbot.pipelines.data_processing.utils import (
+    CollectionSync,
     SourceType,
-    check_sources,
-    index_new_documents,
-    pdfs_to_docs,
-    update_json,
-    websites_to_docs,
+    iter_pdf_docs,
+    iter_website_docs,
+    mark_reindexed,
 )
+from healthcare_chatbot.snapshots import export_snapshot
+from healthcare_chatbot.vector_store import VectorStore
+
+logger = logging.getLogger(__name__)
 
 
-def index_websites(
+def index_websites(  # noqa: PLR0913, PLR0917 - Kedro passes one argument per input
     websites: list[str],
-    embedding_model_name: str,
+    fetcher_params: dict,
+    vector_store: VectorStore,
     db_params: dict,
     splitter_params: dict,
-) -> dict:
+    ingestion_params: dict,
+) -> Iterator[list[dict]]:
     """Indexes websites into a vector database.
 
-    This function takes a list of website URLs, an embedding model, vector database parameters,
-    and splitter parameters as input. It loads the OpenAI API key, creates an embedding model,
-    and loads vector database parameters. It then checks if the collection exists in the vector database.
-    If the collection does not exist, it creates the collection and indexes all documents.
-    If the collection exists, it checks for new documents to index into the collection.
-    It gets all the website URLs already in the collection, and from the websites,
-    it keeps those which do not already appear in the collection.
-    If there are new websites, it indexes them into the collection.
+    This function takes a list of website URLs, the vector store shared by the run, vector database
+    parameters, and splitter parameters as input. It fetches and splits the websites one at a time,
+    and syncs the chunks with the collection while the next websites are being fetched, creating
+    the collection if it does not exist yet.
+    Only new or edited chunks are embedded and added to the collection, chunks of edited
+    or removed websites are deleted, and unchanged chunks are skipped. A website which
+    could not be fetched is skipped and its chunks are kept, so a flaky website neither
+    fails the run nor drops out of the collection.
 
     Args:
         websites (list[str]): A list of website URLs to index.
-        embedding_model_name (str): The name of the embedding model to use.
-        db_params (dict): A dictionary containing the path and collection name of the vector database.
+        fetcher_params (dict): A dictionary containing the concurrency, retry and cache settings for fetching the websites.
+        vector_store (VectorStore): The collection and embedding model shared by the nodes of the run.
+        db_params (dict): A dictionary containing the paths of the source registry and version file.
         splitter_params (dict): A dictionary containing the chunk size and chunk overlap.
+        ingestion_params (dict): A dictionary containing the queue and upsert batch sizes.
 
-    Returns:
-        dict: A dictionary containing the split documents in a JSON serializable format.
-    """
-    conf_path = str(str(Path(os.getcwd()) / settings.CONF_SOURCE))
-    conf_loader = OmegaConfigLoader(conf_source=conf_path)
-    credentials = conf_loader["credentials"]
-
-    # Load the OpenAI API key
-    OPENAI_API_KEY = credentials["OPENAI_API_KEY"]
-    embedding_model = OpenAIEmbeddings(
-        model=embedding_model_name, openai_api_key=OPENAI_API_KEY
-    )
-
-    # Load vector database parameters
-    db_path = db_params["path"]
-    collection_name = db_params["collection_name"]
+    Yields:
+        list[dict]: The split documents of each website fetched in a JSON serializable
+            format. Nothing is yielded if no website could be fetched, which leaves the
+            documents of the previous run in place.
 
+    Raises:
+        RuntimeError: If no website could be fetched and none of them were indexed
+            before, so there are no documents of a previous run to leave in place.
+    """
     # Load splitter parameters
     chunk_size = splitter_params["chunk_size"]
     chunk_overlap = splitter_params["chunk_overlap"]
     separators = splitter_params["separators"]
 
-    client = chromadb.Client(
-        Settings(
-            is_persistent=True,
-            persist_directory=str(Path(os.getcwd()) / db_path),
-        )
-    )
-
-    # Check collections
-    collections = [collection.name for collection in client.list_collections()]
+    # Fetches the websites concurrently, revalidating previously fetched pages
+    fetcher = WebsiteFetcher(**fetcher_params)
 
-    # If collection doesn't exist, we create the collection and index all documents
-    if collection_name not in collections:
-        print(
-            f"Collection: {collection_name} does not exist. Creating collection and indexing all documents."
-        )
-
-        data_split, docs_dict = websites_to_docs(
-            websites, chunk_size, chunk_overlap, separators
-        )
-
-        _ = Chroma.from_documents(
-            data_split,
-            embedding_model,
-            collection_name=collection_name,
-            persist_directory=str(Path(os.getcwd()) / db_path),
-        )
-
-        print(f"Indexing {len(docs_dict)} documents from website(s).")
-
-        return docs_dict
+    # The websites are fetched and split while the previous ones are being indexed
+    website_docs = prefetch(
+        iter_website_docs(
+            websites, chunk_size, chunk_overlap, separators, fetcher=fetcher
+        ),
+        maxsize=ingestion_params["queue_size"],
+    )
 
-    # If the collection exists, we want to check if there are
-    # any new documents. If so, we want to add them to the collection
-    else:
-        print(
-            f"Collection: {collection_name} already exists. Checking for new documents to index into collection."
+    # Only the new and edited chunks are embedded
+    registry = SourceRegistry(str(Path(os.getcwd()) / db_params["registry_path"]))
+    try:
+        sync = CollectionSync(
+            vector_store.collection,
+            SourceType.WEBSITE,
+            vector_store.embedding_model,
+            registry,
+            batch_size=ingestion_params["batch_size"],
+            writing=vector_store.writing,
         )
-
-        # Check for new websites to index
-        collection, new_websites = check_sources(websites, client, collection_name)
-
-        # If there are new websites, index them into the collection
-        if new_websites is not None:
-            docs_dict = index_new_documents(
-                new_websites,
-                SourceType.WEBSITE,
-                collection,
-                chunk_size,
-                chunk_overlap,
-                separators,
-                embedding_model_name,
-                OPENAI_API_KEY,
+        fetched, failed = 0, 0
+        for website, data_split in website_docs:
+            # The chunks of a website which could not be fetched stay indexed
+            if data_split is None:
+                sync.keep(website)
+                failed += 1
+                continue
+
+            sync.add(website, data_split)
+            fetched += 1
+            # Convert to JSON serializable format, written out one website at a time.
+            # The first website replaces the documents of the previous run.
+            yield [dict(ds) for ds in data_split]
+        added, deleted, unchanged = sync.finish()
+
+        # Kedro would otherwise fail later on, in the nodes loading the documents
+        if failed and not fetched and not registry.lookup(websites):
+            raise RuntimeError(
+                f"None of the {failed} website(s) could be fetched and none of them "
+                "were indexed before, so there are no website documents to save. Check "
+                "the network connection and the fetcher parameters, and run the "
+                "pipeline again."
             )
+    finally:
+        registry.close()
+    logger.info(
+        f"Indexed {added} new, deleted {deleted} stale and skipped {unchanged} "
+        "unchanged chunks from website(s)."
+    )
+    if failed:
+        logger.warning(
+            f"Kept the chunks of {failed} website(s) which could not be fetched."
+        )
 
-            print(f"Indexing {len(docs_dict)} documents from website(s).")
-
-            return docs_dict
-
-        # If there aren't any new websites to index, we can skip to avoid repeated indexing
-        else:
-            print(f"No new documents to index for websites.")
+    # Replaces the previous documents if there are no websites to index at all
+    if not fetched and not failed:
+        yield []
 
-            docs_dict = update_json(SourceType.WEBSITE)
-            return docs_dict
+    if added or deleted:
+        mark_reindexed(str(Path(os.getcwd()) / db_params["version_file"]))
 
 
-def index_pdfs(
-    dir_path: str, embedding_model_name: str, db_params: dict, splitter_params: dict
-) -> dict:
+def index_pdfs(  # noqa: PLR0913, PLR0917 - Kedro passes one argument per input
+    dir_path: str,
+    pdf_parsing_params: dict,
+    vector_store: VectorStore,
+    db_params: dict,
+    splitter_params: dict,
+    ingestion_params: dict,
+) -> Iterator[list[dict]]:
     """
     Indexes PDFs into a vector database collection.
 
+    The PDFs are parsed and split one at a time, and their chunks are synced with the
+    collection while the next PDFs are being parsed, so memory stays flat however many
+    PDFs there are. Only new or edited chunks are embedded and added to the collection,
+    chunks of edited or removed PDFs are deleted, and unchanged chunks are skipped.
+
     Args:
         dir_path (str): The directory path containing the PDFs to be indexed.
-        embedding_model_name (str): The name of the embedding model to be used.
+        pdf_parsing_params (dict): The number of worker processes and chunksize to parse the PDFs with.
+        vector_store (VectorStore): The collection and embedding model shared by the nodes of the run.
         db_params (dict): The parameters for the vector database collection.
         splitter_params (dict): The parameters for splitting the PDFs into chunks.
+        ingestion_params (dict): The queue and upsert batch sizes of the ingestion.
 
-    Returns:
-        dict: A dictionary containing information about the indexed PDFs.
+    Yields:
+        list[dict]: The split documents of each PDF in a JSON serializable format.
     """
-    conf_path = str(str(Path(os.getcwd()) / settings.CONF_SOURCE))
-    conf_loader = OmegaConfigLoader(conf_source=conf_path)
-    credentials = conf_loader["credentials"]
-
-    # Load the OpenAI API key
-    OPENAI_API_KEY = credentials["OPENAI_API_KEY"]
-    embedding_model = OpenAIEmbeddings(
-        model=embedding_model_name, openai_api_key=OPENAI_API_KEY
-    )
-
-    # Load vector database parameters
-    db_path = db_params["path"]
-    collection_name = db_params["collection_name"]
-
     # Load splitter parameters
     chunk_size = splitter_params["chunk_size"]
     chunk_overlap = splitter_params["chunk_overlap"]
     separators = splitter_params["separators"]
 
     # Load all the PDF paths
-    pdfs_paths = glob.glob(os.path.join(dir_path, "*.pdf"))
-
-    client = chromadb.Client(
-        Settings(
-            is_persistent=True,
-            persist_directory=str(Path(os.getcwd()) / db_path),
-        )
+    pdfs_paths = sorted(glob.glob(os.path.join(dir_path, "*.pdf")))
+
+    # The PDFs are parsed and split while the previous ones are being indexed
+    pdf_docs = prefetch(
+        iter_pdf_docs(
+            pdfs_paths, chunk_size, chunk_overlap, separators, **pdf_parsing_params
+        ),
+        maxsize=ingestion_params["queue_size"],
     )
 
-    # Check collections
-    collections = [collection.name for collection in client.list_collections()]
-
-    if collection_name not in collections:
-        print(
-            f"Collection: {collection_name} does not exist. Creating collection and indexing all documents."
-        )
-
-        all_data_splits, pdfs_dict = pdfs_to_docs(
-            pdfs_paths, chunk_size, chunk_overlap, separators
-        )
-
-        _ = Chroma.from_documents(
-            all_data_splits,
-            embedding_model,
-            collection_name=collection_name,
-            persist_directory=str(Path(os.getcwd()) / db_path),
+    # Only the new and edited chunks are embedded
+    registry = SourceRegistry(str(Path(os.getcwd()) / db_params["registry_path"]))
+    try:
+        sync = CollectionSync(
+            vector_store.collection,
+            SourceType.PDF,
+            vector_store.embedding_model,
+            registry,
+            batch_size=ingestion_params["batch_size"],
+            writing=vector_store.writing,
         )
+        # Replaces the previous documents, even if there are no PDFs to index
+        yield []
+        for pdf_path, data_split in pdf_docs:
+            sync.add(pdf_path, data_split)
+            # Convert to JSON serializable format, written out one PDF at a time
+            yield [dict(ds) for ds in data_split]
+        added, deleted, unchanged = sync.finish()
+    finally:
+        registry.close()
+    logger.info(
+        f"Indexed {added} new, deleted {deleted} stale and skipped {unchanged} "
+        "unchanged chunks from PDF(s)."
+    )
 
-        print(f"Indexing {len(pdfs_dict)} documents from PDF(s).")
-
-        return pdfs_dict
+    if added or deleted:
+        mark_reindexed(str(Path(os.getcwd()) / db_params["version_file"]))
 
-    # If the collection exists, we want to check if there are
-    # any new documents. If so, we want to add them to the collection
-    else:
-        print(
-            f"Collection: {collection_name} already exists. Checking for new documents to index into collection."
-        )
 
-        # Check for new PDFs to index
-        collection, new_pdfs = check_sources(pdfs_paths, client, collection_name)
-
-        # If there are new PDFs, index them into the collection
-        if new_pdfs is not None:
-            pdfs_dict = index_new_documents(
-                new_pdfs,
-                SourceType.PDF,
-                collection,
-                chunk_size,
-                chunk_overlap,
-                separators,
-                embedding_model_name,
-                OPENAI_API_KEY,
-            )
+def snapshot_collection(
+    vector_store: VectorStore,
+    db_params: dict,
+    docs_dict: Iterator[dict],
+    pdfs_dict: Iterator[dict],
+) -> None:
+    """
+    Exports a read-only snapshot of the vector database collection for the application.
 
-            print(f"Indexing {len(pdfs_dict)} documents from PDF(s).")
+    This function runs once both the websites and the PDFs have been indexed, which is
+    why it takes their documents as inputs. The application workers memory-map the
+    latest snapshot when the ``serving.retriever.backend`` parameter is ``snapshot``
+    and swap over to the new one on their next search.
 
-            return pdfs_dict
+    Args:
+        vector_store (VectorStore): The collection shared by the nodes of the run.
+        db_params (dict): The parameters for the vector database collection and its snapshots.
+        docs_dict (Iterator[dict]): The documents indexed from the websites, loaded lazily.
+        pdfs_dict (Iterator[dict]): The documents indexed from the PDFs, loaded lazily.
+    """
+    collection = vector_store.collection
 
-        # If there aren't any new PDFs to index, we can skip to avoid repeated indexing
-        else:
-            print(f"No new documents to index for PDFs.")
+    snapshot_path = export_snapshot(
+        collection,
+        str(Path(os.getcwd()) / db_params["snapshot_dir"]),
+        keep=db_params["snapshots_to_keep"],
+    )
 
-            pdfs_dict = update_json(SourceType.PDF)
-            return pdfs_dict
+    logger.info(
+        f"Exported a snapshot of {collection.count()} chunks to {snapshot_path}."
+    )
@@ -0,0 +1,206 @@
+import re
+import unicodedata
+
+# The bytes of UTF-8 which only ever follow the first byte of a character
+_CONTINUATION_BYTES = range(0x80, 0xC0)
+
+
+def _single_byte_table(*encodings: str) -> dict[str, int]:
+    # Maps every non-ASCII character of the encodings back to its byte
+    table = {}
+    for encoding in encodings:
+        for byte in range(0x80, 0x100):
+            char = bytes([byte]).decode(encoding, errors="ignore")
+            if char:
+                table.setdefault(char, byte)
+    return table
+
+
+# UTF-8 text decoded as Windows-1252 (or Latin-1, which leaves the C1 control
+# characters in), e.g. "â€™" for "’", and as Mac OS Roman, e.g. "√ü" for "ß". Mac
+# OS Roman is only matched from the leads of the most common characters, as its
+# other leads include quotes and dashes which are legitimate text.
+_MOJIBAKE_TABLES = [
+    (_single_byte_table("cp1252", "latin_1"), range(0xC2, 0xF5)),
+    (_single_byte_table("mac_roman"), [0xC2, 0xC3, 0xE2]),
+]
+# A lead byte followed by continuation bytes in any of the encodings
+_MOJIBAKE = re.compile(
+    "[{}][{}]{{1,3}}".format(
+        "".join(
+            re.escape(char)
+            for table, leads in _MOJIBAKE_TABLES
+            for char, byte in table.items()
+            if byte in leads
+        ),
+        "".join(
+            re.escape(char)
+            for table, _ in _MOJIBAKE_TABLES
+            for char, byte in table.items()
+            if byte in _CONTINUATION_BYTES
+        ),
+    )
+)
+# The mojibake of the most common characters, e.g. "Ã©" for "é", "Â\xa0" for a
+# non-breaking space, "â€™" for "’", "Î¼" for "μ" and their Mac OS Roman versions
+# "√©" and "‚Äô". Only the candidates starting with one of them are repaired, as
+# valid text like "ß®" can decode as UTF-8 too.
+_MOJIBAKE_MARKERS = ("Ã", "Â", "â€", "â\x80", "Î¼", "√", "‚Ä")
+
+# The compatibility characters replaced with their plain equivalents, leaving alone
+# the ones which carry meaning in medical text, like "10⁹/L", "mg/m²", "CO₂" or "µg"
+_COMPATIBILITY = {
+    # Ligatures
+    "ﬀ": "ff",
+    "ﬁ": "fi",
+    "ﬂ": "fl",
+    "ﬃ": "ffi",
+    "ﬄ": "ffl",
+    "ﬅ": "st",
+    "ﬆ": "st",
+    # Non-breaking and fixed width spaces
+    "\xa0": " ",
+    "\u2007": " ",
+    "\u202f": " ",
+    "\u3000": " ",
+    # Fullwidth forms of the ASCII characters, e.g. "Ｈｂ" for "Hb"
+    **{chr(code): chr(code - 0xFEE0) for code in range(0xFF01, 0xFF5F)},
+}
+# Looking the characters up with a pattern is much faster than str.translate, as
+# most texts have none of them
+_COMPATIBILITY_CHARACTER = re.compile(
+    "[{}]".format("".join(re.escape(char) for char in _COMPATIBILITY))
+)
+
+# A line break after a hyphen, see ``_merge_hyphenated_words``
+_HYPHENATED_LINE_BREAK = re.compile(r"-\n(?=\w)")
+_WORD_CHARACTER = re.compile(r"\w")
+_WORD = re.compile(r"\w+")
+# Newlines in the middle of sentences, using a negative look behind and look ahead.
+# The newline comes first, so the pattern is only tried at newlines.
+_SENTENCE_LINE_BREAK = re.compile(r"\n(?!\n\s)(?<!\n\s\n)")
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+def _decode_mojibake(text: str) -> tuple[str, int]:
+    # Decodes the longest valid UTF-8 sequence at the start of a candidate, returning
+    # it with the number of characters it replaces, or 0 if there is none
+    for table, leads in _MOJIBAKE_TABLES:
+        if table.get(text[0]) not in leads or not all(c in table for c in text):
+            continue
+        encoded = bytes(table[c] for c in text)
+        for end in range(len(encoded), 1, -1):
+            try:
+                return encoded[:end].decode("utf-8"), end
+            except UnicodeDecodeError:
+                continue
+    return "", 0
+
+
+def _merge_hyphenated_words(text: str) -> str:
+    # Same as re.sub(r"(\w+)-\n(\w+)", r"\1\2", text) but only tried at the hyphens
+    # instead of at every character. That pattern consumes the word after a merged
+    # line break, so in a chain like "a-\nb-\nc" the second line break is kept.
+    merged_end = None
+
+    def merge(match: re.Match) -> str:
+        nonlocal merged_end
+        start = match.start()
+        if start == 0 or not _WORD_CHARACTER.match(text, start - 1):
+            return match[0]
+        if merged_end is not None and _WORD.fullmatch(text, merged_end, start):
+            return match[0]
+        merged_end = match.end()
+        return ""
+
+    return _HYPHENATED_LINE_BREAK.sub(merge, text)
+
+
+def fix_mojibake(text: str) -> str:
+    """
+    Fixes UTF-8 text which was decoded with a single byte encoding, like "Ã©" or
+    "√©" for "é". Only sequences which start like the mojibake of common characters
+    and decode to valid UTF-8 are replaced, so text which merely contains the same
+    characters is left alone.
+
+    Args:
+        text (str): The text to fix.
+
+    Returns:
+        str: The text with the mojibake replaced by the intended characters.
+    """
+    if text.isascii() or not any(marker in text for marker in _MOJIBAKE_MARKERS):
+        return text
+    parts, pos = [], 0
+    while match := _MOJIBAKE.search(text, pos):
+        decoded, length = _decode_mojibake(match[0])
+        if length and match[0][:length].startswith(_MOJIBAKE_MARKERS):
+            parts += [text[pos : match.start()], decoded]
+            pos = match.start() + length
+        else:
+            # The next candidate may start within this one
+            parts.append(text[pos : match.start() + 1])
+            pos = match.start() + 1
+    parts.append(text[pos:])
+    return "".join(parts)
+
+
+def normalize_unicode(text: str) -> str:
+    """
+    Fixes mojibake, replaces ligatures like "ﬁ", non-breaking spaces and fullwidth
+    forms with their plain equivalents and applies the NFC normal form, so the same
+    words always produce the same chunks. Unlike NFKC, superscripts, subscripts and
+    symbols like "µ" are kept as they are.
+
+    Args:
+        text (str): The text to normalize.
+
+    Returns:
+        str: The normalized text. ASCII text is returned unchanged.
+    """
+    if text.isascii():
+        return text
+    text = _COMPATIBILITY_CHARACTER.sub(
+        lambda match: _COMPATIBILITY[match[0]], fix_mojibake(text)
+    )
+    if unicodedata.is_normalized("NFC", text):
+        return text
+    return unicodedata.normalize("NFC", text)
+
+
+def clean_web_text(text: str) -> str:
+    """
+    Normalizes the text of a web page and collapses all its whitespace into single
+    spaces.
+
+    Args:
+        text (str): The text of the web page.
+
+    Returns:
+        str: The cleaned text.
+    """
+    # Splits on the same whitespace as re.sub(r"\s+", " ", text).strip()
+    return " ".join(normalize_unicode(text).split())
+
+
+def clean_pdf_text(text: str) -> str:
+    """
+    Normalizes the text extracted from a PDF page, merges words hyphenated across
+    lines, joins lines broken in the middle of sentences and collapses blank lines
+    into paragraph breaks.
+
+    Text which needs no normalizing comes out the same as from the three ``re.sub``
+    passes this used to take, but each pattern starts with a literal character, so it
+    is only tried where that character is rather than at every character of the page,
+    and the hyphenated words are only looked for on pages with hyphenated line breaks.
+
+    Args:
+        text (str): The text extracted from a PDF page.
+
+    Returns:
+        str: The cleaned text.
+    """
+    text = normalize_unicode(text).strip()
+    if "-\n" in text:
+        text = _merge_hyphenated_words(text)
+    return _BLANK_LINES.sub("\n\n", _SENTENCE_LINE_BREAK.sub(" ", text))
@@ -8,6 +8,7 @@ from kedro.pipeline import Pipeline, node, pipeline
 from healthcare_chatbot.pipelines.data_processing.nodes import (
     index_pdfs,
     index_websites,
+    snapshot_collection,
 )
 
 
@@ -18,9 +19,11 @@ def create_pipeline(**kwargs) -> Pipeline:
                 func=index_websites,
                 inputs=[
                     "params:websites",
-                    "params:embedding_model_name",
+                    "params:fetcher",
+                    "vector_store",
                     "params:vector_db",
                     "params:splitter",
+                    "params:ingestion",
                 ],
                 outputs="docs_dict",
                 name="index_websites_node",
@@ -29,12 +32,20 @@ def create_pipeline(**kwargs) -> Pipeline:
                 func=index_pdfs,
                 inputs=[
                     "params:pdfs_dir_path",
-                    "params:embedding_model_name",
+                    "params:pdf_parsing",
+                    "vector_store",
                     "params:vector_db",
                     "params:splitter",
+                    "params:ingestion",
                 ],
                 outputs="pdfs_dict",
                 name="index_pdfs_node",
             ),
+            node(
+                func=snapshot_collection,
+                inputs=["vector_store", "params:vector_db", "docs_dict", "pdfs_dict"],
+                outputs=None,
+                name="snapshot_collection_node",
+            ),
         ]
     )
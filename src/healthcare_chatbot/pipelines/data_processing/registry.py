@@ -0,0 +1,148 @@
+import json
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+
+@dataclass
+class SourceRecord:
+    """The indexed state of a source.
+
+    Attributes:
+        source (str): The URL or path of the source.
+        source_type (str): The type of the source, see ``SourceType``.
+        content_hash (str): The hash of the chunks of the source.
+        chunk_ids (list[str]): The IDs of the chunks of the source in the collection.
+        indexed_at (float): The time the source was last indexed, in seconds since the epoch.
+    """
+
+    source: str
+    source_type: str
+    content_hash: str
+    chunk_ids: list[str] = field(default_factory=list)
+    indexed_at: float = field(default_factory=time.time)
+
+
+class SourceRegistry:
+    """A registry of the sources indexed into the collection, stored next to it.
+
+    Keeps the chunk IDs and content hash of every source in an SQLite table keyed by
+    source, so which sources are new, changed or removed is answered with lookups of
+    the input sources rather than by scanning every chunk in the collection.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): The path to the SQLite database.
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "source TEXT PRIMARY KEY, source_type TEXT NOT NULL, "
+            "content_hash TEXT NOT NULL, chunk_ids TEXT NOT NULL, "
+            "indexed_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS sources_source_type ON sources (source_type)"
+        )
+        self._connection.commit()
+
+    def close(self) -> None:
+        """Closes the connection to the database."""
+        self._connection.close()
+
+    def lookup(self, sources: list[str]) -> dict[str, SourceRecord]:
+        """
+        Looks up the records of the given sources.
+
+        Args:
+            sources (list[str]): The sources to look up.
+
+        Returns:
+            dict[str, SourceRecord]: The records of the sources which are registered, keyed by source.
+        """
+        records = {}
+        # Stay well under SQLite's limit on the number of bound parameters
+        for i in range(0, len(sources), 500):
+            batch = sources[i : i + 500]
+            rows = self._connection.execute(
+                "SELECT source, source_type, content_hash, chunk_ids, indexed_at "
+                f"FROM sources WHERE source IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            for source, source_type, content_hash, chunk_ids, indexed_at in rows:
+                records[source] = SourceRecord(
+                    source, source_type, content_hash, json.loads(chunk_ids), indexed_at
+                )
+        return records
+
+    def sources_of_type(self, source_type: str) -> list[str]:
+        """
+        Gets all the registered sources of a type.
+
+        Args:
+            source_type (str): The type of the sources.
+
+        Returns:
+            list[str]: The registered sources of the type.
+        """
+        rows = self._connection.execute(
+            "SELECT source FROM sources WHERE source_type = ?", (source_type,)
+        )
+        return [source for (source,) in rows]
+
+    def update(self, records: list[SourceRecord]) -> None:
+        """
+        Registers the records, replacing the existing records of the same sources.
+
+        Args:
+            records (list[SourceRecord]): The records to register.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO sources "
+                "(source, source_type, content_hash, chunk_ids, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        record.source,
+                        record.source_type,
+                        record.content_hash,
+                        json.dumps(record.chunk_ids),
+                        record.indexed_at,
+                    )
+                    for record in records
+                ],
+            )
+
+    def remove(self, sources: list[str]) -> None:
+        """
+        Removes the records of the given sources.
+
+        Args:
+            sources (list[str]): The sources to remove.
+        """
+        with self._connection:
+            self._connection.executemany(
+                "DELETE FROM sources WHERE source = ?", [(s,) for s in sources]
+            )
+
+    def clear(self, source_type: str | None = None) -> None:
+        """
+        Removes all the records, or only those of a source type.
+
+        Args:
+            source_type (str | None): The type of the sources to remove. Defaults to None, removing every source.
+        """
+        with self._connection:
+            if source_type is None:
+                self._connection.execute("DELETE FROM sources")
+            else:
+                self._connection.execute(
+                    "DELETE FROM sources WHERE source_type = ?", (source_type,)
+                )
@@ -0,0 +1,152 @@
+import queue
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+class _Error:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def _map_chunk(func: Callable[[T], R], items: list[T]) -> list[R]:
+    return [func(item) for item in items]
+
+
+def bounded_map(
+    executor: Executor,
+    func: Callable[[T], R],
+    items: list[T],
+    chunksize: int = 1,
+    window: int = 2,
+) -> Iterator[R]:
+    """
+    Maps a function over items in an executor, yielding the results in the order of
+    the items like ``Executor.map``. Unlike ``Executor.map``, which submits all the
+    items straight away, at most ``window`` chunks of items are in flight at once, so
+    the results never pile up faster than they are consumed.
+
+    Args:
+        executor (Executor): The executor to run the function in.
+        func (Callable[[T], R]): The function to map. Must be picklable for a process pool.
+        items (list[T]): The items to map the function over.
+        chunksize (int): The number of items handed to the executor at a time. Defaults to 1.
+        window (int): The maximum number of chunks in flight. Defaults to 2.
+
+    Yields:
+        R: The result of the function for each item.
+    """
+    pending = deque()
+    for i in range(0, len(items), chunksize):
+        pending.append(executor.submit(_map_chunk, func, items[i : i + chunksize]))
+        if len(pending) >= window:
+            yield from pending.popleft().result()
+    while pending:
+        yield from pending.popleft().result()
+
+
+def prefetch(iterable: Iterable[T], maxsize: int = 8) -> Iterator[T]:
+    """
+    Iterates over an iterable in a background thread, staying at most ``maxsize``
+    items ahead of the consumer, so producing the next items overlaps with consuming
+    the previous ones without ever buffering more than ``maxsize`` of them.
+
+    Exceptions raised by the iterable are raised to the consumer. If the consumer
+    stops early, the background thread stops at the next item.
+
+    Args:
+        iterable (Iterable[T]): The iterable to iterate over.
+        maxsize (int): The maximum number of items buffered. Defaults to 8.
+
+    Yields:
+        T: The items of the iterable, in order.
+    """
+    items = queue.Queue(maxsize)
+    stopped = threading.Event()
+
+    def put(item: Any) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_Error(e))
+        else:
+            put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while (item := items.get()) is not _DONE:
+            if isinstance(item, _Error):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+
+
+class BackgroundWorker:
+    """Runs a function over the submitted items in a background thread, one at a time
+    and in order. At most ``maxsize`` items wait to be processed, after which
+    ``submit`` blocks, so a fast producer is held back by a slow consumer instead of
+    buffering everything in memory.
+
+    An exception raised by the function is raised by the next call to ``submit`` or
+    ``close``, and the remaining items are discarded.
+    """
+
+    def __init__(self, func: Callable[[T], Any], maxsize: int = 2):
+        """
+        Args:
+            func (Callable[[T], Any]): The function to process each item with.
+            maxsize (int): The maximum number of items waiting. Defaults to 2.
+        """
+        self.func = func
+        self._items = queue.Queue(maxsize)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while (item := self._items.get()) is not _DONE:
+            if self._error is not None:
+                continue
+            try:
+                self.func(item)
+            except BaseException as e:
+                self._error = e
+
+    def _raise(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, item: T) -> None:
+        """
+        Queues an item to be processed, blocking while the queue is full.
+
+        Args:
+            item (T): The item to process.
+        """
+        self._raise()
+        self._items.put(item)
+
+    def close(self) -> None:
+        """Waits for all the queued items to be processed."""
+        self._items.put(_DONE)
+        self._thread.join()
+        self._raise()
@@ -1,22 +1,50 @@
-import re
-import uuid
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+from collections.abc import Callable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import AbstractContextManager, ExitStack, nullcontext
 from enum import Enum
+from functools import partial
 from io import BytesIO
 from pathlib import Path
 
 import chromadb
-from chromadb.api.client import Client
-from chromadb.utils import embedding_functions
-from kedro.framework.session import KedroSession
+from bs4 import BeautifulSoup
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import WebBaseLoader
+from langchain_community.document_loaders.web_base import _build_metadata
 from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
 from pypdf import PdfReader
 from tqdm import tqdm
 
+from healthcare_chatbot.pipelines.data_processing.fetcher import WebsiteFetcher
+from healthcare_chatbot.pipelines.data_processing.normalize import (
+    clean_pdf_text,
+    clean_web_text,
+)
+from healthcare_chatbot.pipelines.data_processing.registry import (
+    SourceRecord,
+    SourceRegistry,
+)
+from healthcare_chatbot.pipelines.data_processing.streaming import (
+    BackgroundWorker,
+    bounded_map,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class SourceType(Enum):
+    WEBSITE = "website"
+    PDF = "pdf"
+
 
 def strip_content(page_content: str) -> str:
-    """A function that strips excess whitespace from the input page content.
+    """A function that normalizes and strips excess whitespace from the input page content.
 
     Args:
         page_content (str): The content of the page to strip whitespace from.
@@ -24,18 +52,84 @@ def strip_content(page_content: str) -> str:
     Returns:
         str: he page content with excess whitespace removed.
     """
-    new_content = re.sub("\s+", " ", page_content).strip()
-    return new_content
+    return clean_web_text(page_content)
+
+
+def iter_website_docs(  # noqa: PLR0913 - the fetching options by keyword
+    websites: list[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: list[str],
+    *,
+    fetcher: WebsiteFetcher | None = None,
+    window: int = 64,
+) -> Iterator[tuple[str, list[Document] | None]]:
+    """
+    Loads the content of each website, strips excess whitespace from the content and
+    splits the content into chunks, one website at a time.
+
+    The websites are fetched concurrently ``window`` at a time, so only the pages of
+    one window are held in memory at once. A website which could not be fetched, even
+    after retrying, is reported and skipped rather than failing the other websites.
+
+    Args:
+        websites (list[str]): A list of website URLs to index.
+        chunk_size (int): The maximum length of each chunk.
+        chunk_overlap (int): The number of characters that each chunk overlaps with
+            the previous and next chunk.
+        separators (list[str]): A list of strings that are used to separate the content
+            into chunks.
+        fetcher (WebsiteFetcher | None): The fetcher to load the websites concurrently with,
+            or None to use a fetcher with the default settings. Defaults to None.
+        window (int): The number of websites fetched at a time. Defaults to 64.
+
+    Yields:
+        tuple[str, list[Document] | None]: The URL of each website and its document
+            chunks, or None if it could not be fetched, in the order of the websites.
+    """
+    fetcher = fetcher or WebsiteFetcher()
+
+    # Define text chunk strategy
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=separators
+    )
+
+    for i in range(0, len(websites), window):
+        urls = websites[i : i + window]
+        for url, page in zip(urls, fetcher.fetch(urls, return_exceptions=True)):
+            if isinstance(page, Exception):
+                logger.warning(f"Skipped {url}, which could not be fetched: {page!r}")
+                yield url, None
+                continue
+
+            # Parsed the same way as LangChain's WebBaseLoader, with the same metadata
+            soup = BeautifulSoup(page.html, "html.parser")
+            doc = Document(
+                page_content=strip_content(soup.get_text()),
+                metadata={
+                    **_build_metadata(soup, page.url),
+                    "source_type": SourceType.WEBSITE.value,
+                },
+            )
+            # Split documents into chunks
+            yield page.url, splitter.split_documents([doc])
 
 
 def websites_to_docs(
-    websites: list[str], chunk_size: int, chunk_overlap: int, separators: list[str]
+    websites: list[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: list[str],
+    fetcher: WebsiteFetcher | None = None,
 ) -> tuple[list[Document], dict]:
     """
     Indexes websites into a vector database by loading the content of each website,
     stripping excess whitespace from the content, splitting the content into chunks,
     and converting the resulting documents into a JSON serializable format.
 
+    Holds all the chunks in memory, see ``iter_website_docs`` to process the websites
+    one at a time instead.
+
     Args:
         websites (list[str]): A list of website URLs to index.
         chunk_size (int): The maximum length of each chunk.
@@ -43,25 +137,21 @@ def websites_to_docs(
             the previous and next chunk.
         separators (list[str]): A list of strings that are used to separate the content
             into chunks.
+        fetcher (WebsiteFetcher | None): The fetcher to load the websites concurrently with,
+            or None to use a fetcher with the default settings. Defaults to None.
 
     Returns:
         tuple[list[Document], dict]: A tuple containing two elements:
             - A list of Document objects representing the split documents.
             - A dictionary representing the split documents in a JSON serializable format.
     """
-    loader = WebBaseLoader(websites)
-    data = loader.load()
-
-    for d in data:
-        new_content = strip_content(d.page_content)
-        d.page_content = new_content
-
-    # Define text chunk strategy
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=separators
-    )
-    # Split documents into chunks
-    data_split = splitter.split_documents(data)
+    data_split = [
+        ds
+        for _, docs in iter_website_docs(
+            websites, chunk_size, chunk_overlap, separators, fetcher=fetcher
+        )
+        for ds in docs or []
+    ]
     # Convert to JSON serializable format
     docs_dict = [dict(ds) for ds in data_split]
 
@@ -84,14 +174,9 @@ def parse_pdf(file: BytesIO) -> tuple[list[str], BytesIO]:
     pdf = PdfReader(source)
     output = []
     for page in pdf.pages:
-        text = page.extract_text()
-        # Merge hyphenated words
-        text = re.sub(r"(\w+)-\n(\w+)", r"\1\2", text)
-        # Fix newlines in the middle of sentences (use negative look behind and look ahead)
-        text = re.sub(r"(?<!\n\s)\n(?!\n\s)", " ", text.strip())
-        # Remove multiple newlines
-        text = re.sub(r"\n\s*\n", "\n\n", text)
-        output.append(text)
+        # Normalize, merge hyphenated words, fix newlines in the middle of sentences
+        # and remove multiple newlines
+        output.append(clean_pdf_text(page.extract_text()))
 
     return output, source
 
@@ -140,209 +225,369 @@ def text_to_docs(
     return data_split
 
 
-def pdfs_to_docs(
-    pdfs_paths: list[str], chunk_size: int, chunk_overlap: int, separators: list[str]
-) -> tuple[list[Document], dict]:
+def pdf_to_docs(
+    pdf_path: str, chunk_size: int, chunk_overlap: int, separators: list[str]
+) -> list[Document]:
     """
-    Converts a list of PDF paths into a list of Document objects and a dictionary of JSON serializable data.
+    Parses a PDF file and splits its text into a list of Document objects.
 
     Args:
-        pdfs_paths (list[str]): A list of paths to PDF files.
+        pdf_path (str): The path to the PDF file.
         chunk_size (int): The maximum size of each chunk in characters.
         chunk_overlap (int): The number of characters to overlap between chunks.
         separators (list[str]): A list of strings to use as separators between chunks.
 
     Returns:
-        tuple[list[Document], dict]: A tuple containing a list of Document objects and a dictionary of JSON serializable data.
-            - The list of Document objects contains the parsed and split text from each PDF file.
-            - The dictionary of JSON serializable data contains the same information as the list of Document objects, but in a JSON serializable format.
+        list[Document]: The parsed and split text of the PDF file.
     """
-    all_data_splits = []
+    output, source = parse_pdf(pdf_path)
+    return text_to_docs(output, source, chunk_size, chunk_overlap, separators)
 
-    t = tqdm(pdfs_paths)
-
-    for pdf_path in t:
-        t.set_description("Parsing and splitting PDF into document chunks")
-        output, source = parse_pdf(pdf_path)
-        data_split = text_to_docs(output, source, chunk_size, chunk_overlap, separators)
-        all_data_splits.extend(data_split)
 
-    # Convert to JSON serializable format
-    pdfs_dict = [dict(ds) for ds in all_data_splits]
+def iter_pdf_docs(  # noqa: PLR0913 - the parsing options by keyword
+    pdfs_paths: list[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: list[str],
+    *,
+    workers: int | None = 1,
+    chunksize: int = 1,
+) -> Iterator[tuple[str, list[Document]]]:
+    """
+    Parses and splits PDFs into Document objects, one PDF at a time.
 
-    return all_data_splits, pdfs_dict
+    Extracting the text of a PDF is CPU-bound, so with more than one worker the PDFs are
+    parsed and split in a pool of processes. At most two chunks of PDFs per worker are
+    in flight at once, so the parsed PDFs never pile up faster than they are consumed.
+    The documents are yielded in the order of the PDF paths either way.
 
+    Args:
+        pdfs_paths (list[str]): A list of paths to PDF files.
+        chunk_size (int): The maximum size of each chunk in characters.
+        chunk_overlap (int): The number of characters to overlap between chunks.
+        separators (list[str]): A list of strings to use as separators between chunks.
+        workers (int | None): The number of processes to parse the PDFs in, or None to use
+            one per CPU. Defaults to 1, which parses the PDFs in the current process.
+        chunksize (int): The number of PDFs handed to a process at a time. Defaults to 1.
 
-class SourceType(Enum):
-    WEBSITE = "website"
-    PDF = "pdf"
+    Yields:
+        tuple[str, list[Document]]: The path of each PDF and its document chunks.
+    """
+    parse = partial(
+        pdf_to_docs,
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=separators,
+    )
+    workers = min(workers or os.cpu_count() or 1, max(len(pdfs_paths), 1))
+
+    with ExitStack() as stack:
+        if workers > 1:
+            executor = stack.enter_context(ProcessPoolExecutor(max_workers=workers))
+            data_splits = bounded_map(
+                executor, parse, pdfs_paths, chunksize=chunksize, window=2 * workers
+            )
+        else:
+            data_splits = map(parse, pdfs_paths)
+
+        t = tqdm(data_splits, total=len(pdfs_paths))
+        t.set_description("Parsing and splitting PDF into document chunks")
+        for pdf_path, data_split in zip(pdfs_paths, t):
+            for ds in data_split:
+                ds.metadata["source_type"] = SourceType.PDF.value
+            yield pdf_path, data_split
 
 
-def check_sources(
-    input_sources: list[str],
-    client: Client,
-    collection_name: str,
-) -> tuple[chromadb.Collection, list[str] | None]:
+def pdfs_to_docs(  # noqa: PLR0913 - the parsing options by keyword
+    pdfs_paths: list[str],
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: list[str],
+    *,
+    workers: int | None = 1,
+    chunksize: int = 1,
+) -> tuple[list[Document], dict]:
     """
-    Check the sources provided against the collection of documents already indexed in ChromaDB.
+    Converts a list of PDF paths into a list of Document objects and a dictionary of JSON serializable data.
+
+    Holds all the chunks in memory, see ``iter_pdf_docs`` to process the PDFs one at a
+    time instead.
 
     Args:
-        input_sources (list[str]): A list of sources to check against the collection.
-        source_type (SourceType): An enum representing the type of sources being checked.
-        client (Client): A ChromaDB client object.
-        collection_name (str): The name of the collection to check against.
+        pdfs_paths (list[str]): A list of paths to PDF files.
+        chunk_size (int): The maximum size of each chunk in characters.
+        chunk_overlap (int): The number of characters to overlap between chunks.
+        separators (list[str]): A list of strings to use as separators between chunks.
+        workers (int | None): The number of processes to parse the PDFs in, or None to use
+            one per CPU. Defaults to 1, which parses the PDFs in the current process.
+        chunksize (int): The number of PDFs handed to a process at a time. Defaults to 1.
 
     Returns:
-        tuple[chromadb.Collection, list[str] | None]: A tuple containing the ChromaDB collection and a list of sources to index.
-            - The ChromaDB collection.
-            - A list of sources to index, or None if there are no new sources to index.
-
-    Raises:
-        TypeError: If source_type is not an instance of the SourceType enum.
+        tuple[list[Document], dict]: A tuple containing a list of Document objects and a dictionary of JSON serializable data.
+            - The list of Document objects contains the parsed and split text from each PDF file.
+            - The dictionary of JSON serializable data contains the same information as the list of Document objects, but in a JSON serializable format.
     """
-    collection = client.get_collection(name=collection_name)
-    # Get all the sources already in collection
-    sources = set([metadata["source"] for metadata in collection.get()["metadatas"]])
-
-    # From the input sources, only keep those which do not already appear in
-    # the collection AKA not in the sources (we do not want to index the same
-    # website or PDF twice)
-    new_sources = [
-        input_source for input_source in input_sources if input_source not in sources
+    all_data_splits = [
+        ds
+        for _, data_split in iter_pdf_docs(
+            pdfs_paths,
+            chunk_size,
+            chunk_overlap,
+            separators,
+            workers=workers,
+            chunksize=chunksize,
+        )
+        for ds in data_split
     ]
 
-    return collection, new_sources if new_sources else None
+    # Convert to JSON serializable format
+    pdfs_dict = [dict(ds) for ds in all_data_splits]
 
+    return all_data_splits, pdfs_dict
 
-def index_new_documents(
-    new_sources: list[str],
-    source_type: SourceType,
-    collection: chromadb.Collection,
-    chunk_size: int,
-    chunk_overlap: int,
-    separators: list[str],
-    embedding_model_name: str,
-    api_key: str,
-) -> dict:
+
+def chunk_ids(data_split: list[Document]) -> list[str]:
     """
-    Indexes new documents into a collection based on the source type.
+    Derives a deterministic ID for each document chunk from its content and metadata.
+
+    The same chunk always gets the same ID, so re-indexing an unchanged source yields the
+    IDs already in the collection, while an edited chunk gets a new ID. Identical chunks
+    (e.g. a disclaimer repeated on several pages of a PDF) are told apart by a suffix
+    counting their occurrences.
 
     Args:
-        new_sources (list[str]): List of new sources to be indexed.
-        source_type (SourceType): Enum indicating the type of source (website or pdf).
-        collection (chromadb.Collection): The collection to index the new documents into.
-        chunk_size (int): The size of each chunk for processing.
-        chunk_overlap (int): The overlap between each chunk for processing.
-        separators (list[str]): List of separators for splitting the data.
-        embedding_model_name (str): The name of the embedding model to be used.
-        api_key (str): The API key for embedding functions.
+        data_split (list[Document]): The document chunks.
 
     Returns:
-        dict: A dictionary containing the indexed documents based on the source type.
+        list[str]: The IDs of the document chunks, in the same order.
+    """
+    ids = []
+    occurrences = Counter()
+    for ds in data_split:
+        content = json.dumps(
+            {"page_content": ds.page_content, "metadata": ds.metadata}, sort_keys=True
+        )
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        occurrences[digest] += 1
+        n = occurrences[digest]
+        ids.append(digest if n == 1 else f"{digest}-{n - 1}")
+
+    return ids
+
+
+class CollectionSync:
+    """Brings the chunks of a source type in the collection in line with the given
+    chunks, one source at a time.
+
+    The chunks are identified by their content (see ``chunk_ids``), and the registry
+    keeps the chunk IDs and a hash of them for every source. Sources whose hash is
+    unchanged are skipped straight away. For the other sources, the chunks are diffed
+    against the registered ones: new and edited chunks are embedded and upserted, and
+    chunks which are no longer produced are deleted, as are the chunks of registered
+    sources which are no longer given. The collection itself is only searched for the
+    chunks of sources which are not registered yet.
+
+    New chunks are embedded and upserted ``batch_size`` at a time in a background
+    thread while the next sources are diffed, with at most ``queue_size`` batches
+    waiting. Only the chunks of one source and the pending batches are held in memory.
+    The registry is only updated once all the batches are written, so an interrupted
+    sync is simply diffed again on the next run.
+
+    Syncs of different source types can run at the same time on the same collection,
+    with ``writing`` serialising their writes. The chunks are embedded before the
+    collection is opened for writing, so only the writes themselves wait on each other.
     """
 
-    def _index_new_documents(
-        original: list[dict],
-        new: list[dict],
-        data_split: list[Document],
+    def __init__(  # noqa: PLR0913 - the batching parameters, passed by keyword
+        self,
         collection: chromadb.Collection,
-    ) -> dict:
+        source_type: SourceType,
+        embedding_model: Embeddings,
+        registry: SourceRegistry,
+        *,
+        batch_size: int = 1000,
+        queue_size: int = 2,
+        writing: (
+            Callable[[], AbstractContextManager[chromadb.Collection]] | None
+        ) = None,
+    ):
         """
-        Indexes new documents into a collection based on the source type.
-
         Args:
-            original (list[dict]): The original list of documents to be updated.
-            new (list[dict]): The new list of documents to be added.
-            data_split (list[Document]): The list of Document objects to be split.
-            collection (chromadb.Collection): The collection to index the new documents into.
-
-        Returns:
-            dict: A dictionary containing the indexed documents based on the source type.
+            collection (chromadb.Collection): The collection to sync.
+            source_type (SourceType): The type of the sources the chunks come from.
+            embedding_model (Embeddings): The embedding model to embed the new chunks with.
+            registry (SourceRegistry): The registry of the sources indexed into the collection.
+            batch_size (int): The number of chunks to upsert at a time. Defaults to 1000.
+            queue_size (int): The maximum number of batches waiting to be upserted. Defaults to 2.
+            writing (Callable[[], AbstractContextManager[chromadb.Collection]] | None): Opens the collection for writing, see ``VectorStore.writing``. Defaults to None, writing to the collection directly.
         """
-        print(f"Before updating: {len(original)}")
-        # Extend the original with the new documents
-        original.extend(new)
-        print(f"After updating: {len(original)}")
-
-        # The embedding function
-        embedding_function = embedding_functions.OpenAIEmbeddingFunction(
-            model_name=embedding_model_name, api_key=api_key
-        )
+        self.collection = collection
+        self.source_type = source_type
+        self.embedding_model = embedding_model
+        self.registry = registry
+        self.batch_size = batch_size
+        self.writing = writing or (lambda: nullcontext(collection))
+
+        self.added, self.deleted, self.unchanged = 0, 0, 0
+
+        # A registry outliving its collection (e.g. the collection was deleted) would
+        # otherwise skip every unchanged source. Only the sources of this type are
+        # cleared, as a sync of another type may already be registering its own.
+        self._has_legacy_chunks = collection.count() > 0
+        if not self._has_legacy_chunks:
+            registry.clear(source_type.value)
+
+        self._seen = set()
+        self._pending = []
+        self._stale = []
+        self._updated = []
+        self._writer = BackgroundWorker(self._upsert, maxsize=queue_size)
+
+    def _upsert(self, batch: list[tuple[str, Document]]) -> None:
+        documents = [ds.page_content for _, ds in batch]
+        embeddings = self.embedding_model.embed_documents(documents)
+        with self.writing() as collection:
+            collection.upsert(
+                ids=[id_ for id_, _ in batch],
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=[ds.metadata for _, ds in batch],
+            )
+
+    def add(self, source: str, data_split: list[Document]) -> None:
+        """
+        Diffs the chunks of a source against the indexed ones, queueing the new chunks
+        to be upserted.
 
-        # Extract the page content from the document objects
-        documents = [ds.page_content for ds in data_split]
-        # Extract the metadata from the document objects
-        metadatas = [ds.metadata for ds in data_split]
-        # Create embeddings from the page contents
-        embeddings = embedding_function(documents)
-        # Randomly generate UUIDs (chromadb is kinda dumb for not auto-incrementing ids)
-        ids = [str(uuid.uuid4()) for _ in embeddings]
-
-        # Add the new documents into the collection
-        collection.add(
-            documents=documents,
-            embeddings=embeddings,
-            metadatas=metadatas,
-            ids=ids,
+        Args:
+            source (str): The source the chunks come from.
+            data_split (list[Document]): All the document chunks of the source.
+        """
+        self._seen.add(source)
+        ids = chunk_ids(data_split)
+        content_hash = hashlib.sha256("\n".join(ids).encode()).hexdigest()
+
+        record = self.registry.lookup([source]).get(source)
+        if record is not None and record.content_hash == content_hash:
+            self.unchanged += len(ids)
+            return
+
+        if record is not None:
+            existing = set(record.chunk_ids)
+        elif self._has_legacy_chunks:
+            # Chunks of sources indexed before the registry was introduced are only
+            # known to the collection
+            existing = set(
+                self.collection.get(where={"source": source}, include=[])["ids"]
+            )
+        else:
+            existing = set()
+
+        for id_, ds in zip(ids, data_split):
+            if id_ not in existing:
+                self._pending.append((id_, ds))
+        self._stale.extend(existing.difference(ids))
+        self.unchanged += len(existing.intersection(ids))
+        self._updated.append(
+            SourceRecord(source, self.source_type.value, content_hash, ids)
         )
 
-        return original
+        while len(self._pending) >= self.batch_size:
+            self.added += self.batch_size
+            self._writer.submit(self._pending[: self.batch_size])
+            self._pending = self._pending[self.batch_size :]
 
-    print(f"Indexing {len(new_sources)} new sources into collection.")
-    # Get JSON already saved to be updated with new documents
-    with KedroSession.create(project_path=Path.cwd()) as session:
-        context = session.load_context()
-        catalog = context.catalog
+    def keep(self, source: str) -> None:
+        """
+        Keeps the indexed chunks and the registry record of a source as they are, e.g.
+        when the source could not be loaded this time, instead of deleting them as the
+        chunks of a removed source.
 
-    if source_type.value == "website":
-        data_split, new_docs_dict = websites_to_docs(
-            new_sources, chunk_size, chunk_overlap, separators
-        )
+        Args:
+            source (str): The source to keep.
+        """
+        self._seen.add(source)
 
-        try:
-            docs_dict = catalog.load("docs_dict")
-        except:
-            docs_dict = []
+    def finish(self) -> tuple[int, int, int]:
+        """
+        Upserts the remaining chunks, deletes the stale chunks and updates the registry.
 
-        docs_dict = _index_new_documents(
-            docs_dict, new_docs_dict, data_split, collection
+        Returns:
+            tuple[int, int, int]: The number of chunks added, deleted and left unchanged.
+        """
+        if self._pending:
+            self.added += len(self._pending)
+            self._writer.submit(self._pending)
+            self._pending = []
+        self._writer.close()
+
+        removed = self.registry.lookup(
+            [
+                source
+                for source in self.registry.sources_of_type(self.source_type.value)
+                if source not in self._seen
+            ]
         )
-        return docs_dict
+        for record in removed.values():
+            self._stale.extend(record.chunk_ids)
 
-    elif source_type.value == "pdf":
-        all_data_splits, new_pdfs_dict = pdfs_to_docs(
-            new_sources, chunk_size, chunk_overlap, separators
-        )
+        for i in range(0, len(self._stale), self.batch_size):
+            with self.writing() as collection:
+                collection.delete(ids=self._stale[i : i + self.batch_size])
+        self.deleted = len(self._stale)
 
-        try:
-            pdfs_dict = catalog.load("pdfs_dict")
-        except:
-            pdfs_dict = []
+        self.registry.update(self._updated)
+        self.registry.remove(list(removed))
 
-        pdfs_dict = _index_new_documents(
-            pdfs_dict, new_pdfs_dict, all_data_splits, collection
-        )
-        return pdfs_dict
+        return self.added, self.deleted, self.unchanged
 
 
-def update_json(source_type: SourceType) -> dict:
+def sync_collection(  # noqa: PLR0913, PLR0917 - a wrapper of CollectionSync
+    collection: chromadb.Collection,
+    data_split: list[Document],
+    source_type: SourceType,
+    sources: list[str],
+    embedding_model: Embeddings,
+    registry: SourceRegistry,
+    *,
+    batch_size: int = 1000,
+) -> tuple[int, int, int]:
     """
-    Updates the JSON file based on the source type.
+    Brings the chunks of a source type in the collection in line with the given chunks,
+    see ``CollectionSync``.
 
     Args:
-        source_type (SourceType): The type of source (website or pdf).
+        collection (chromadb.Collection): The collection to sync.
+        data_split (list[Document]): All the document chunks of the source type.
+        source_type (SourceType): The type of the sources the chunks come from.
+        sources (list[str]): The sources the chunks come from.
+        embedding_model (Embeddings): The embedding model to embed the new chunks with.
+        registry (SourceRegistry): The registry of the sources indexed into the collection.
+        batch_size (int): The number of chunks to upsert at a time. Defaults to 1000.
 
     Returns:
-        dict: The loaded JSON data based on the source type.
+        tuple[int, int, int]: The number of chunks added, deleted and left unchanged.
     """
-    print("There are no new documents to index.")
-    # Get JSON already saved to be updated with new documents
-    with KedroSession.create(project_path=Path.cwd()) as session:
-        context = session.load_context()
-        catalog = context.catalog
-
-    return (
-        catalog.load("docs_dict")
-        if source_type.value == "website"
-        else catalog.load("pdfs_dict")
+    chunks_by_source = {source: [] for source in sources}
+    for ds in data_split:
+        chunks_by_source.setdefault(ds.metadata["source"], []).append(ds)
+
+    sync = CollectionSync(
+        collection, source_type, embedding_model, registry, batch_size=batch_size
     )
+    for source, chunks in chunks_by_source.items():
+        sync.add(source, chunks)
+    return sync.finish()
+
+
+def mark_reindexed(version_file: str) -> None:
+    """
+    Marks the collection as re-indexed by updating the version file, which invalidates
+    the response cache of the application.
+
+    Args:
+        version_file (str): The path to the version file.
+    """
+    path = Path(version_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(str(time.time()))
@@ -3,15 +3,19 @@ This is a boilerplate pipeline 'data_science'
 generated using Kedro 0.19.3
 """
 
-from pathlib import Path
+import logging
 
 import matplotlib.pyplot as plt
 import pandas as pd
-import requests
-from kedro.framework.session import KedroSession
-from tqdm import tqdm
+from kedro.io.core import generate_timestamp
 from wordcloud import STOPWORDS, WordCloud
 
+from healthcare_chatbot.api_client import ApiClient, InProcessClient
+from healthcare_chatbot.checkpoint import JSONLinesCheckpoint
+from healthcare_chatbot.in_process import chat_handler
+
+logger = logging.getLogger(__name__)
+
 
 def generate_wordcloud(queries_df: pd.DataFrame) -> plt.Figure:
     """
@@ -24,7 +28,7 @@ def generate_wordcloud(queries_df: pd.DataFrame) -> plt.Figure:
         plt.Figure: The generated word cloud figure.
     """
     queries = " ".join(query for query in queries_df.queries)
-    print(f"There are {len(queries)} words in the combination of all queries.")
+    logger.info(f"There are {len(queries)} words in the combination of all queries.")
 
     # Create stopword list
     stopwords = set(STOPWORDS)
@@ -46,83 +50,122 @@ def generate_wordcloud(queries_df: pd.DataFrame) -> plt.Figure:
     return fig
 
 
-def get_responses(
+def _response_record(query: str, response: dict) -> dict:
+    # Get only the first most relevant document
+    document = (response.get("source_documents") or [{}])[0]
+    return {
+        "queries": query,
+        "responses": response["response"],
+        "page_contents": document.get("page_content"),
+        "sources": document.get("metadata", {}).get("source"),
+    }
+
+
+def get_responses(  # noqa: PLR0913, PLR0917 - Kedro passes one argument per input
     queries_df: pd.DataFrame,
+    previous_responses_df: pd.DataFrame | None,
     api_params: dict,
-    start_index: int,
-    end_index: int,
+    responses_params: dict,
+    start_index: int | None,
+    end_index: int | None,
 ) -> pd.DataFrame:
     """
-    Retrieves responses from an API based on a list of queries.
+    Retrieves responses from the chatbot for the queries which have none yet.
+
+    Only the new responses are returned, with the ID of this run, to be appended to
+    the responses of the previous runs rather than rewriting all of them.
+
+    The queries are sent concurrently and every response is appended to a checkpoint
+    as soon as it arrives, so a run which crashes or is interrupted loses none of the
+    responses it got. The next run picks them up from the checkpoint, skips the
+    queries already in the previous responses and only sends the rest, so it is
+    enough to run the node again until every query has a response.
+
+    The queries are sent to the ``/chat`` endpoint of the running application, or
+    when the ``mode`` of the responses parameters is ``in_process``, answered by the
+    chain of the application built in this process, which needs no server.
 
     Args:
         queries_df (pd.DataFrame): A DataFrame containing a column of queries.
+        previous_responses_df (pd.DataFrame | None): The queries of the responses retrieved
+            by the previous runs, or None if there are none yet.
         api_params (dict): A dictionary containing the API parameters.
-        start_index (int): The start index of the queries to retrieve.
-        end_index (int): The end index of the queries to retrieve.
+        responses_params (dict): The parameters for the concurrency, retries and checkpoint.
+        start_index (int | None): The start index of the queries to retrieve, or None to start from the first.
+        end_index (int | None): The end index of the queries to retrieve, or None to end at the last.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the retrieved responses.
+        pd.DataFrame: A DataFrame containing the responses retrieved by this run and its
+            ``run_id``.
     """
-    # Get dataframe already saved to be updated with new documents
-    with KedroSession.create(project_path=Path.cwd()) as session:
-        context = session.load_context()
-        catalog = context.catalog
-
     domain = api_params["domain"]
     chat_endpoint = api_params["chat_endpoint"]
     chat_url = domain + chat_endpoint
 
-    questions = []
-    responses = []
-    page_contents = []
-    sources = []
-
     queries = queries_df["queries"].to_list()
-    assert start_index is not None and end_index is not None
-    queries = queries[start_index : end_index + 1]
-
-    q = tqdm(queries)
-
-    for query in q:
-        q.set_description(f"Getting response from LLM for query: {query}")
-
-        try:
-            response = requests.post(chat_url, json={"query": query})
-
-            if response.status_code == 201:
-                response = response.json()
-                questions.append(response["query"])
-                responses.append(response["response"])
-                # Get only the first most relevant document
-                page_contents.append(response["source_documents"][0]["page_content"])
-                sources.append(response["source_documents"][0]["metadata"]["source"])
-        except:
-            break
-
-    try:
-        responses_file = catalog.load("responses_file")
-        new_responses_file = pd.DataFrame(
-            {
-                "queries": questions,
-                "responses": responses,
-                "page_contents": page_contents,
-                "sources": sources,
-            }
-        )
-        responses_file = pd.concat(
-            [responses_file, new_responses_file], axis=0, ignore_index=True
-        )
+    queries = queries[start_index : end_index + 1 if end_index is not None else None]
+
+    if previous_responses_df is not None:
+        answered = set(previous_responses_df["queries"])
+    else:
+        logger.info("There are no existing responses. Creating new responses dataset.")
+        answered = set()
+
+    # The responses of a run which did not get to save them to the responses dataset
+    checkpoint = JSONLinesCheckpoint(responses_params["checkpoint_path"])
+    recovered = [
+        record for record in checkpoint.load() if record["queries"] not in answered
+    ]
+    checkpoint.rewrite(recovered)
+    answered.update(record["queries"] for record in recovered)
+    if recovered:
+        logger.info(f"Recovered {len(recovered)} responses from the checkpoint.")
+
+    pending = [query for query in dict.fromkeys(queries) if query not in answered]
+    logger.info(f"Getting responses for {len(pending)} of {len(queries)} queries.")
+
+    records = {}
+
+    def on_response(query: str, response: dict) -> None:
+        record = _response_record(query, response)
+        checkpoint.append(record)
+        records[query] = record
+
+    client_params = {
+        "max_concurrency": responses_params["max_concurrency"],
+        "retries": responses_params["retries"],
+        "backoff": responses_params["backoff"],
+        "max_backoff": responses_params["max_backoff"],
+        "timeout": responses_params["timeout"],
+    }
+    mode = responses_params["mode"]
+    if mode == "http":
+        client = ApiClient(chat_url, **client_params)
+    # Runs the chain of the application in this process, without its server
+    elif mode == "in_process":
+        client = InProcessClient(chat_handler(), **client_params)
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+    failures = client.post(
+        {query: {"query": query} for query in pending},
+        on_response,
+        desc="Getting responses from LLM",
+    )
 
-    except Exception:
-        print("There is no existing response.csv file. Creating new response.csv file.")
-        responses_file = pd.DataFrame(
-            {
-                "queries": questions,
-                "responses": responses,
-                "page_contents": page_contents,
-                "sources": sources,
-            }
+    for query, error in failures.items():
+        logger.warning(f"Failed to get a response for query: {query} ({error})")
+    if failures:
+        logger.warning(
+            f"{len(failures)} queries failed, run the pipeline again to retry them."
         )
 
-    return responses_file
+    # The new responses in the order of the queries
+    new_records = [records[query] for query in pending if query in records]
+    # Strings even where every value is missing, so all the runs have the same schema
+    new_responses_file = pd.DataFrame(
+        [*recovered, *new_records],
+        columns=["queries", "responses", "page_contents", "sources"],
+        dtype="string",
+    )
+    new_responses_file["run_id"] = generate_timestamp()
+    return new_responses_file
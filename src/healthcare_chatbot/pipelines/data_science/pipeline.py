@@ -24,7 +24,9 @@ def create_pipeline(**kwargs) -> Pipeline:
                 func=get_responses,
                 inputs=[
                     "queries_file",
+                    "previous_responses_file",
                     "params:api",
+                    "params:responses",
                     "params:start_index",
                     "params:end_index",
                 ],
@@ -0,0 +1,129 @@
+"""
+This is a boilerplate pipeline 'migration'
+generated using Kedro 0.19.3
+"""
+
+import logging
+from typing import Any
+
+import pandas as pd
+from kedro.io.core import generate_timestamp
+
+from healthcare_chatbot.evaluations import evaluation_rows, unique_evaluations
+from healthcare_chatbot.pipelines.data_processing.normalize import fix_mojibake
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_COLUMNS = ["queries", "responses", "page_contents", "sources"]
+
+
+def _fix_text(value: Any) -> Any:
+    # Only the strings, the missing values are left as they are
+    return fix_mojibake(value) if isinstance(value, str) else value
+
+
+def _numbered(responses_df: pd.DataFrame) -> pd.DataFrame:
+    # Numbers the repeats of the same response, so each of them matches only once
+    repeat = responses_df.groupby(RESPONSE_COLUMNS, dropna=False).cumcount()
+    return responses_df.assign(repeat=repeat)
+
+
+def migrate_responses(
+    legacy_responses_df: pd.DataFrame | None,
+    migrated_responses_df: pd.DataFrame | None,
+) -> pd.DataFrame:
+    """
+    Migrates the responses of the ``responses.csv`` file saved by the previous
+    versions of the ``data_science`` pipeline to the responses dataset.
+
+    The file was saved as UTF-8 but loaded as Latin-1, so its text is decoded back
+    from UTF-8, which also repairs the responses mangled by being loaded and saved
+    again by every run. Every response is migrated, including the repeated responses
+    to the same query, and the responses already in the responses dataset are
+    skipped, so migrating again only appends the responses which are not there yet.
+
+    Args:
+        legacy_responses_df (pd.DataFrame | None): The responses of ``responses.csv``,
+            loaded as Latin-1, or None if there is no such file.
+        migrated_responses_df (pd.DataFrame | None): The responses in the responses
+            dataset, or None if there are none yet.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the responses to append and the
+            ``run_id`` of the migration.
+    """
+    if legacy_responses_df is None:
+        logger.info("There is no responses.csv file to migrate.")
+        legacy_responses_df = pd.DataFrame(columns=RESPONSE_COLUMNS)
+
+    responses_df = legacy_responses_df[RESPONSE_COLUMNS].map(_fix_text)
+    responses_df = responses_df.astype("string").reset_index(drop=True)
+    if migrated_responses_df is not None:
+        migrated_df = migrated_responses_df[RESPONSE_COLUMNS].astype("string")
+        numbered_df = _numbered(responses_df).merge(
+            _numbered(migrated_df), how="left", indicator=True
+        )
+        responses_df = responses_df[numbered_df["_merge"].eq("left_only").to_numpy()]
+        responses_df = responses_df.reset_index(drop=True)
+    logger.info(
+        f"Migrating {len(responses_df)} of {len(legacy_responses_df)} responses."
+    )
+
+    responses_df["run_id"] = generate_timestamp()
+    return responses_df
+
+
+def migrate_evaluations(
+    legacy_evaluations: list[dict] | None,
+    previous_evaluations_df: pd.DataFrame | None,
+) -> pd.DataFrame:
+    """
+    Migrates the evaluations of the ``evaluations.json`` file saved by the previous
+    versions of the ``model_evaluation`` pipeline to the evaluations dataset.
+
+    The text of the evaluations is repaired like the text of the responses, so the
+    keys of the evaluations match the migrated responses. Only the first evaluation
+    of each key is kept, and the keys already in the evaluations dataset are skipped,
+    so migrating again only appends the evaluations which are not there yet.
+
+    Args:
+        legacy_evaluations (list[dict] | None): The evaluations of ``evaluations.json``,
+            or None if there is no such file.
+        previous_evaluations_df (pd.DataFrame | None): The keys of the evaluations in
+            the evaluations dataset, or None if there are none yet.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the evaluations to append, one row per
+            criteria of each evaluation, and the ``run_id`` of the migration.
+    """
+    if legacy_evaluations is None:
+        logger.info("There is no evaluations.json file to migrate.")
+        legacy_evaluations = []
+
+    evaluations = unique_evaluations(
+        [
+            {
+                name: (
+                    {key: _fix_text(value) for key, value in result.items()}
+                    if isinstance(result, dict)
+                    else _fix_text(result)
+                )
+                for name, result in evaluation.items()
+            }
+            for evaluation in legacy_evaluations
+        ]
+    )
+    if previous_evaluations_df is not None:
+        migrated = set(previous_evaluations_df["key"])
+        evaluations = {
+            key: evaluation
+            for key, evaluation in evaluations.items()
+            if key not in migrated
+        }
+    logger.info(
+        f"Migrating {len(evaluations)} of {len(legacy_evaluations)} evaluations."
+    )
+
+    evaluations_df = evaluation_rows(evaluations)
+    evaluations_df["run_id"] = generate_timestamp()
+    return evaluations_df
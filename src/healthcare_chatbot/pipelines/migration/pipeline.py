@@ -0,0 +1,30 @@
+"""
+This is a boilerplate pipeline 'migration'
+generated using Kedro 0.19.3
+"""
+
+from kedro.pipeline import Pipeline, node, pipeline
+
+from healthcare_chatbot.pipelines.migration.nodes import (
+    migrate_evaluations,
+    migrate_responses,
+)
+
+
+def create_pipeline(**kwargs) -> Pipeline:
+    return pipeline(
+        [
+            node(
+                func=migrate_responses,
+                inputs=["legacy_responses_file", "migrated_responses_file"],
+                outputs="responses_file",
+                name="migrate_responses_node",
+            ),
+            node(
+                func=migrate_evaluations,
+                inputs=["legacy_evaluations_file", "previous_evaluations_file"],
+                outputs="evaluations_file",
+                name="migrate_evaluations_node",
+            ),
+        ]
+    )
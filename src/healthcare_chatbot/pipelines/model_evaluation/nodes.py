@@ -3,136 +3,286 @@ This is a boilerplate pipeline 'model_evaluation'
 generated using Kedro 0.19.3
 """
 
-from pathlib import Path
-from matplotlib import pyplot as plt
+import logging
+from statistics import NormalDist
+
+import numpy as np
 import pandas as pd
-import requests
-from kedro.framework.session import KedroSession
-from tqdm import tqdm
+from kedro.io.core import generate_timestamp
+from matplotlib import pyplot as plt
+
+from healthcare_chatbot.api_client import ApiClient, InProcessClient
+from healthcare_chatbot.checkpoint import JSONLinesCheckpoint
+from healthcare_chatbot.evaluations import (
+    evaluation_key,
+    evaluation_rows,
+    failed_criteria,
+    unique_evaluations,
+)
+from healthcare_chatbot.in_process import evaluate_handler
+
+logger = logging.getLogger(__name__)
 
+# The z-score of a two-sided 95% confidence interval
+_Z_95 = NormalDist().inv_cdf(0.975)
 
-def get_evaluations(
+
+def _previous_evaluations(
+    previous_evaluations_df: pd.DataFrame,
+) -> tuple[set[tuple[str, str]], set[str]]:
+    # The keys and criteria evaluated without an error by the previous runs, and the
+    # keys of the evaluations none of whose criteria still has only an error
+    errored = previous_evaluations_df["error"].notna()
+    keys_criteria = previous_evaluations_df[["key", "criteria"]]
+    done = set(keys_criteria[~errored].itertuples(index=False, name=None))
+    failed = set(keys_criteria[errored].itertuples(index=False, name=None)) - done
+    evaluated = set(previous_evaluations_df["key"]) - {key for key, _ in failed}
+    return done, evaluated
+
+
+def get_evaluations(  # noqa: PLR0913, PLR0917 - Kedro passes one argument per input
     responses_df: pd.DataFrame,
+    previous_evaluations_df: pd.DataFrame | None,
     eval_api_params: dict,
-    start_eval_index: int,
-    end_eval_index: int,
-) -> list[dict]:
+    evaluations_params: dict,
+    start_eval_index: int | None,
+    end_eval_index: int | None,
+) -> pd.DataFrame:
     """
-    A function to get evaluations based on responses data, API parameters, and evaluation indices.
+    A function to get evaluations of the responses which have not been evaluated yet.
+
+    Each evaluation is identified by a hash of its query, response and page content,
+    its ``key``, so a response is evaluated once however many times it is in the
+    responses or in the window of a run. A response which some criteria failed on,
+    e.g. because they timed out, is evaluated again by the next run, which only adds
+    the criteria that failed before. Only the new evaluations are returned, with the
+    ID of this run, to be appended to the evaluations of the previous runs rather than
+    rewriting all of them.
+    The responses are evaluated concurrently and every evaluation without a failed
+    criteria is appended to a checkpoint as soon as it arrives, which the next run
+    picks up if this one crashes before the evaluations are saved.
+
+    The responses are sent to the ``/evaluate`` endpoint of the running application,
+    or when the ``mode`` of the evaluations parameters is ``in_process``, evaluated
+    by the evaluators of the application built in this process, which needs no server.
 
     Args:
         responses_df (pd.DataFrame): DataFrame containing responses data.
+        previous_evaluations_df (pd.DataFrame | None): The keys, criteria and errors of
+            the evaluations by the previous runs, or None if there are none yet.
         eval_api_params (dict): Dictionary of evaluation API parameters.
-        start_eval_index (int): The starting index for evaluation.
-        end_eval_index (int): The ending index for evaluation.
+        evaluations_params (dict): The parameters for the concurrency, retries and checkpoint.
+        start_eval_index (int | None): The starting index for evaluation, or None to start from the first.
+        end_eval_index (int | None): The ending index for evaluation, or None to end at the last.
 
     Returns:
-        list[dict]: List of evaluation results in dictionary format.
+        pd.DataFrame: A DataFrame containing the evaluations by this run, one row per
+            criteria of each evaluation, and its ``run_id``.
     """
-    # Get JSON already saved to be updated with new documents
-    with KedroSession.create(project_path=Path.cwd()) as session:
-        context = session.load_context()
-        catalog = context.catalog
-
     domain = eval_api_params["domain"]
     eval_endpoint = eval_api_params["eval_endpoint"]
     eval_url = domain + eval_endpoint
 
-    queries = responses_df["queries"].to_list()
-    responses = responses_df["responses"].to_list()
-    page_contents = responses_df["page_contents"].to_list()
+    responses_df = responses_df.iloc[
+        start_eval_index : end_eval_index + 1 if end_eval_index is not None else None
+    ]
+    # Responses without a document have no page content
+    responses_df = responses_df[["queries", "responses", "page_contents"]].fillna("")
 
-    assert start_eval_index is not None and end_eval_index is not None
+    if previous_evaluations_df is not None:
+        done, evaluated = _previous_evaluations(previous_evaluations_df)
+    else:
+        logger.info(
+            "There are no existing evaluations. Creating new evaluations dataset."
+        )
+        done, evaluated = set(), set()
 
-    queries = queries[start_eval_index : end_eval_index + 1]
-    responses = responses[start_eval_index : end_eval_index + 1]
-    page_contents = page_contents[start_eval_index : end_eval_index + 1]
+    # The evaluations of a run which did not get to save them to the evaluations
+    # dataset
+    checkpoint = JSONLinesCheckpoint(evaluations_params["checkpoint_path"])
+    recovered = {
+        key: evaluation
+        for key, evaluation in unique_evaluations(checkpoint.load()).items()
+        if key not in evaluated and not failed_criteria(evaluation)
+    }
+    checkpoint.rewrite(recovered.values())
+    evaluated.update(recovered)
+    if recovered:
+        logger.info(f"Recovered {len(recovered)} evaluations from the checkpoint.")
 
-    assert len(queries) == len(responses) == len(page_contents)
+    payloads = {}
+    for query, response, page_content in responses_df.itertuples(index=False):
+        key = evaluation_key(query, response, page_content)
+        if key not in evaluated:
+            payloads[key] = {
+                "query": query,
+                "response": response,
+                "page_content": page_content,
+            }
+    logger.info(f"Evaluating {len(payloads)} of {len(responses_df)} responses.")
 
-    qrp = tqdm(zip(queries, responses, page_contents))
-    criterion_responses = []
+    new_evaluations = {}
 
-    for query, response, page_content in qrp:
-        qrp.set_description(f"Getting criterion evaluation for query: {query}")
+    def on_response(key: str, evaluation: dict) -> None:
+        # Left out so the next run evaluates it again, like a failed request
+        if not failed_criteria(evaluation):
+            checkpoint.append(evaluation)
+        new_evaluations[key] = evaluation
 
-        try:
-            criterion_response = requests.post(
-                eval_url,
-                json={
-                    "query": query,
-                    "response": response,
-                    "page_content": page_content,
-                },
-            )
+    client_params = {
+        "max_concurrency": evaluations_params["max_concurrency"],
+        "retries": evaluations_params["retries"],
+        "backoff": evaluations_params["backoff"],
+        "max_backoff": evaluations_params["max_backoff"],
+        "timeout": evaluations_params["timeout"],
+    }
+    mode = evaluations_params["mode"]
+    if mode == "http":
+        client = ApiClient(eval_url, **client_params)
+    # Runs the evaluators of the application in this process, without its server
+    elif mode == "in_process":
+        client = InProcessClient(evaluate_handler(), **client_params)
+    else:
+        raise ValueError(f"Unknown mode: {mode}")
+    failures = client.post(payloads, on_response, desc="Getting criterion evaluations")
 
-            if criterion_response.status_code == 200:
-                criterion_responses.append(criterion_response.json())
-        except:
-            break
+    for key, error in failures.items():
+        logger.warning(f"Failed to evaluate query: {payloads[key]['query']} ({error})")
+    if failures:
+        logger.warning(
+            f"{len(failures)} evaluations failed, run the pipeline again to retry."
+        )
+    partial = sum(bool(failed_criteria(e)) for e in new_evaluations.values())
+    if partial:
+        logger.warning(
+            f"{partial} evaluations have criteria which failed, run the pipeline "
+            "again to retry them."
+        )
 
-    try:
-        evaluations_file = catalog.load("evaluations_file")
-        new_evaluations_file = criterion_responses
-        evaluations_file.extend(new_evaluations_file)
+    # The new evaluations in the order of the responses
+    evaluations_df = evaluation_rows(
+        {
+            **recovered,
+            **{key: new_evaluations[key] for key in payloads if key in new_evaluations},
+        }
+    )
+    # Only the criteria which failed before are added for a response evaluated again
+    if done:
+        keys_criteria = pd.MultiIndex.from_frame(evaluations_df[["key", "criteria"]])
+        evaluations_df = evaluations_df[~keys_criteria.isin(done)]
+        evaluations_df = evaluations_df.reset_index(drop=True)
+    evaluations_df["run_id"] = generate_timestamp()
+    return evaluations_df
 
-    except Exception:
-        print(
-            "There is no existing evaluations.json file. Creating new evaluations.json file."
-        )
-        evaluations_file = criterion_responses
 
-    return evaluations_file
+def _criteria_scores(evaluations_df: pd.DataFrame, criteria: list[str]) -> pd.DataFrame:
+    # One column of scores per criteria and one row per evaluation. A criteria which
+    # failed to be evaluated has no score and is NaN, unless a later run evaluated it
+    # again, as ``first`` skips the missing scores.
+    scores_df = (
+        evaluations_df.groupby(["key", "criteria"], sort=False)["score"]
+        .first()
+        .unstack()
+    )
+    return scores_df.reindex(columns=criteria).rename_axis(columns=None).astype(float)
 
 
-def generate_barplot(
-    evaluations_file: list[dict], criterion: list[str], labelled_criterion: list[str]
-) -> plt.Figure:
+def summarise_scores(scores_df: pd.DataFrame) -> pd.DataFrame:
     """
-    Generate a barplot of the mean scores of evaluation criteria over all responses.
+    Summarises the scores of each evaluation criteria.
+
+    The confidence interval of the mean uses the normal approximation, which holds
+    for the hundreds of responses an evaluation usually covers, and is clipped to the
+    range of the scores.
 
     Args:
-        evaluations_file (list[dict]): A list of dictionaries containing evaluation data.
-        criterion (list[str]): A list of strings representing the evaluation criteria.
-        labelled_criterion (list[str]): A list of strings representing the labelled evaluation criteria.
+        scores_df (pd.DataFrame): A DataFrame with a column of scores per criteria,
+            NaN where the criteria failed to be evaluated.
 
     Returns:
-        plt.Figure: The generated barplot figure.
+        pd.DataFrame: A DataFrame indexed by criteria with the number of scores, their
+            mean and standard deviation, the bounds of the 95% confidence interval of
+            the mean, and the share of each score, e.g. ``share_1`` for a score of 1.
     """
-    eval_df = pd.DataFrame(
-        columns=[
-            "queries",
-            "responses",
-            "page_contents",
-            *criterion,
-            *labelled_criterion,
-        ]
+    # The scores given to any of the criteria, e.g. 0 and 1
+    values = np.sort(pd.Series(scores_df.to_numpy().ravel()).dropna().unique())
+    lowest, highest = (values[0], values[-1]) if len(values) else (None, None)
+
+    count = scores_df.count()
+    mean = scores_df.mean()
+    std = scores_df.std()
+    margin = _Z_95 * std / np.sqrt(count)
+    summary = pd.DataFrame(
+        {
+            "count": count,
+            "mean": mean,
+            "std": std,
+            "ci_lower": (mean - margin).clip(lower=lowest),
+            "ci_upper": (mean + margin).clip(upper=highest),
+        }
     )
 
-    for i, eval in enumerate(evaluations_file):
-        eval_df.at[i, "queries"] = eval["query"]
-        eval_df.at[i, "responses"] = eval["response"]
-        eval_df.at[i, "page_contents"] = eval["page_content"]
+    # The distribution of the scores, over the responses the criteria was evaluated on
+    shares = pd.DataFrame(
+        {f"share_{value:g}": (scores_df == value).sum() / count for value in values}
+    )
+    return pd.concat([summary, shares], axis=1)
 
-        for criteria in criterion:
-            eval_df.at[i, criteria] = eval[criteria]["score"]
 
-        for labelled_criteria in labelled_criterion:
-            eval_df.at[i, labelled_criteria] = eval[labelled_criteria]["score"]
+def generate_barplot(
+    evaluations_file: pd.DataFrame,
+    criterion: list[str],
+    labelled_criterion: list[str],
+) -> tuple[plt.Figure, pd.DataFrame]:
+    """
+    Generate a barplot of the mean scores of evaluation criteria over all responses,
+    with their 95% confidence intervals, next to the distribution of their scores.
 
-    eval_df[[*criterion, *labelled_criterion]] = eval_df[
-        [*criterion, *labelled_criterion]
-    ].astype(int)
+    Args:
+        evaluations_file (pd.DataFrame): A DataFrame containing the evaluations, one row
+            per criteria of each evaluation, see ``get_evaluations``.
+        criterion (list[str]): A list of strings representing the evaluation criteria.
+        labelled_criterion (list[str]): A list of strings representing the labelled evaluation criteria.
 
-    meta_df = eval_df[[*criterion, *labelled_criterion]].describe().T
+    Returns:
+        tuple[plt.Figure, pd.DataFrame]: The generated barplot figure, and the summary of
+            the scores of each criteria, see ``summarise_scores``.
+    """
+    scores_df = _criteria_scores(evaluations_file, [*criterion, *labelled_criterion])
+    summary_df = summarise_scores(scores_df)
+    # The first criteria at the top
+    plot_df = summary_df[::-1]
 
-    fig = plt.figure()
+    fig, (means_ax, shares_ax) = plt.subplots(1, 2, sharey=True)
     fig.set_figheight(4.5)
     fig.set_figwidth(4.5 * 2)
-    plt.barh(meta_df.index[::-1], meta_df["mean"][::-1])
-    plt.xlabel("Mean Scores")
-    plt.ylabel("Criteria")
-    plt.title("Mean Scores of Evaluation Criteria over All Responses")
+
+    means_ax.barh(
+        plot_df.index,
+        plot_df["mean"],
+        xerr=[
+            (plot_df["mean"] - plot_df["ci_lower"]).to_numpy(),
+            (plot_df["ci_upper"] - plot_df["mean"]).to_numpy(),
+        ],
+        capsize=4,
+    )
+    means_ax.set_xlabel("Mean Scores (95% CI)")
+    means_ax.set_ylabel("Criteria")
+    means_ax.set_title("Mean Scores")
+
+    left = np.zeros(len(plot_df))
+    for share in [column for column in plot_df if column.startswith("share_")]:
+        shares = plot_df[share].fillna(0).to_numpy()
+        score = share.removeprefix("share_")
+        shares_ax.barh(plot_df.index, shares, left=left, label=f"Score {score}")
+        left += shares
+    shares_ax.set_xlabel("Share of Responses")
+    shares_ax.set_title("Score Distribution")
+    if left.any():
+        shares_ax.legend(loc="upper left", bbox_to_anchor=(1, 1))
+
+    fig.suptitle("Scores of Evaluation Criteria over All Responses")
+    fig.tight_layout()
     plt.show()
 
-    return fig
+    return fig, summary_df
@@ -18,7 +18,9 @@ def create_pipeline(**kwargs) -> Pipeline:
                 func=get_evaluations,
                 inputs=[
                     "responses_file",
+                    "previous_evaluations_file",
                     "params:eval_api",
+                    "params:evaluations",
                     "params:start_eval_index",
                     "params:end_eval_index",
                 ],
@@ -32,7 +34,7 @@ def create_pipeline(**kwargs) -> Pipeline:
                     "params:criterion",
                     "params:labelled_criterion",
                 ],
-                outputs="barplot",
+                outputs=["barplot", "evaluation_summary"],
                 name="generate_barplot_node",
             ),
         ]
@@ -0,0 +1,170 @@
+"""Read-only snapshots of the vector database shared by the application workers."""
+
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from chromadb.api.models.Collection import Collection
+
+# The file in the snapshot directory holding the name of the current snapshot
+POINTER_FILE = "CURRENT"
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.json"
+
+
+def export_snapshot(collection: "Collection", snapshot_dir: str, keep: int = 2) -> str:
+    """
+    Exports the vectors and records of a collection into a new snapshot.
+
+    The snapshot is written to its own directory first and only then published by
+    atomically replacing the pointer file, so readers never see a partial snapshot.
+    The vectors are normalised to unit length and saved as a contiguous float32
+    matrix, which the workers memory-map instead of loading into their own memory.
+
+    Args:
+        collection (Collection): The collection to export.
+        snapshot_dir (str): The directory containing the snapshots.
+        keep (int): The number of snapshots to keep, including the new one. Defaults to 2.
+
+    Returns:
+        str: The path to the new snapshot.
+    """
+    results = collection.get(include=["embeddings", "documents", "metadatas"])
+
+    vectors = np.asarray(results["embeddings"], dtype=np.float32)
+    if vectors.size:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms > 0, norms, 1)
+
+    snapshot_dir = Path(snapshot_dir)
+    # Named after the time of the export so the snapshots sort by age
+    name = str(time.time_ns())
+    path = snapshot_dir / name
+    path.mkdir(parents=True)
+
+    np.save(path / VECTORS_FILE, vectors)
+    with open(path / RECORDS_FILE, "w") as f:
+        json.dump(
+            {
+                "ids": results["ids"],
+                "documents": results["documents"],
+                "metadatas": results["metadatas"],
+            },
+            f,
+        )
+
+    pointer = snapshot_dir / POINTER_FILE
+    pointer_tmp = snapshot_dir / f"{POINTER_FILE}.tmp"
+    pointer_tmp.write_text(name)
+    os.replace(pointer_tmp, pointer)
+
+    # Workers still reading an old snapshot keep their memory map, even once the
+    # files are removed, until they swap over to the new one
+    snapshots = sorted(p for p in snapshot_dir.iterdir() if p.is_dir())
+    for old in snapshots[:-keep]:
+        shutil.rmtree(old, ignore_errors=True)
+
+    return str(path)
+
+
+@dataclass(frozen=True)
+class VectorSnapshot:
+    """A read-only snapshot of a collection.
+
+    Attributes:
+        name (str): The name of the snapshot.
+        vectors (np.ndarray): The unit length vectors of the collection, memory-mapped from disk.
+        ids (list[str]): The IDs of the records, in the order of the vectors.
+        documents (list[str]): The documents of the records, in the order of the vectors.
+        metadatas (list[dict | None]): The metadata of the records, in the order of the vectors.
+    """
+
+    name: str
+    vectors: np.ndarray
+    ids: list[str]
+    documents: list[str]
+    metadatas: list[dict | None]
+
+    @classmethod
+    def load(cls, path: str) -> "VectorSnapshot":
+        """
+        Loads a snapshot, memory-mapping its vectors.
+
+        Args:
+            path (str): The path to the snapshot.
+
+        Returns:
+            VectorSnapshot: The snapshot.
+        """
+        path = Path(path)
+        with open(path / RECORDS_FILE) as f:
+            records = json.load(f)
+
+        return cls(
+            name=path.name,
+            vectors=np.load(path / VECTORS_FILE, mmap_mode="r"),
+            ids=records["ids"],
+            documents=records["documents"],
+            metadatas=records["metadatas"],
+        )
+
+
+class SnapshotReader:
+    """Reads the current snapshot of a collection and swaps to newer ones.
+
+    The pointer file is checked on every call to ``current``, which costs a single
+    ``stat``. As soon as the indexing pipeline publishes a new snapshot, the next
+    call loads it, so the workers pick up a re-indexed collection without restarting.
+    The pointer is replaced rather than written to, so a new snapshot is told apart
+    by the inode of the pointer even when it is published within the resolution of
+    its modification time.
+    """
+
+    def __init__(self, snapshot_dir: str):
+        """
+        Args:
+            snapshot_dir (str): The directory containing the snapshots.
+        """
+        self.snapshot_dir = Path(snapshot_dir)
+        self._lock = threading.Lock()
+        self._version: tuple[int, int] | None = None
+        self._snapshot: VectorSnapshot | None = None
+
+    def current(self) -> VectorSnapshot:
+        """
+        Gets the current snapshot.
+
+        Returns:
+            VectorSnapshot: The current snapshot.
+
+        Raises:
+            FileNotFoundError: If no snapshot has been exported yet.
+        """
+        pointer = self.snapshot_dir / POINTER_FILE
+        try:
+            stat = os.stat(pointer)
+        except FileNotFoundError:
+            raise FileNotFoundError(
+                f"No snapshot has been exported to '{self.snapshot_dir}' yet. Run the "
+                "data_processing pipeline to export one, or set "
+                "serving.retriever.backend to 'chroma' to search the vector database."
+            ) from None
+        version = (stat.st_ino, stat.st_mtime_ns)
+
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    name = pointer.read_text().strip()
+                    if self._snapshot is None or self._snapshot.name != name:
+                        self._snapshot = VectorSnapshot.load(self.snapshot_dir / name)
+                    self._version = version
+
+        return self._snapshot
@@ -0,0 +1,214 @@
+"""The vector database and embedding model shared by the nodes of a pipeline run."""
+
+import fcntl
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from kedro.io import AbstractDataset, DatasetError
+
+from healthcare_chatbot.embeddings import CachedEmbeddings
+
+if TYPE_CHECKING:
+    from healthcare_chatbot.pipelines.data_processing.embedder import BatchEmbedder
+
+
+@contextmanager
+def _file_lock(path: Path) -> Iterator[None]:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class VectorStore:
+    """One connection to the vector database collection and one embedding model,
+    shared by all the nodes of a pipeline run.
+
+    Both are only built the first time they are used, under a lock, so nodes running
+    at the same time in a ``ThreadRunner`` share them rather than each opening their
+    own client on the same persistent database. Chroma and the OpenAI client are
+    imported on first use too, which keeps them out of the startup of every Kedro
+    command.
+
+    Writes go through ``writing``, which serialises them with the writes of the other
+    nodes of the run, in this process and in the other processes of a
+    ``ParallelRunner``.
+    """
+
+    def __init__(  # noqa: PLR0913 - the parameters of the pipeline run
+        self,
+        db_params: dict,
+        embedding_model_name: str,
+        embedding_cache_params: dict,
+        embedding_batching_params: dict,
+        credentials: dict,
+        *,
+        shared_between_processes: bool = False,
+    ):
+        """
+        Args:
+            db_params (dict): The parameters for the vector database collection.
+            embedding_model_name (str): The name of the embedding model.
+            embedding_cache_params (dict): The parameters for the embedding cache.
+            embedding_batching_params (dict): The parameters for batching the embedding requests.
+            credentials (dict): The credentials, containing the OpenAI API key.
+            shared_between_processes (bool): Whether other processes write to the database at the same time, as in a ``ParallelRunner``. Defaults to False.
+        """
+        self.db_params = db_params
+        self.embedding_model_name = embedding_model_name
+        self.embedding_cache_params = embedding_cache_params
+        self.embedding_batching_params = embedding_batching_params
+        self.credentials = credentials
+        self.shared_between_processes = shared_between_processes
+
+        self._persist_directory = Path(os.getcwd()) / db_params["path"]
+        self._lock_path = self._persist_directory / "write.lock"
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._client = None
+        self._collection = None
+        self._embedding_model = None
+
+    def _connect(self):
+        # Imported here so Kedro commands start without loading chromadb
+        import chromadb  # noqa: PLC0415
+        from chromadb.config import Settings  # noqa: PLC0415
+
+        client = chromadb.Client(
+            Settings(is_persistent=True, persist_directory=str(self._persist_directory))
+        )
+        collection = client.get_or_create_collection(self.db_params["collection_name"])
+        return client, collection
+
+    def _open_collection(self):
+        # Creating the database and the collection race with other processes doing
+        # the same on a new database
+        with _file_lock(self._lock_path):
+            return self._connect()
+
+    @property
+    def client(self):
+        """The persistent Chroma client of the vector database."""
+        with self._lock:
+            if self._client is None:
+                self._client, self._collection = self._open_collection()
+            return self._client
+
+    @property
+    def collection(self):
+        """The collection of the vector database, created if it does not exist yet."""
+        with self._lock:
+            if self._collection is None:
+                self._client, self._collection = self._open_collection()
+            return self._collection
+
+    @contextmanager
+    def writing(self) -> Iterator[Any]:
+        """
+        Opens the collection for writing, one writer at a time across the threads of
+        the run, and across its processes when the database is shared between them.
+
+        Chroma keeps the vector index of a collection in the memory of each process and
+        persists it from there, so a process writing with its own long-lived client
+        would overwrite the vectors persisted by the others. When the database is
+        shared between processes, every write therefore goes through a new client
+        opened under the lock, which loads the vectors written by the others first.
+
+        Yields:
+            chromadb.Collection: The collection to write to.
+        """
+        if not self.shared_between_processes:
+            collection = self.collection
+            with self._write_lock:
+                yield collection
+            return
+
+        # Chroma has no public way to close a client, which persists the vector index
+        # of its collections, or to drop the client cached for a path, so these rely
+        # on its internals, hence chromadb being pinned in requirements.txt
+        from chromadb.api.client import SharedSystemClient  # noqa: PLC0415
+
+        with self._write_lock, _file_lock(self._lock_path):
+            # Chroma caches one client per path, which would be the stale one
+            SharedSystemClient.clear_system_cache()
+            client, collection = self._connect()
+            try:
+                yield collection
+            finally:
+                client._system.stop()
+                SharedSystemClient.clear_system_cache()
+
+    @property
+    def embedding_model(self) -> "BatchEmbedder":
+        """The embedding model to embed the new chunks with.
+
+        Every batch is cached as soon as it is embedded, so an interrupted run resumes
+        where it stopped. Retries are left to the batch embedder, which backs off
+        across all the batches in flight when rate limited.
+        """
+        with self._lock:
+            if self._embedding_model is None:
+                from langchain_openai import OpenAIEmbeddings  # noqa: PLC0415
+
+                from healthcare_chatbot.pipelines.data_processing.embedder import (  # noqa: PLC0415
+                    BatchEmbedder,
+                )
+
+                self._embedding_model = BatchEmbedder(
+                    CachedEmbeddings(
+                        OpenAIEmbeddings(
+                            model=self.embedding_model_name,
+                            openai_api_key=self.credentials["OPENAI_API_KEY"],
+                            max_retries=0,
+                        ),
+                        namespace=self.embedding_model_name,
+                        max_entries=self.embedding_cache_params["max_entries"],
+                        path=self.embedding_cache_params["path"],
+                    ),
+                    **self.embedding_batching_params,
+                )
+            return self._embedding_model
+
+
+class VectorStoreDataset(AbstractDataset[None, VectorStore]):
+    """Loads the ``VectorStore`` shared by the nodes of a pipeline run.
+
+    Every load returns the same instance, so all the nodes taking the dataset as an
+    input share one client and one embedding model. Registered in the catalog by
+    ``VectorStoreHooks`` from the parameters and credentials of the run.
+    """
+
+    def __init__(self, **kwargs: Any):
+        """
+        Args:
+            **kwargs (Any): The arguments of the ``VectorStore``.
+        """
+        self._kwargs = kwargs
+        self._vector_store = None
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # The processes of a ParallelRunner each build their own vector store
+        return {"_kwargs": self._kwargs}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**{**state["_kwargs"], "shared_between_processes": True})
+
+    def _describe(self) -> dict[str, Any]:
+        return {"collection_name": self._kwargs["db_params"]["collection_name"]}
+
+    def _load(self) -> VectorStore:
+        with self._lock:
+            if self._vector_store is None:
+                self._vector_store = VectorStore(**self._kwargs)
+            return self._vector_store
+
+    def _save(self, data: None) -> None:
+        raise DatasetError("The vector store is read-only, use it inside the nodes.")
@@ -0,0 +1,104 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    """Answers ``POST /chat`` and ``POST /evaluate`` like the application. Queries
+    starting with "flaky" fail twice before succeeding, queries starting with
+    "limited" are rate limited once, queries starting with "busy" are asked to retry a
+    day later once and queries starting with "broken" always fail. The correctness of
+    queries starting with "timing out" times out on their first evaluation."""
+
+    def do_POST(self):
+        server = self.server
+        payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        query = payload["query"]
+        with server.lock:
+            server.requests.append(query)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            calls = server.requests.count(query)
+
+        try:
+            # Hold the request open long enough for the others to pile up
+            time.sleep(server.latency)
+
+            if query.startswith("broken") or (query.startswith("flaky") and calls <= 2):
+                self._send(503, {"detail": "Service Unavailable"})
+            elif query.startswith("limited") and calls == 1:
+                self._send(429, {"detail": "Too Many Requests"}, retry_after="0")
+            elif query.startswith("busy") and calls == 1:
+                self._send(429, {"detail": "Too Many Requests"}, retry_after="86400")
+            elif self.path == "/chat":
+                self._send(
+                    201,
+                    {
+                        "query": query,
+                        "response": f"The answer to {query}",
+                        "source_documents": [
+                            {
+                                "page_content": f"The context of {query}",
+                                "metadata": {"source": "https://www.healthhub.sg"},
+                            }
+                        ],
+                    },
+                )
+            else:
+                correctness = {"score": 0}
+                if query.startswith("timing out") and calls == 1:
+                    correctness = {"error": "Evaluation timed out after 120 seconds."}
+                self._send(
+                    200,
+                    {
+                        **payload,
+                        "coherence": {"score": 1},
+                        "correctness": correctness,
+                        "timings": {"coherence": 0.1, "correctness": 0.1},
+                    },
+                )
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status: int, body: dict, retry_after: str | None = None):
+        content = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        if retry_after is not None:
+            self.send_header("Retry-After", retry_after)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ApiHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.latency = 0.05
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def domain(server) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+@pytest.fixture
+def chat_url(domain) -> str:
+    return f"{domain}/chat"
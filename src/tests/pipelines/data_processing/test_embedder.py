@@ -0,0 +1,183 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from healthcare_chatbot.embeddings import CachedEmbeddings
+from healthcare_chatbot.pipelines.data_processing.embedder import BatchEmbedder
+
+
+def fake_embedding(text: str) -> list[float]:
+    return [float(len(text)), float(sum(text.encode()) % 97)]
+
+
+class EmbeddingHandler(BaseHTTPRequestHandler):
+    """Serves ``POST /embeddings``, rate limiting every ``rate_limit_every``-th
+    request for ``retry_after`` seconds and failing any batch containing one of the
+    ``poison`` texts."""
+
+    def do_POST(self):
+        server = self.server
+        texts = json.loads(self.rfile.read(int(self.headers["Content-Length"])))[
+            "input"
+        ]
+        with server.lock:
+            server.requests += 1
+            rate_limited = (
+                server.rate_limit_every
+                and server.requests % server.rate_limit_every == 0
+            )
+            if not rate_limited:
+                server.embedded.extend(texts)
+
+        if rate_limited:
+            self._send(
+                429, {"error": "rate limited"}, {"Retry-After": server.retry_after}
+            )
+        elif server.poison.intersection(texts):
+            self._send(400, {"error": "bad input"})
+        else:
+            self._send(
+                200,
+                {"data": [{"embedding": fake_embedding(text)} for text in texts]},
+            )
+
+    def _send(self, status: int, body: dict, headers: dict | None = None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HttpEmbeddings(Embeddings):
+    def __init__(self, url: str):
+        self.url = url
+
+    def embed_documents(self, texts):
+        response = httpx.post(self.url, json={"input": texts})
+        response.raise_for_status()
+        return [item["embedding"] for item in response.json()["data"]]
+
+    async def aembed_documents(self, texts):
+        async with httpx.AsyncClient() as client:
+            response = await client.post(self.url, json={"input": texts})
+        response.raise_for_status()
+        return [item["embedding"] for item in response.json()["data"]]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EmbeddingHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.rate_limit_every = 0
+    server.retry_after = "0"
+    server.poison = set()
+    server.embedded = []
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def model(server):
+    return HttpEmbeddings(f"http://127.0.0.1:{server.server_address[1]}/embeddings")
+
+
+def test_batches_within_token_and_text_budgets():
+    embedder = BatchEmbedder(
+        HttpEmbeddings(""),
+        max_tokens_per_batch=10,
+        max_texts_per_batch=3,
+        count_tokens=len,
+    )
+
+    assert embedder.batches(["aaaa", "bbbb", "cc", "d", "eeeeeeeeeeeeeeee", "f"]) == [
+        (0, 3),
+        (3, 4),
+        (4, 5),
+        (5, 6),
+    ]
+
+
+def test_embeds_in_order(server, model):
+    texts = [f"Chunk {i} " * (i % 7 + 1) for i in range(100)]
+    embedder = BatchEmbedder(model, max_tokens_per_batch=50, max_concurrency=4)
+
+    assert embedder.embed_documents(texts) == [fake_embedding(text) for text in texts]
+    assert embedder.requests == len(embedder.batches(texts)) > 1
+
+
+def test_backs_off_when_rate_limited(server, model):
+    server.rate_limit_every = 3
+    texts = [f"Chunk {i}" for i in range(60)]
+    embedder = BatchEmbedder(model, max_texts_per_batch=5, backoff=0.01)
+
+    assert embedder.embed_documents(texts) == [fake_embedding(text) for text in texts]
+    assert embedder.rate_limited > 0
+    assert sorted(server.embedded) == sorted(texts)
+
+
+def test_caps_the_retry_after_delay(server, model):
+    server.rate_limit_every = 2
+    server.retry_after = "86400"
+    texts = [f"Chunk {i}" for i in range(10)]
+    embedder = BatchEmbedder(model, max_texts_per_batch=5, max_backoff=0.1)
+
+    start = time.perf_counter()
+    assert embedder.embed_documents(texts) == [fake_embedding(text) for text in texts]
+    assert embedder.rate_limited > 0
+    assert time.perf_counter() - start < 5
+
+
+def test_resumes_from_cached_batches(server, model, tmp_path):
+    server.poison = {"Chunk 7"}
+    texts = [f"Chunk {i}" for i in range(20)]
+
+    def embedder():
+        cached = CachedEmbeddings(model, "fake", path=str(tmp_path / "cache.db"))
+        return BatchEmbedder(cached, max_texts_per_batch=5, backoff=0.01)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        embedder().embed_documents(texts)
+
+    server.poison.clear()
+    server.embedded.clear()
+    assert embedder().embed_documents(texts) == [fake_embedding(text) for text in texts]
+    # Only the batch which failed is embedded again
+    assert server.embedded == texts[5:10]
+
+
+def test_shared_between_threads(server, model):
+    # Like the nodes of a ThreadRunner sharing the embedding model of the vector store
+    embedder = BatchEmbedder(model, max_texts_per_batch=5)
+    results = {}
+
+    def embed(name):
+        texts = [f"{name} chunk {i}" for i in range(30)]
+        results[name] = embedder.embed_documents(texts) == [
+            fake_embedding(text) for text in texts
+        ]
+
+    threads = [threading.Thread(target=embed, args=(name,)) for name in "ABCD"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {name: True for name in "ABCD"}
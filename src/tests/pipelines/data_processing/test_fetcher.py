@@ -0,0 +1,161 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from healthcare_chatbot.pipelines.data_processing.fetcher import WebsiteFetcher
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves ``/page/<n>`` with an ETag, ``/flaky`` which fails twice before
+    succeeding, ``/busy`` which asks to retry a day later once, and a 404 for
+    anything else."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.path)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            # Hold the request open long enough for the others to pile up
+            time.sleep(0.05)
+
+            if self.path.startswith("/page/"):
+                etag = f'"{self.path}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self._send(200, f"<html><title>{self.path}</title></html>", etag)
+            elif self.path == "/flaky":
+                with server.lock:
+                    server.flaky_calls += 1
+                    failing = server.flaky_calls <= 2
+                self._send(503 if failing else 200, "<html>flaky</html>")
+            elif self.path == "/busy":
+                with server.lock:
+                    server.busy_calls += 1
+                    failing = server.busy_calls == 1
+                headers = {"Retry-After": "86400"} if failing else {}
+                self._send(
+                    503 if failing else 200, "<html>busy</html>", headers=headers
+                )
+            else:
+                self._send(404, "Not Found")
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(
+        self,
+        status: int,
+        body: str,
+        etag: str | None = None,
+        headers: dict | None = None,
+    ):
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        if etag is not None:
+            self.send_header("ETag", etag)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.in_flight = 0
+    server.max_in_flight = 0
+    server.flaky_calls = 0
+    server.busy_calls = 0
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def url(server, path: str) -> str:
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+
+def test_fetches_pages_in_order(server):
+    urls = [url(server, f"/page/{i}") for i in range(8)]
+
+    pages = WebsiteFetcher(max_per_host=4).fetch(urls)
+
+    assert [page.url for page in pages] == urls
+    assert [page.html for page in pages] == [
+        f"<html><title>/page/{i}</title></html>" for i in range(8)
+    ]
+
+
+def test_caps_concurrent_requests_per_host(server):
+    urls = [url(server, f"/page/{i}") for i in range(12)]
+
+    WebsiteFetcher(max_per_host=3).fetch(urls)
+
+    assert 1 < server.max_in_flight <= 3
+
+
+def test_retries_failed_requests(server):
+    (page,) = WebsiteFetcher(retries=3, backoff=0.01).fetch([url(server, "/flaky")])
+
+    assert page.html == "<html>flaky</html>"
+    assert server.requests.count("/flaky") == 3
+
+
+def test_gives_up_after_retries(server):
+    with pytest.raises(httpx.HTTPStatusError):
+        WebsiteFetcher(retries=1, backoff=0.01).fetch([url(server, "/flaky")])
+
+    assert server.requests.count("/flaky") == 2
+
+
+def test_caps_the_retry_after_delay(server):
+    start = time.perf_counter()
+    (page,) = WebsiteFetcher(max_backoff=0.1).fetch([url(server, "/busy")])
+
+    assert page.html == "<html>busy</html>"
+    assert time.perf_counter() - start < 5
+
+
+def test_does_not_retry_client_errors(server):
+    with pytest.raises(httpx.HTTPStatusError):
+        WebsiteFetcher(retries=3, backoff=0.01).fetch([url(server, "/missing")])
+
+    assert server.requests.count("/missing") == 1
+
+
+def test_returns_the_errors_of_failed_pages_in_their_place(server):
+    urls = [url(server, "/page/0"), url(server, "/missing"), url(server, "/page/1")]
+
+    pages = WebsiteFetcher(backoff=0.01).fetch(urls, return_exceptions=True)
+
+    assert [page.url for page in pages[::2]] == urls[::2]
+    assert isinstance(pages[1], httpx.HTTPStatusError)
+    assert pages[1].response.status_code == 404
+
+
+def test_revalidates_cached_pages(server, tmp_path):
+    urls = [url(server, f"/page/{i}") for i in range(3)]
+    fetcher = WebsiteFetcher(cache_dir=str(tmp_path))
+
+    first = fetcher.fetch(urls)
+    second = fetcher.fetch(urls)
+
+    assert not any(page.not_modified for page in first)
+    assert all(page.not_modified for page in second)
+    assert [page.html for page in second] == [page.html for page in first]
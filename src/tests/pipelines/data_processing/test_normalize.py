@@ -0,0 +1,110 @@
+import random
+import re
+
+import pytest
+
+from healthcare_chatbot.pipelines.data_processing.normalize import (
+    clean_pdf_text,
+    clean_web_text,
+    fix_mojibake,
+    normalize_unicode,
+)
+
+
+def previous_clean_pdf_text(text: str) -> str:
+    # The passes parse_pdf used to take on every page
+    text = re.sub(r"(\w+)-\n(\w+)", r"\1\2", text)
+    text = re.sub(r"(?<!\n\s)\n(?!\n\s)", " ", text.strip())
+    return re.sub(r"\n\s*\n", "\n\n", text)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        (
+            "Diabetes is a chronic dis-\nease that affects\nhow your body\n"
+            "turns food into energy.",
+            "Diabetes is a chronic disease that affects how your body turns food "
+            "into energy.",
+        ),
+        (
+            "  Insulin\n \nMetformin\n\n\n  Foot care\n",
+            "Insulin  \nMetformin\n\n  Foot care",
+        ),
+        ("self-\nmonitoring of blood-\nglucose", "selfmonitoring of bloodglucose"),
+        # The word after a merged line break is not merged again
+        ("multi-\nlevel-\ncare", "multilevel- care"),
+        ("Type 2\n\nDiabetes\n \n\nTreatment", "Type 2  Diabetes  \n Treatment"),
+        ("- Exercise\n- Diet", "- Exercise - Diet"),
+    ],
+)
+def test_cleans_pdf_text(text, expected):
+    assert clean_pdf_text(text) == expected
+
+
+def test_cleans_pdf_text_like_the_previous_passes():
+    rng = random.Random(0)
+    alphabet = ["a", "b", "1", "_", "-", ".", " ", "\t", "\n", "\n", "\r"]
+    for _ in range(20_000):
+        text = "".join(rng.choices(alphabet, k=rng.randint(0, 16)))
+        assert clean_pdf_text(text) == previous_clean_pdf_text(text), repr(text)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("  Diabetes\n\n\tTreatment \r\n", "Diabetes Treatment"),
+        ("Blood\xa0glucose levels", "Blood glucose levels"),
+        ("", ""),
+    ],
+)
+def test_cleans_web_text(text, expected):
+    assert clean_web_text(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # UTF-8 decoded as Windows-1252, Latin-1 and Mac OS Roman
+        ("cafÃ© and the patientâ€™s diet", "café and the patient’s diet"),
+        ("the patient\xe2\x80\x99s diet", "the patient’s diet"),
+        ("underlying √ü-cell dysfunction", "underlying ß-cell dysfunction"),
+        ("the patient‚Äôs diet", "the patient’s diet"),
+        ("5 Âµg and 5 Î¼g", "5 µg and 5 μg"),
+        # Legitimate text with the same characters
+        ("naïve café, 37°C, l’été", "naïve café, 37°C, l’été"),
+        ("Ã", "Ã"),
+        ("ß®", "ß®"),
+        ("Straße ©, Größe ±5%", "Straße ©, Größe ±5%"),
+    ],
+)
+def test_fixes_mojibake(text, expected):
+    assert fix_mojibake(text) == expected
+
+
+def test_normalizes_ligatures_and_compatibility_characters():
+    assert normalize_unicode("ﬁbre and ﬂuids") == "fibre and fluids"
+    assert normalize_unicode("Blood\xa0glucose") == "Blood glucose"
+    assert normalize_unicode("√ü-cell") == "ß-cell"
+    assert clean_pdf_text("The ﬁrst-\nline treat-\nment") == "The firstline treatment"
+    assert normalize_unicode("ＨｂＡ１ｃ\u3000７％") == "HbA1c 7%"
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Platelets 150 × 10⁹/L",
+        "Dose: 75 mg/m²",
+        "CO₂ and H₂O",
+        "5 µg and 5 μg",
+        "Fuß, Größe, Straße",
+        "café, crème brûlée, façade, naïve",
+        "ß®",
+    ],
+)
+def test_keeps_medical_notation_and_accented_text(text):
+    assert normalize_unicode(text) == text
+
+
+def test_composes_decomposed_characters():
+    assert normalize_unicode("cafe\u0301 and Gro\u0308\u00dfe") == "café and Größe"
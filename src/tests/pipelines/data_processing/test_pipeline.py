@@ -7,3 +7,181 @@ Kedro recommends using `pytest` framework, more info about it can be found
 in the official documentation:
 https://docs.pytest.org/en/latest/getting-started.html
 """
+
+import time
+from types import SimpleNamespace
+
+import chromadb
+import httpx
+import pytest
+from kedro.io import DataCatalog
+from kedro.runner import ParallelRunner, ThreadRunner
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents.base import Document
+
+from healthcare_chatbot.datasets import JSONLinesDataset
+from healthcare_chatbot.pipelines.data_processing import create_pipeline
+from healthcare_chatbot.pipelines.data_processing.fetcher import FetchedPage
+from healthcare_chatbot.pipelines.data_processing.nodes import index_websites
+from healthcare_chatbot.pipelines.data_processing.registry import SourceRegistry
+from healthcare_chatbot.vector_store import VectorStoreDataset
+
+SOURCES = 12
+CHUNKS_PER_SOURCE = 40
+
+
+class FakeOpenAIEmbeddings(DeterministicFakeEmbedding):
+    def __init__(self, model: str, openai_api_key: str, max_retries: int):
+        super().__init__(size=16)
+
+
+def fake_docs(prefix: str, source_type: str):
+    def iter_docs(sources, *args, **kwargs):
+        for i in range(SOURCES):
+            source = f"{prefix}-{i}"
+            # Give the other node a chance to write in between
+            time.sleep(0.01)
+            yield (
+                source,
+                [
+                    Document(
+                        page_content=f"{source} chunk {j}",
+                        metadata={"source": source, "source_type": source_type},
+                    )
+                    for j in range(CHUNKS_PER_SOURCE)
+                ],
+            )
+
+    return iter_docs
+
+
+class FlakyFetcher:
+    """Fetches a page for every URL, except for the URLs in ``down``."""
+
+    down: set[str] = set()
+
+    def __init__(self, **kwargs):
+        pass
+
+    def fetch(self, urls: list[str], return_exceptions: bool = False) -> list:
+        return [
+            httpx.ConnectError(f"{url} is down")
+            if url in self.down
+            else FetchedPage(url, f"<html><title>{url}</title>Content of {url}</html>")
+            for url in urls
+        ]
+
+
+@pytest.fixture
+def catalog(tmp_path, monkeypatch, mocker):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr("langchain_openai.OpenAIEmbeddings", FakeOpenAIEmbeddings)
+    nodes = "healthcare_chatbot.pipelines.data_processing.nodes"
+    mocker.patch(f"{nodes}.iter_website_docs", fake_docs("https://site", "website"))
+    mocker.patch(f"{nodes}.iter_pdf_docs", fake_docs("data/01_raw/pdfs/doc", "pdf"))
+
+    db_params = {
+        "path": "db",
+        "collection_name": "healthcare",
+        "version_file": "db/healthcare.version",
+        "registry_path": "db/healthcare.registry.db",
+        "snapshot_dir": "db/snapshots",
+        "snapshots_to_keep": 2,
+    }
+    return DataCatalog(
+        datasets={
+            "vector_store": VectorStoreDataset(
+                db_params=db_params,
+                embedding_model_name="text-embedding-ada-002",
+                embedding_cache_params={"max_entries": 0, "path": None},
+                embedding_batching_params={"max_texts_per_batch": 8},
+                credentials={"OPENAI_API_KEY": "sk-test"},
+            ),
+            "docs_dict": JSONLinesDataset(filepath="data/websites.jsonl"),
+            "pdfs_dict": JSONLinesDataset(filepath="data/pdfs.jsonl"),
+        },
+        feed_dict={
+            "params:websites": [],
+            "params:fetcher": {"cache_dir": "data/http_cache"},
+            "params:pdfs_dir_path": "data/01_raw/pdfs",
+            "params:pdf_parsing": {},
+            "params:vector_db": db_params,
+            "params:splitter": {
+                "chunk_size": 1000,
+                "chunk_overlap": 100,
+                "separators": ["\n\n", "\n", " ", ""],
+            },
+            # Small batches, so the writes of the two nodes interleave
+            "params:ingestion": {"queue_size": 2, "batch_size": 16},
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "runner", [ThreadRunner(max_workers=2), ParallelRunner(max_workers=2)]
+)
+def test_indexes_websites_and_pdfs_concurrently(catalog, runner, tmp_path):
+    runner.run(create_pipeline(), catalog)
+
+    total = 2 * SOURCES * CHUNKS_PER_SOURCE
+    collection = chromadb.PersistentClient(path=str(tmp_path / "db")).get_collection(
+        "healthcare"
+    )
+    assert collection.count() == total
+    # Every chunk made it into the vector index, not only into the metadata
+    results = collection.query(
+        query_embeddings=[[0.0] * 16], n_results=total, include=[]
+    )
+    assert len(results["ids"][0]) == total
+
+    registry = SourceRegistry(str(tmp_path / "db" / "healthcare.registry.db"))
+    assert len(registry.sources_of_type("website")) == SOURCES
+    assert len(registry.sources_of_type("pdf")) == SOURCES
+    registry.close()
+    assert list((tmp_path / "db" / "snapshots").iterdir())
+
+
+def test_index_websites_keeps_the_websites_which_failed(tmp_path, monkeypatch, mocker):
+    monkeypatch.chdir(tmp_path)
+    mocker.patch(
+        "healthcare_chatbot.pipelines.data_processing.nodes.WebsiteFetcher",
+        FlakyFetcher,
+    )
+    client = chromadb.EphemeralClient()
+    vector_store = SimpleNamespace(
+        collection=client.get_or_create_collection("test-flaky-websites"),
+        embedding_model=DeterministicFakeEmbedding(size=16),
+        writing=None,
+    )
+    websites = ["https://a.sg", "https://b.sg"]
+    args = (
+        {},
+        vector_store,
+        {"registry_path": "db/registry.db", "version_file": "db/version"},
+        {"chunk_size": 1000, "chunk_overlap": 100, "separators": ["\n\n", "\n"]},
+        {"queue_size": 2, "batch_size": 16},
+    )
+
+    def run(down: set[str]) -> list[str]:
+        monkeypatch.setattr(FlakyFetcher, "down", down)
+        # Saves the yielded documents the way Kedro does
+        docs_dict = JSONLinesDataset(filepath="data/websites.jsonl")
+        for docs in index_websites(websites, *args):
+            docs_dict.save(docs)
+        return [doc["metadata"]["source"] for doc in docs_dict.load()]
+
+    try:
+        # There are no documents to leave in place on the first run
+        with pytest.raises(RuntimeError, match="None of the 2 website"):
+            run(down=set(websites))
+        assert not (tmp_path / "data" / "websites.jsonl").exists()
+
+        assert run(down=set()) == websites
+        # The chunks of the website which is down stay in the collection
+        assert run(down={"https://b.sg"}) == ["https://a.sg"]
+        assert vector_store.collection.count() == 2
+        # The documents of the previous run are left alone when nothing was fetched
+        assert run(down=set(websites)) == ["https://a.sg"]
+        assert vector_store.collection.count() == 2
+    finally:
+        client.delete_collection("test-flaky-websites")
@@ -0,0 +1,83 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from healthcare_chatbot.pipelines.data_processing.streaming import (
+    BackgroundWorker,
+    bounded_map,
+    prefetch,
+)
+
+
+def test_prefetch_yields_in_order():
+    assert list(prefetch(range(100), maxsize=4)) == list(range(100))
+
+
+def test_prefetch_stays_bounded():
+    produced = []
+
+    def produce():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    items = prefetch(produce(), maxsize=4)
+    next(items)
+    time.sleep(0.2)
+
+    # The item yielded, the items buffered and the item waiting to be buffered
+    assert len(produced) <= 1 + 4 + 1
+    items.close()
+
+
+def test_prefetch_raises_errors():
+    def produce():
+        yield 1
+        raise ValueError("Corrupt PDF")
+
+    items = prefetch(produce())
+
+    assert next(items) == 1
+    with pytest.raises(ValueError, match="Corrupt PDF"):
+        next(items)
+
+
+def test_bounded_map_keeps_window_in_flight():
+    lock = threading.Lock()
+    started = []
+
+    def square(x):
+        with lock:
+            started.append(x)
+        return x * x
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = bounded_map(executor, square, list(range(20)), chunksize=2, window=3)
+        assert next(results) == 0
+        time.sleep(0.1)
+        # Only the first three chunks were submitted before the first result
+        assert sorted(started) == list(range(6))
+        assert [0, *results] == [x * x for x in range(20)]
+
+
+def test_background_worker_processes_in_order():
+    processed = []
+    worker = BackgroundWorker(processed.append, maxsize=2)
+    for i in range(10):
+        worker.submit(i)
+    worker.close()
+
+    assert processed == list(range(10))
+
+
+def test_background_worker_raises_errors():
+    def fail(item):
+        raise RuntimeError("Upsert failed")
+
+    worker = BackgroundWorker(fail)
+    worker.submit(1)
+
+    with pytest.raises(RuntimeError, match="Upsert failed"):
+        worker.close()
@@ -0,0 +1,206 @@
+from pathlib import Path
+
+import chromadb
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_core.documents.base import Document
+
+from healthcare_chatbot.pipelines.data_processing.registry import SourceRegistry
+from healthcare_chatbot.pipelines.data_processing.utils import (
+    SourceType,
+    chunk_ids,
+    iter_pdf_docs,
+    sync_collection,
+)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    calls: int = 0
+    texts: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        self.texts += len(texts)
+        return super().embed_documents(texts)
+
+
+def chunk(source: str, content: str, page: int = 1) -> Document:
+    return Document(
+        page_content=content,
+        metadata={"source": source, "page": page, "source_type": SourceType.PDF.value},
+    )
+
+
+def write_pdf(path: str, pages: int, lines_per_page: int) -> None:
+    """Writes a PDF with lines of text on every page, without any PDF library."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # The page tree, once the page objects are numbered
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for page in range(pages):
+        text = " T* ".join(
+            f"(Page {page + 1}, line {i}: check your feet daily for cuts.) Tj"
+            for i in range(lines_per_page)
+        )
+        stream = f"BT /F1 10 Tf 14 TL 40 800 Td {text} ET".encode()
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = " ".join(f"{i} 0 R" for i in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for i, obj in enumerate(objects, start=1):
+        offsets.append(len(content))
+        content += b"%d 0 obj\n%s\nendobj\n" % (i, obj)
+    xref = len(content)
+    content += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    content += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    content += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    Path(path).write_bytes(content)
+
+
+@pytest.fixture
+def collection():
+    client = chromadb.EphemeralClient()
+    yield client.get_or_create_collection("test-sync")
+    client.delete_collection("test-sync")
+
+
+@pytest.fixture
+def registry(tmp_path):
+    registry = SourceRegistry(str(tmp_path / "registry.db"))
+    yield registry
+    registry.close()
+
+
+def test_chunk_ids_are_deterministic():
+    chunks = [chunk("a.pdf", "Insulin"), chunk("a.pdf", "Metformin", page=2)]
+
+    assert chunk_ids(chunks) == chunk_ids(
+        [chunk("a.pdf", "Insulin"), chunk("a.pdf", "Metformin", page=2)]
+    )
+    assert len(set(chunk_ids(chunks))) == 2
+
+
+def test_chunk_ids_tell_duplicates_apart():
+    ids = chunk_ids([chunk("a.pdf", "Disclaimer")] * 3)
+
+    assert ids[1:] == [f"{ids[0]}-1", f"{ids[0]}-2"]
+
+
+def test_parses_pdfs_in_a_process_pool_like_in_process(tmp_path):
+    pdfs_paths = []
+    for i, pages in enumerate([3, 1, 4, 1, 5]):
+        pdfs_paths.append(str(tmp_path / f"doc-{i}.pdf"))
+        write_pdf(pdfs_paths[-1], pages, lines_per_page=10)
+    splitter = {"chunk_size": 300, "chunk_overlap": 30, "separators": ["\n", " "]}
+
+    def parsed(**kwargs) -> list[tuple[str, list[tuple[str, dict]]]]:
+        return [
+            (pdf_path, [(ds.page_content, ds.metadata) for ds in data_split])
+            for pdf_path, data_split in iter_pdf_docs(pdfs_paths, **splitter, **kwargs)
+        ]
+
+    serial = parsed(workers=1)
+    parallel = parsed(workers=3, chunksize=2)
+
+    assert parallel == serial
+    assert [pdf_path for pdf_path, _ in parallel] == pdfs_paths
+    _, chunks = parallel[2]
+    assert {metadata["page"] for _, metadata in chunks} == {1, 2, 3, 4}
+    assert all(metadata["source_type"] == "pdf" for _, metadata in chunks)
+
+
+def test_sync_skips_unchanged_sources(collection, registry, mocker):
+    embedding_model = CountingEmbeddings(size=8)
+    chunks = [chunk("a.pdf", "Insulin"), chunk("b.pdf", "Metformin")]
+
+    sources = ["a.pdf", "b.pdf"]
+    assert sync_collection(
+        collection, chunks, SourceType.PDF, sources, embedding_model, registry
+    ) == (2, 0, 0)
+
+    get = mocker.spy(type(collection), "get")
+    assert sync_collection(
+        collection, chunks, SourceType.PDF, sources, embedding_model, registry
+    ) == (0, 0, 2)
+
+    assert embedding_model.calls == 1
+    # The registry answers which sources changed, without searching the collection
+    get.assert_not_called()
+    assert collection.count() == 2
+
+
+def test_sync_replaces_edited_and_deletes_removed_chunks(collection, registry):
+    embedding_model = CountingEmbeddings(size=8)
+    sync_collection(
+        collection,
+        [chunk("a.pdf", "Insulin"), chunk("b.pdf", "Metformin")],
+        SourceType.PDF,
+        ["a.pdf", "b.pdf"],
+        embedding_model,
+        registry,
+    )
+
+    # a.pdf is edited and b.pdf is removed
+    edited = [chunk("a.pdf", "Insulin pens")]
+    assert sync_collection(
+        collection, edited, SourceType.PDF, ["a.pdf"], embedding_model, registry
+    ) == (1, 2, 0)
+
+    assert embedding_model.texts == 3
+    assert collection.get()["documents"] == ["Insulin pens"]
+
+
+def test_sync_leaves_other_source_types_alone(collection, registry):
+    embedding_model = CountingEmbeddings(size=8)
+    website = Document(
+        page_content="Foot care",
+        metadata={"source": "https://example.com", "source_type": "website"},
+    )
+    sync_collection(
+        collection,
+        [website],
+        SourceType.WEBSITE,
+        ["https://example.com"],
+        embedding_model,
+        registry,
+    )
+
+    sync_collection(collection, [], SourceType.PDF, [], embedding_model, registry)
+
+    assert collection.get()["documents"] == ["Foot care"]
+
+
+def test_sync_replaces_unregistered_chunks(collection, registry):
+    # Indexed before the chunks had deterministic IDs and the registry existed
+    collection.add(
+        ids=["legacy"],
+        documents=["Insulin"],
+        embeddings=[[0.0] * 8],
+        metadatas=[{"source": "a.pdf", "page": 1}],
+    )
+
+    assert sync_collection(
+        collection,
+        [chunk("a.pdf", "Insulin")],
+        SourceType.PDF,
+        ["a.pdf"],
+        CountingEmbeddings(size=8),
+        registry,
+    ) == (1, 1, 0)
+
+    assert collection.get()["ids"] == chunk_ids([chunk("a.pdf", "Insulin")])
+    assert registry.lookup(["a.pdf"])["a.pdf"].chunk_ids == collection.get()["ids"]
@@ -7,3 +7,135 @@ Kedro recommends using `pytest` framework, more info about it can be found
 in the official documentation:
 https://docs.pytest.org/en/latest/getting-started.html
 """
+
+import pandas as pd
+import pytest
+
+from healthcare_chatbot.checkpoint import JSONLinesCheckpoint
+from healthcare_chatbot.pipelines.data_science.nodes import get_responses
+
+
+@pytest.fixture
+def responses_params(tmp_path):
+    return {
+        "mode": "http",
+        "checkpoint_path": str(tmp_path / "responses.checkpoint.jsonl"),
+        "max_concurrency": 4,
+        "retries": 1,
+        "backoff": 0.01,
+        "max_backoff": 0.1,
+        "timeout": 10,
+    }
+
+
+def run(domain, queries, previous_responses_df, responses_params, **window):
+    return get_responses(
+        pd.DataFrame({"queries": queries}),
+        previous_responses_df,
+        {"domain": domain, "chat_endpoint": "/chat"},
+        responses_params,
+        window.get("start_index"),
+        window.get("end_index"),
+    )
+
+
+def test_gets_responses_in_the_order_of_the_queries(domain, responses_params):
+    queries = [f"query {i}" for i in range(10)]
+
+    responses_df = run(domain, queries, None, responses_params)
+
+    assert responses_df["queries"].to_list() == queries
+    assert responses_df.loc[2].to_dict() == {
+        "queries": "query 2",
+        "responses": "The answer to query 2",
+        "page_contents": "The context of query 2",
+        "sources": "https://www.healthhub.sg",
+        "run_id": responses_df.loc[0, "run_id"],
+    }
+    assert responses_df["run_id"].nunique() == 1
+
+
+def test_only_sends_the_queries_without_responses(server, domain, responses_params):
+    queries = ["query 0", "broken query", "query 2", "query 3"]
+
+    # The broken query fails without stopping the others
+    first_df = run(domain, queries, None, responses_params, end_index=2)
+    assert first_df["queries"].to_list() == ["query 0", "query 2"]
+
+    server.requests.clear()
+    second_df = run(domain, queries, first_df, responses_params)
+
+    # Only the new responses are returned, to be appended to the previous ones
+    assert sorted(server.requests) == ["broken query", "broken query", "query 3"]
+    assert second_df["queries"].to_list() == ["query 3"]
+
+
+def test_resumes_from_the_checkpoint_after_a_crash(
+    server, domain, responses_params, mocker
+):
+    queries = [f"query {i}" for i in range(6)]
+    previous_df = run(domain, queries[:1], None, responses_params)
+
+    # The run crashes after getting two responses, before saving any of them
+    calls = 0
+    append = JSONLinesCheckpoint.append
+
+    def crash_after_two(self, record):
+        nonlocal calls
+        calls += 1
+        if calls > 2:
+            raise KeyboardInterrupt
+        append(self, record)
+
+    mocker.patch.object(JSONLinesCheckpoint, "append", crash_after_two)
+    with pytest.raises(KeyboardInterrupt):
+        run(domain, queries, previous_df, responses_params)
+    mocker.stopall()
+    checkpointed = [
+        record["queries"]
+        for record in JSONLinesCheckpoint(responses_params["checkpoint_path"]).load()
+    ]
+    assert len(checkpointed) == 2
+
+    server.requests.clear()
+    responses_df = run(domain, queries, previous_df, responses_params)
+
+    assert sorted(server.requests) == sorted(set(queries[1:]) - set(checkpointed))
+    assert sorted(responses_df["queries"]) == queries[1:]
+    assert responses_df["queries"].to_list()[:2] == checkpointed
+
+    # Once saved, the responses are dropped from the checkpoint on the next run
+    server.requests.clear()
+    run(domain, queries, pd.concat([previous_df, responses_df]), responses_params)
+    assert server.requests == []
+    assert JSONLinesCheckpoint(responses_params["checkpoint_path"]).load() == []
+
+
+def test_answers_in_process_without_a_server(responses_params, mocker):
+    async def chat(payload: dict) -> dict:
+        return {
+            "query": payload["query"],
+            "response": f"The answer to {payload['query']}",
+            "source_documents": [
+                {"page_content": "The context", "metadata": {"source": "a.pdf"}}
+            ],
+        }
+
+    mocker.patch(
+        "healthcare_chatbot.pipelines.data_science.nodes.chat_handler",
+        return_value=chat,
+    )
+    responses_params["mode"] = "in_process"
+
+    queries = ["query 0", "query 1"]
+    responses_df = run("http://127.0.0.1:8000", queries, None, responses_params)
+
+    assert responses_df.drop(columns="run_id").to_dict("records") == [
+        {
+            "queries": f"query {i}",
+            "responses": f"The answer to query {i}",
+            "page_contents": "The context",
+            "sources": "a.pdf",
+        }
+        for i in range(2)
+    ]
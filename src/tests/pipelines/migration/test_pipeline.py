@@ -0,0 +1,81 @@
+"""
+This is a boilerplate test file for pipeline 'migration'
+generated using Kedro 0.19.3.
+Please add your pipeline tests here.
+
+Kedro recommends using `pytest` framework, more info about it can be found
+in the official documentation:
+https://docs.pytest.org/en/latest/getting-started.html
+"""
+
+import pandas as pd
+
+from healthcare_chatbot.evaluations import evaluation_key
+from healthcare_chatbot.pipelines.migration.nodes import (
+    migrate_evaluations,
+    migrate_responses,
+)
+
+
+def legacy_responses() -> pd.DataFrame:
+    # UTF-8 text loaded as Latin-1, like responses.csv
+    return pd.DataFrame(
+        {
+            "queries": [
+                "What is GDM?",
+                "What is GDM?",
+                "What is insulin?",
+                "What is insulin?",
+            ],
+            "responses": [
+                "Caused by Ã\x9f-cell dysfunction",
+                "Another response",
+                "A hormone",
+                "A hormone",
+            ],
+            "page_contents": ["The context", "The context", None, None],
+            "sources": ["a.pdf", "a.pdf", None, None],
+        }
+    )
+
+
+def test_migrates_every_response_once():
+    responses_df = migrate_responses(legacy_responses(), None)
+
+    assert responses_df["queries"].to_list() == legacy_responses()["queries"].to_list()
+    assert responses_df.loc[0, "responses"] == "Caused by ß-cell dysfunction"
+    assert responses_df["run_id"].nunique() == 1
+
+    # The responses already migrated are skipped, even the same response twice
+    assert migrate_responses(legacy_responses(), responses_df).empty
+    assert migrate_responses(legacy_responses(), responses_df[:3])[
+        ["queries", "responses"]
+    ].to_dict("records") == [{"queries": "What is insulin?", "responses": "A hormone"}]
+    assert migrate_responses(None, None).empty
+
+
+def test_migrates_evaluations_once():
+    evaluation = {
+        # Decoded as Mac OS Roman
+        "query": "What is GDM?",
+        "response": "Caused by √ü-cell dysfunction",
+        "page_content": "The context",
+        "coherence": {"reasoning": "Itâ€™s clear", "value": "Y", "score": 1},
+        "relevance": {"error": "Timed out"},
+    }
+
+    evaluations_df = migrate_evaluations([evaluation, evaluation], None)
+
+    # The keys of the migrated evaluations match the migrated responses
+    assert set(evaluations_df["key"]) == {
+        evaluation_key("What is GDM?", "Caused by ß-cell dysfunction", "The context")
+    }
+    assert evaluations_df["criteria"].to_list() == ["coherence", "relevance"]
+    assert evaluations_df.loc[0, "reasoning"] == "It’s clear"
+    # A criteria which failed to be evaluated has no score
+    assert evaluations_df["score"].to_list()[0] == 1
+    assert evaluations_df["score"].isna().to_list() == [False, True]
+    assert evaluations_df.loc[1, "error"] == "Timed out"
+
+    assert migrate_evaluations([evaluation], evaluations_df[["key"]]).empty
+    assert migrate_evaluations(None, None).empty
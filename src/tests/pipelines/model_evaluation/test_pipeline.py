@@ -7,3 +7,226 @@ Kedro recommends using `pytest` framework, more info about it can be found
 in the official documentation:
 https://docs.pytest.org/en/latest/getting-started.html
 """
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from healthcare_chatbot.checkpoint import JSONLinesCheckpoint
+from healthcare_chatbot.pipelines.model_evaluation.nodes import (
+    generate_barplot,
+    get_evaluations,
+    summarise_scores,
+)
+
+
+@pytest.fixture
+def evaluations_params(tmp_path):
+    return {
+        "mode": "http",
+        "checkpoint_path": str(tmp_path / "evaluations.checkpoint.jsonl"),
+        "max_concurrency": 4,
+        "retries": 1,
+        "backoff": 0.01,
+        "max_backoff": 0.1,
+        "timeout": 10,
+    }
+
+
+def responses(queries: list[str]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "queries": queries,
+            "responses": [f"The answer to {query}" for query in queries],
+            "page_contents": [f"The context of {query}" for query in queries],
+            "sources": ["https://www.healthhub.sg"] * len(queries),
+        }
+    )
+
+
+def run(domain, responses_df, previous_evaluations_df, evaluations_params, **window):
+    return get_evaluations(
+        responses_df,
+        previous_evaluations_df,
+        {"domain": domain, "eval_endpoint": "/evaluate"},
+        evaluations_params,
+        window.get("start_eval_index"),
+        window.get("end_eval_index"),
+    )
+
+
+def evaluated_queries(evaluations_df: pd.DataFrame) -> list[str]:
+    # The evaluations have a row per criteria
+    return evaluations_df.drop_duplicates("key")["query"].to_list()
+
+
+def test_evaluates_each_response_once(server, domain, evaluations_params):
+    responses_df = responses(["query 0", "query 1", "query 0", "limited query"])
+
+    evaluations_df = run(domain, responses_df, None, evaluations_params)
+
+    # The rate limited request is retried
+    assert sorted(server.requests) == [
+        "limited query",
+        "limited query",
+        "query 0",
+        "query 1",
+    ]
+    assert evaluated_queries(evaluations_df) == ["query 0", "query 1", "limited query"]
+    assert evaluations_df.loc[:1, ["criteria", "score", "seconds"]].to_dict(
+        "records"
+    ) == [
+        {"criteria": "coherence", "score": 1, "seconds": 0.1},
+        {"criteria": "correctness", "score": 0, "seconds": 0.1},
+    ]
+    assert evaluations_df["run_id"].nunique() == 1
+
+
+def test_only_evaluates_new_responses(server, domain, evaluations_params):
+    responses_df = responses(["query 0", "broken query", "query 2", "query 3"])
+    # A response without a document has no page content
+    responses_df.loc[3, "page_contents"] = None
+
+    first_df = run(domain, responses_df, None, evaluations_params, end_eval_index=2)
+    assert evaluated_queries(first_df) == ["query 0", "query 2"]
+
+    server.requests.clear()
+    second_df = run(domain, responses_df, first_df, evaluations_params)
+
+    assert sorted(server.requests) == ["broken query", "broken query", "query 3"]
+    assert evaluated_queries(second_df) == ["query 3"]
+    assert second_df["page_content"].to_list() == ["", ""]
+
+
+def test_evaluates_the_criteria_which_timed_out_again(
+    server, domain, evaluations_params
+):
+    responses_df = responses(["query 0", "timing out query"])
+
+    first_df = run(domain, responses_df, None, evaluations_params)
+    failed = first_df[first_df["error"].notna()]
+    assert failed[["query", "criteria"]].to_dict("records") == [
+        {"query": "timing out query", "criteria": "correctness"}
+    ]
+    assert failed["score"].isna().all()
+    # Only the evaluations without an error are checkpointed
+    checkpoint = JSONLinesCheckpoint(evaluations_params["checkpoint_path"])
+    assert [evaluation["query"] for evaluation in checkpoint.load()] == ["query 0"]
+
+    second_df = run(domain, responses_df, first_df, evaluations_params)
+
+    # Only the criteria which timed out is added
+    assert server.requests[2:] == ["timing out query"]
+    assert second_df[["query", "criteria", "score"]].to_dict("records") == [
+        {"query": "timing out query", "criteria": "correctness", "score": 0}
+    ]
+    assert second_df["error"].isna().all()
+
+    previous_df = pd.concat([first_df, second_df])
+    third_df = run(domain, responses_df, previous_df, evaluations_params)
+
+    assert len(server.requests) == 3
+    assert third_df.empty
+
+
+def test_resumes_from_the_checkpoint_after_a_crash(
+    server, domain, evaluations_params, mocker
+):
+    responses_df = responses([f"query {i}" for i in range(6)])
+
+    # The run crashes after getting two evaluations, before saving any of them
+    calls = 0
+    append = JSONLinesCheckpoint.append
+
+    def crash_after_two(self, record):
+        nonlocal calls
+        calls += 1
+        if calls > 2:
+            raise KeyboardInterrupt
+        append(self, record)
+
+    mocker.patch.object(JSONLinesCheckpoint, "append", crash_after_two)
+    with pytest.raises(KeyboardInterrupt):
+        run(domain, responses_df, None, evaluations_params)
+    mocker.stopall()
+
+    server.requests.clear()
+    evaluations_df = run(domain, responses_df, None, evaluations_params)
+
+    assert len(server.requests) == 4
+    assert sorted(evaluated_queries(evaluations_df)) == sorted(responses_df["queries"])
+
+
+def test_evaluates_in_process_without_a_server(evaluations_params, mocker):
+    async def evaluate(payload: dict) -> dict:
+        return {**payload, "coherence": {"score": 1}, "timings": {"coherence": 0.1}}
+
+    mocker.patch(
+        "healthcare_chatbot.pipelines.model_evaluation.nodes.evaluate_handler",
+        return_value=evaluate,
+    )
+    evaluations_params["mode"] = "in_process"
+
+    evaluations_df = run(
+        "http://127.0.0.1:8000", responses(["query 0"]), None, evaluations_params
+    )
+
+    assert evaluations_df[
+        ["query", "response", "page_content", "criteria", "score", "seconds"]
+    ].to_dict("records") == [
+        {
+            "query": "query 0",
+            "response": "The answer to query 0",
+            "page_content": "The context of query 0",
+            "criteria": "coherence",
+            "score": 1,
+            "seconds": 0.1,
+        }
+    ]
+
+
+def test_summarises_scores():
+    scores_df = pd.DataFrame(
+        {
+            "coherence": [1, 1, 0, 1, np.nan],
+            "correctness": [0, 0, 0, 0, 0],
+        },
+        dtype=float,
+    )
+
+    summary_df = summarise_scores(scores_df)
+
+    assert summary_df.loc["coherence", "count"] == 4
+    assert summary_df.loc["coherence", "mean"] == 0.75
+    assert summary_df.loc["coherence", "ci_lower"] == pytest.approx(0.26, abs=0.01)
+    # Clipped to the highest score
+    assert summary_df.loc["coherence", "ci_upper"] == 1
+    assert summary_df.loc["coherence", ["share_0", "share_1"]].to_list() == [
+        0.25,
+        0.75,
+    ]
+    # Every score is the same, so the mean is exact
+    assert summary_df.loc["correctness", ["ci_lower", "ci_upper"]].to_list() == [0, 0]
+    assert summary_df.loc["correctness", ["share_0", "share_1"]].to_list() == [1, 0]
+
+
+def test_generates_barplot_and_summary():
+    evaluations_df = pd.DataFrame(
+        [{"key": f"key {i}", "criteria": "coherence", "score": i % 2} for i in range(4)]
+        + [
+            # A criteria which failed to be evaluated has no score
+            {"key": f"key {i}", "criteria": "correctness", "score": 1 if i else None}
+            for i in range(4)
+        ]
+        # Criteria which are not plotted are left out
+        + [{"key": "key 0", "criteria": "relevance", "score": 0}]
+    )
+
+    fig, summary_df = generate_barplot(evaluations_df, ["coherence"], ["correctness"])
+
+    assert isinstance(fig, plt.Figure)
+    assert summary_df.index.to_list() == ["coherence", "correctness"]
+    assert summary_df["count"].to_list() == [4, 3]
+    assert summary_df["mean"].to_list() == [0.5, 1]
+    plt.close(fig)
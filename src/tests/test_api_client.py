@@ -0,0 +1,127 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from healthcare_chatbot.api_client import ApiClient, InProcessClient
+
+
+def payloads(queries: list[str]) -> dict[str, dict]:
+    return {query: {"query": query} for query in queries}
+
+
+def api_error(error: type[openai.APIStatusError], status: int) -> Exception:
+    # An error response of the model's API, as the handler of an endpoint gets it
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(status, request=request)
+    return error(f"Error code: {status}", response=response, body=None)
+
+
+def test_posts_concurrently(server, chat_url):
+    queries = [f"query {i}" for i in range(12)]
+    responses = {}
+
+    failures = ApiClient(chat_url, max_concurrency=4).post(
+        payloads(queries), lambda key, response: responses.update({key: response})
+    )
+
+    assert failures == {}
+    assert sorted(responses) == sorted(queries)
+    assert responses["query 3"]["response"] == "The answer to query 3"
+    assert server.max_in_flight == 4
+
+
+def test_retries_and_reports_failed_payloads(server, chat_url):
+    responses = {}
+
+    failures = ApiClient(chat_url, retries=2, backoff=0.01).post(
+        payloads(["flaky query", "limited query", "broken query", "query"]),
+        lambda key, response: responses.update({key: response}),
+    )
+
+    assert sorted(responses) == ["flaky query", "limited query", "query"]
+    assert list(failures) == ["broken query"]
+    assert "503" in failures["broken query"]
+    assert server.requests.count("broken query") == 3
+    assert server.requests.count("limited query") == 2
+
+
+def test_caps_the_retry_after_delay(server, chat_url):
+    responses = {}
+
+    start = time.perf_counter()
+    failures = ApiClient(chat_url, max_backoff=0.1).post(
+        payloads(["busy query"]),
+        lambda key, response: responses.update({key: response}),
+    )
+
+    assert failures == {}
+    assert list(responses) == ["busy query"]
+    assert time.perf_counter() - start < 5
+
+
+def test_reports_connection_errors(server, chat_url):
+    server.shutdown()
+    server.server_close()
+
+    failures = ApiClient(chat_url, retries=1, backoff=0.01).post(
+        payloads(["query"]), lambda key, response: None
+    )
+
+    assert list(failures) == ["query"]
+
+
+def test_runs_the_handler_in_process_concurrently():
+    in_flight = max_in_flight = 0
+    calls = {}
+
+    async def handler(payload: dict) -> dict:
+        nonlocal in_flight, max_in_flight
+        query = payload["query"]
+        calls[query] = calls.get(query, 0) + 1
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        try:
+            await asyncio.sleep(0.02)
+            failing = query == "flaky query" and calls[query] == 1
+            if query == "broken query" or failing:
+                raise api_error(openai.RateLimitError, 429)
+            if query == "bad query":
+                raise api_error(openai.BadRequestError, 400)
+            if query == "slow query" and calls[query] == 1:
+                await asyncio.sleep(1)
+            return {"query": query, "response": f"The answer to {query}"}
+        finally:
+            in_flight -= 1
+
+    queries = [f"query {i}" for i in range(8)]
+    queries += ["flaky query", "slow query", "broken query", "bad query"]
+    responses = {}
+
+    client = InProcessClient(
+        handler, max_concurrency=4, retries=2, backoff=0.01, timeout=0.5
+    )
+    failures = client.post(
+        payloads(queries), lambda key, response: responses.update({key: response})
+    )
+
+    assert sorted(responses) == sorted(set(queries) - {"broken query", "bad query"})
+    assert responses["slow query"]["response"] == "The answer to slow query"
+    assert sorted(failures) == ["bad query", "broken query"]
+    assert "Error code: 429" in failures["broken query"]
+    assert calls["broken query"] == 3
+    # Errors which would fail again are not retried
+    assert calls["bad query"] == 1
+    assert max_in_flight == 4
+
+
+def test_raises_the_errors_of_a_broken_handler():
+    async def handler(payload: dict) -> dict:
+        return {"query": payload["query"], "response": payload["missing"]}
+
+    client = InProcessClient(handler, retries=2, backoff=0.01)
+
+    with pytest.raises(KeyError, match="missing"):
+        client.post(payloads(["query"]), lambda key, response: None)
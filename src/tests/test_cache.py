@@ -0,0 +1,159 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.embeddings import Embeddings
+
+from app.cache import SemanticCache
+from app.config import Components, get_components
+from app.main import app
+
+
+class FakeEmbeddings(Embeddings):
+    """Embeds the queries to the vectors given up front."""
+
+    def __init__(self, vectors: dict[str, list[float]]):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.vectors[text]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr("app.cache.time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+def cache(**kwargs) -> SemanticCache:
+    params = {
+        "embedding_model": FakeEmbeddings({}),
+        "similarity_threshold": 0.9,
+        "max_entries": 4,
+        "ttl_seconds": 60,
+        **kwargs,
+    }
+    return SemanticCache(**params)
+
+
+def value(query: str) -> dict:
+    return {"query": query, "response": f"The answer to {query}"}
+
+
+def test_exact_hit_on_the_normalised_query():
+    response_cache = cache()
+    response_cache.update("What is Diabetes?", SemanticCache.unit([1, 0]), value("a"))
+
+    assert response_cache.lookup_exact("  what is   DIABETES? ") == value("a")
+    assert response_cache.lookup_exact("What is insulin?") is None
+    assert response_cache.exact_hits == 1
+
+
+def test_semantic_hit_above_the_threshold_only():
+    response_cache = cache()
+    response_cache.update("What is diabetes?", SemanticCache.unit([1, 0]), value("a"))
+
+    # Cosine similarities of about 0.995 and 0.707
+    assert response_cache.lookup_similar(SemanticCache.unit([1, 0.1])) == value("a")
+    assert response_cache.lookup_similar(SemanticCache.unit([1, 1])) is None
+    assert response_cache.semantic_hits == 1
+    assert response_cache.misses == 1
+
+
+def test_evicts_the_least_recently_used_entry():
+    response_cache = cache(max_entries=2)
+    response_cache.update("a", SemanticCache.unit([1, 0]), value("a"))
+    response_cache.update("b", SemanticCache.unit([0, 1]), value("b"))
+    assert response_cache.lookup_exact("a") == value("a")
+
+    response_cache.update("c", SemanticCache.unit([1, 1]), value("c"))
+
+    assert response_cache.lookup_exact("b") is None
+    assert response_cache.lookup_exact("a") == value("a")
+    assert response_cache.lookup_exact("c") == value("c")
+    # The slot of the evicted entry is reused
+    assert response_cache.lookup_similar(SemanticCache.unit([0, 1])) is None
+
+
+def test_entries_expire_after_the_ttl(clock):
+    response_cache = cache(ttl_seconds=60)
+    response_cache.update("a", SemanticCache.unit([1, 0]), value("a"))
+
+    clock.now += 59
+    assert response_cache.lookup_exact("a") == value("a")
+
+    clock.now += 2
+    assert response_cache.lookup_exact("a") is None
+    assert response_cache.lookup_similar(SemanticCache.unit([1, 0])) is None
+    assert response_cache.stats()["entries"] == 0
+
+
+def test_expired_best_match_does_not_hide_a_valid_match(clock):
+    response_cache = cache(ttl_seconds=60)
+    response_cache.update("old", SemanticCache.unit([1, 0]), value("old"))
+    clock.now += 30
+    response_cache.update("new", SemanticCache.unit([1, 0.2]), value("new"))
+    clock.now += 31
+
+    assert response_cache.lookup_similar(SemanticCache.unit([1, 0])) == value("new")
+
+
+def test_invalidated_when_the_version_file_changes(tmp_path):
+    version_file = tmp_path / "version"
+    version_file.write_text("1")
+    response_cache = cache(version_file=str(version_file))
+    response_cache.update("a", SemanticCache.unit([1, 0]), value("a"))
+    assert response_cache.lookup_exact("a") == value("a")
+
+    mtime_ns = version_file.stat().st_mtime_ns + 1_000_000_000
+    os.utime(version_file, ns=(mtime_ns, mtime_ns))
+
+    assert response_cache.lookup_exact("a") is None
+    assert response_cache.stats()["entries"] == 0
+
+
+def test_cache_stats_endpoint_counts_the_hits_and_misses():
+    embedding_model = FakeEmbeddings(
+        {"What is diabetes?": [1, 0], "Define diabetes": [1, 0.1], "Hello": [0, 1]}
+    )
+    response_cache = cache(embedding_model=embedding_model)
+    components = Components()
+    components.response_cache = response_cache
+    app.dependency_overrides[get_components] = lambda: components
+
+    async def lookups():
+        cached, embedding = await response_cache.alookup("What is diabetes?")
+        assert cached is None
+        response_cache.update("What is diabetes?", embedding, value("a"))
+        assert (await response_cache.alookup("what is diabetes?"))[0] == value("a")
+        assert (await response_cache.alookup("Define diabetes"))[0] == value("a")
+        assert (await response_cache.alookup("Hello"))[0] is None
+
+    try:
+        asyncio.run(lookups())
+        stats = TestClient(app).get("/cache/stats").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert stats == {
+        "entries": 1,
+        "max_entries": 4,
+        "exact_hits": 1,
+        "semantic_hits": 1,
+        "misses": 2,
+        "hit_rate": 0.5,
+    }
@@ -0,0 +1,31 @@
+from healthcare_chatbot.checkpoint import JSONLinesCheckpoint
+
+
+def test_appends_and_loads_records(tmp_path):
+    checkpoint = JSONLinesCheckpoint(str(tmp_path / "checkpoints" / "responses.jsonl"))
+    assert checkpoint.load() == []
+
+    checkpoint.append({"queries": "What is diabetes?"})
+    checkpoint.append({"queries": "What is insulin?"})
+
+    assert JSONLinesCheckpoint(str(checkpoint.path)).load() == [
+        {"queries": "What is diabetes?"},
+        {"queries": "What is insulin?"},
+    ]
+
+
+def test_skips_a_line_cut_short_and_rewrites(tmp_path):
+    path = tmp_path / "responses.jsonl"
+    # A run which crashed in the middle of appending the second record
+    path.write_text('{"queries": "What is diabetes?"}\n{"queries": "What is')
+    checkpoint = JSONLinesCheckpoint(str(path))
+    assert checkpoint.load() == [{"queries": "What is diabetes?"}]
+
+    checkpoint.rewrite(checkpoint.load())
+    checkpoint.append({"queries": "What is insulin?"})
+
+    assert checkpoint.load() == [
+        {"queries": "What is diabetes?"},
+        {"queries": "What is insulin?"},
+    ]
+    assert [p.name for p in tmp_path.iterdir()] == ["responses.jsonl"]
@@ -0,0 +1,72 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.config import Components, lazy_component, require
+
+
+class CountingComponents(Components):
+    def __init__(self):
+        super().__init__()
+        self.builds = 0
+
+    @lazy_component
+    def slow(self) -> object:
+        self.builds += 1
+        # Give the other threads time to race for the component
+        time.sleep(0.05)
+        return object()
+
+
+def test_components_are_built_on_first_access():
+    components = Components()
+    components.parameters = {"serving": {"batch_parallelism": 8}}
+
+    assert "batch_parallelism" not in vars(components)
+    assert components.batch_parallelism == 8
+    assert vars(components)["batch_parallelism"] == 8
+    # Nothing else was built along the way
+    assert "conf_loader" not in vars(components)
+    assert "embedding_model" not in vars(components)
+
+
+def test_components_are_built_once_when_threads_race():
+    components = CountingComponents()
+    barrier = threading.Barrier(8)
+
+    def access(_):
+        barrier.wait()
+        return components.slow
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(access, range(8)))
+
+    assert components.builds == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_require_builds_the_named_components():
+    components = Components()
+    components.parameters = {"serving": {"batch_parallelism": 8}, "eval_timeout": 30}
+    dependency = require("batch_parallelism", "eval_timeout")
+
+    assert dependency(components) is components
+    assert vars(components)["batch_parallelism"] == 8
+    assert vars(components)["eval_timeout"] == 30
+
+
+def test_require_fails_on_an_unknown_component():
+    with pytest.raises(ValueError, match="Unknown components: stroe") as e:
+        require("qa", "stroe")
+
+    assert "store" in str(e.value)
+
+
+def test_warm_up_fails_on_an_unknown_component():
+    components = Components()
+    components.parameters = {"serving": {"warm_up": ["batch_parallelism", "cache"]}}
+
+    with pytest.raises(ValueError, match="Unknown components: cache"):
+        components.warm_up()
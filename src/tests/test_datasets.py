@@ -0,0 +1,77 @@
+import pandas as pd
+
+from healthcare_chatbot.datasets import (
+    JSONLinesDataset,
+    OptionalDataset,
+    PartitionedParquetDataset,
+)
+
+
+def test_saves_incrementally_and_loads_lazily(tmp_path):
+    filepath = tmp_path / "pdfs.jsonl"
+    filepath.write_text('{"stale": true}\n')
+    dataset = JSONLinesDataset(filepath=str(filepath))
+
+    # Saved one item at a time, like the items yielded by a generator node
+    dataset.save([])
+    dataset.save([{"page_content": "Insulin"}, {"page_content": "Metformin"}])
+    dataset.save(iter([{"page_content": "Foot care"}]))
+
+    records = dataset.load()
+    assert next(records) == {"page_content": "Insulin"}
+    assert list(records) == [
+        {"page_content": "Metformin"},
+        {"page_content": "Foot care"},
+    ]
+    assert filepath.read_text().count("\n") == 3
+
+
+def test_optional_dataset_loads_none_until_saved(tmp_path):
+    filepath = tmp_path / "evaluations.json"
+    dataset = OptionalDataset(
+        dataset={"type": "json.JSONDataset", "filepath": str(filepath)}
+    )
+
+    assert not dataset.exists()
+    assert dataset.load() is None
+
+    dataset.save([{"query": "What is diabetes?"}])
+    assert dataset.load() == [{"query": "What is diabetes?"}]
+
+
+def test_partitioned_parquet_dataset_appends_and_filters(tmp_path):
+    path = tmp_path / "evaluations"
+    dataset = PartitionedParquetDataset(
+        path=str(path), partition_cols=["criteria", "run_id"]
+    )
+    assert not dataset.exists()
+
+    for run_id in ["1", "2"]:
+        dataset.save(
+            pd.DataFrame(
+                {
+                    "key": [f"{run_id}a", f"{run_id}b"],
+                    "score": [1.0, 0.0],
+                    "criteria": ["coherence", "relevance"],
+                    "run_id": run_id,
+                }
+            )
+        )
+
+    # Every save adds its own files and leaves the previous ones alone
+    assert len(list(path.rglob("*.parquet"))) == 4
+    assert (path / "criteria=relevance" / "run_id=2").is_dir()
+    loaded_df = dataset.load()
+    assert sorted(loaded_df["key"]) == ["1a", "1b", "2a", "2b"]
+    # Run IDs which look like numbers are still strings
+    assert loaded_df["run_id"].to_list() == ["1", "2", "1", "2"]
+
+    filtered = PartitionedParquetDataset(
+        path=str(path),
+        partition_cols=["criteria", "run_id"],
+        load_args={
+            "columns": ["key", "score"],
+            "filters": [["criteria", "==", "relevance"], ["run_id", "==", "2"]],
+        },
+    )
+    assert filtered.load().to_dict("records") == [{"key": "2b", "score": 0.0}]
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+
+from langchain_core.embeddings import Embeddings
+
+from healthcare_chatbot.embeddings import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text to its length, recording the texts it was asked to embed."""
+
+    def __init__(self):
+        self.embedded: list[str] = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.embedded += texts
+        return [[float(len(text)), 1.0] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_memory_tier_keeps_the_most_recently_used_embeddings():
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, namespace="fake", max_entries=2)
+
+    embeddings.embed_documents(["a", "bb"])
+    embeddings.embed_query("a")
+    embeddings.embed_query("ccc")
+
+    assert len(embeddings._memory) == 2
+    # "bb" was the least recently used, so only it is embedded again
+    underlying.embedded.clear()
+    embeddings.embed_documents(["a", "bb", "ccc"])
+    assert underlying.embedded == ["bb"]
+
+
+def test_sqlite_tier_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache" / "embeddings.db")
+    texts = ["What is diabetes?", "What is insulin?"]
+    first = CachedEmbeddings(CountingEmbeddings(), namespace="fake", path=path)
+    expected = first.embed_documents(texts)
+
+    underlying = CountingEmbeddings()
+    second = CachedEmbeddings(underlying, namespace="fake", path=path)
+
+    assert second.embed_documents(texts) == expected
+    assert underlying.embedded == []
+    assert second.hits == 2
+    # Another namespace, e.g. another embedding model, does not share the embeddings
+    other = CachedEmbeddings(underlying, namespace="other", path=path)
+    other.embed_documents(texts)
+    assert underlying.embedded == texts
+
+
+def test_embeds_repeated_texts_once_per_call():
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, namespace="fake")
+
+    vectors = embeddings.embed_documents(["a", "bb", "a", "a"])
+    async_vectors = asyncio.run(embeddings.aembed_documents(["ccc", "ccc", "a"]))
+
+    assert vectors == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0], [1.0, 1.0]]
+    assert async_vectors == [[3.0, 1.0], [3.0, 1.0], [1.0, 1.0]]
+    assert underlying.embedded == ["a", "bb", "ccc"]
+
+
+def test_embed_query_hits_the_cache():
+    underlying = CountingEmbeddings()
+    embeddings = CachedEmbeddings(underlying, namespace="fake")
+    embeddings.embed_documents(["What is diabetes?"])
+
+    assert embeddings.embed_query("What is diabetes?") == [17.0, 1.0]
+    assert asyncio.run(embeddings.aembed_query("What is diabetes?")) == [17.0, 1.0]
+    assert underlying.embedded == ["What is diabetes?"]
+    assert embeddings.hits == 2
+    assert embeddings.misses == 1
+
+
+class ThreadRecordingEmbeddings(CachedEmbeddings):
+    """Records the threads the SQLite tier is read and written from."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.disk_threads: list[int] = []
+
+    def _lookup_disk(self, keys):
+        self.disk_threads.append(threading.get_ident())
+        return super()._lookup_disk(keys)
+
+    def _store_disk(self, vectors):
+        self.disk_threads.append(threading.get_ident())
+        super()._store_disk(vectors)
+
+
+def test_async_methods_use_the_sqlite_tier_off_the_event_loop(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    CachedEmbeddings(CountingEmbeddings(), namespace="fake", path=path).embed_query(
+        "What is diabetes?"
+    )
+    embeddings = ThreadRecordingEmbeddings(
+        CountingEmbeddings(), namespace="fake", path=path
+    )
+
+    async def embed() -> tuple[int, list[list[float]]]:
+        # Found on disk, then embedded and stored, then found in memory
+        vectors = await embeddings.aembed_documents(
+            ["What is diabetes?", "What is insulin?"]
+        )
+        await embeddings.aembed_query("What is insulin?")
+        return threading.get_ident(), vectors
+
+    loop_thread, vectors = asyncio.run(embed())
+
+    assert vectors == [[17.0, 1.0], [16.0, 1.0]]
+    assert len(embeddings.disk_threads) == 2
+    assert loop_thread not in embeddings.disk_threads
+    assert embeddings.hits == 2
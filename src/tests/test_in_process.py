@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from langchain_core.documents.base import Document
+
+from app import main
+from app.config import Components
+from healthcare_chatbot.in_process import chat_handler, evaluate_handler
+
+
+class FakeChain:
+    async def ainvoke(self, query: str) -> dict:
+        return {
+            "result": f"The answer\nto {query}",
+            "source_documents": [
+                Document(
+                    page_content=f"The context of {query}",
+                    metadata={"source": "https://www.healthhub.sg"},
+                )
+            ],
+        }
+
+
+class FakeEvaluator:
+    def __init__(self, score: int):
+        self.score = score
+
+    async def aevaluate_strings(self, **kwargs) -> dict:
+        return {"reasoning": "Because", "value": "Y", "score": self.score}
+
+
+@pytest.fixture
+def components(monkeypatch):
+    # Components assigned up front are never built from the configuration
+    components = Components()
+    components.qa = FakeChain()
+    components.response_cache = None
+    components.chat_limiter = asyncio.Semaphore(4)
+    components.criterion_evaluators = {"coherence": FakeEvaluator(1)}
+    components.labelled_criterion_evaluators = {"correctness": FakeEvaluator(0)}
+    components.eval_timeout = 10
+    monkeypatch.setattr(main, "get_components", lambda: components)
+    return components
+
+
+def test_answers_like_the_chat_endpoint(components):
+    chat = chat_handler()
+
+    response = asyncio.run(chat({"query": "What is diabetes?"}))
+
+    assert response["query"] == "What is diabetes?"
+    assert response["response"] == "The answer to What is diabetes?"
+    [document] = response["source_documents"]
+    assert document["page_content"] == "The context of What is diabetes?"
+    assert document["metadata"] == {"source": "https://www.healthhub.sg"}
+
+
+def test_evaluates_like_the_evaluate_endpoint(components):
+    evaluate = evaluate_handler()
+    payload = {
+        "query": "What is diabetes?",
+        "response": "A chronic condition.",
+        "page_content": "Diabetes is a chronic condition.",
+    }
+
+    evaluation = asyncio.run(evaluate(payload))
+
+    assert {key: evaluation[key] for key in payload} == payload
+    assert evaluation["coherence"]["score"] == 1
+    assert evaluation["correctness"]["score"] == 0
+    assert set(evaluation["timings"]) == {"coherence", "correctness"}
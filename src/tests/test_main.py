@@ -0,0 +1,423 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from langchain.chains import RetrievalQA
+from langchain.prompts import PromptTemplate
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    AsyncCallbackManagerForRetrieverRun,
+)
+from langchain_core.documents.base import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+from app.cache import SemanticCache
+from app.config import Components, get_components
+from app.main import app
+
+
+class FakeChain:
+    """A chain which is only ever awaited, keeping track of how many calls are
+    in-flight at once."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, query: str, config: dict | None = None) -> dict:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+
+        return {
+            "result": f"The answer\nto {query}",
+            "source_documents": [
+                Document(
+                    page_content=f"The context of {query}",
+                    metadata={"source": "https://www.healthhub.sg"},
+                )
+            ],
+        }
+
+    def invoke(self, *args, **kwargs):
+        raise AssertionError("The chain should be awaited, not invoked")
+
+
+class FakeCombineChain:
+    """Answers from the retrieved documents, slowly for the queries about "slow"
+    topics, keeping track of how many calls are in-flight at once."""
+
+    def __init__(self, latency: float = 0.01):
+        self.latency = latency
+        self.questions = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def ainvoke(self, inputs: dict) -> dict:
+        self.questions.append(inputs["question"])
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            slow = "slow" in inputs["question"]
+            await asyncio.sleep(self.latency * (10 if slow else 1))
+        finally:
+            self.in_flight -= 1
+
+        [document] = inputs["input_documents"]
+        return {"output_text": f"The answer\nfrom {document.page_content}"}
+
+
+class FakeBatchRetriever:
+    def __init__(self):
+        self.calls = []
+
+    async def abatch_get_relevant_documents_by_vector(
+        self, embeddings: list[list[float]]
+    ) -> list[list[Document]]:
+        self.calls.append(embeddings)
+        return [
+            [Document(page_content=f"Context {embedding}", metadata={})]
+            for embedding in embeddings
+        ]
+
+
+class FakeBatchEmbeddings(Embeddings):
+    """Embeds each query from its characters, or to the vector given up front."""
+
+    def __init__(self, vectors: dict[str, list[float]] | None = None):
+        self.vectors = vectors or {}
+        self.calls = []
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        if text in self.vectors:
+            return self.vectors[text]
+        return [float(len(text)), float(sum(map(ord, text))), 1.0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.calls.append(texts)
+        return self.embed_documents(texts)
+
+
+class FakeEvaluator:
+    def __init__(self, score: int, latency: float = 0.0):
+        self.score = score
+        self.latency = latency
+
+    async def aevaluate_strings(self, **kwargs) -> dict:
+        await asyncio.sleep(self.latency)
+        return {"reasoning": "Because", "value": "Y", "score": self.score}
+
+
+class FakeStreamingChatModel(BaseChatModel):
+    """Answers with a canned response, streaming it to the callbacks word by word."""
+
+    response: str = "Diabetes is a chronic condition. Please consult your doctor."
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming-chat-model"
+
+    def _generate(self, messages: list[BaseMessage], **kwargs) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs,
+    ) -> ChatResult:
+        for i, token in enumerate(self.response.split(" ")):
+            await run_manager.on_llm_new_token(token if i == 0 else " " + token)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=self.response))]
+        )
+
+
+class FakeRetriever(BaseRetriever):
+    error: str | None = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> list[Document]:
+        raise NotImplementedError
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> list[Document]:
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return [
+            Document(
+                page_content=f"The context of {query}",
+                metadata={"source": "https://www.healthhub.sg"},
+            )
+        ]
+
+
+def streaming_chain(error: str | None = None) -> RetrievalQA:
+    return RetrievalQA.from_chain_type(
+        llm=FakeStreamingChatModel(),
+        chain_type="stuff",
+        retriever=FakeRetriever(error=error),
+        chain_type_kwargs={
+            "prompt": PromptTemplate(
+                template="{context}\nQuestion: {question}",
+                input_variables=["context", "question"],
+            )
+        },
+        return_source_documents=True,
+    )
+
+
+def ndjson_lines(body: str) -> list[dict]:
+    return [json.loads(line) for line in body.splitlines()]
+
+
+def sse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for message in body.strip().split("\n\n"):
+        event, data = message.split("\n")
+        events.append(
+            (event.removeprefix("event: "), json.loads(data[len("data: ") :]))
+        )
+    return events
+
+
+@pytest.fixture
+def components():
+    # Components assigned up front are never built from the configuration
+    components = Components()
+    components.qa = FakeChain()
+    components.response_cache = None
+    components.chat_limiter = asyncio.Semaphore(2)
+    components.embedding_model = FakeBatchEmbeddings()
+    components.batch_parallelism = 4
+    app.dependency_overrides[get_components] = lambda: components
+    yield components
+    app.dependency_overrides.clear()
+
+
+async def _post(path: str, payloads: list[dict]) -> list[httpx.Response]:
+    # The requests share one event loop, like the requests of a worker
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(
+            *(client.post(path, json=payload) for payload in payloads)
+        )
+
+
+def test_chat_awaits_the_chain(components):
+    [response] = asyncio.run(_post("/chat", [{"query": "What is diabetes?"}]))
+
+    assert response.status_code == 201
+    chat_response = response.json()
+    assert chat_response["query"] == "What is diabetes?"
+    assert chat_response["response"] == "The answer to What is diabetes?"
+    [document] = chat_response["source_documents"]
+    assert document["page_content"] == "The context of What is diabetes?"
+    assert document["metadata"] == {"source": "https://www.healthhub.sg"}
+
+
+def test_chat_caps_the_requests_in_flight(components):
+    components.qa = FakeChain(latency=0.05)
+    payloads = [{"query": f"Question {i}?"} for i in range(10)]
+
+    responses = asyncio.run(_post("/chat", payloads))
+
+    assert [response.status_code for response in responses] == [201] * 10
+    assert components.qa.max_in_flight == 2
+
+
+def test_chat_stream_sends_the_tokens_then_the_sources(components):
+    components.qa = streaming_chain()
+
+    [response] = asyncio.run(_post("/chat/stream", [{"query": "What is diabetes?"}]))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = sse_events(response.text)
+    names = [name for name, _ in events]
+    assert names == ["token"] * (len(events) - 1) + ["sources"]
+    assert len(events) > 2
+
+    tokens = "".join(data["token"] for _, data in events[:-1])
+    _, sources = events[-1]
+    assert tokens == FakeStreamingChatModel().response
+    assert sources["query"] == "What is diabetes?"
+    assert sources["response"] == tokens
+    [document] = sources["source_documents"]
+    assert document["page_content"] == "The context of What is diabetes?"
+
+
+def test_chat_stream_sends_an_error_when_the_chain_fails(components):
+    components.qa = streaming_chain(error="The vector store is unavailable")
+
+    [response] = asyncio.run(_post("/chat/stream", [{"query": "What is diabetes?"}]))
+
+    assert response.status_code == 200
+    assert sse_events(response.text) == [
+        ("error", {"detail": "The vector store is unavailable"})
+    ]
+
+
+def test_evaluate_times_out_each_criteria_on_its_own(components):
+    components.criterion_evaluators = {
+        "coherence": FakeEvaluator(1),
+        "helpfulness": FakeEvaluator(1, latency=5),
+    }
+    components.labelled_criterion_evaluators = {"correctness": FakeEvaluator(0)}
+    components.eval_timeout = 0.1
+    payload = {
+        "query": "What is diabetes?",
+        "response": "A chronic condition.",
+        "page_content": "Diabetes is a chronic condition.",
+    }
+
+    [response] = asyncio.run(_post("/evaluate", [payload]))
+
+    assert response.status_code == 200
+    evaluation = response.json()
+    assert {key: evaluation[key] for key in payload} == payload
+    # The slow criteria is reported as an error without failing the others
+    assert evaluation["coherence"]["score"] == 1
+    assert evaluation["correctness"]["score"] == 0
+    assert evaluation["helpfulness"] == {
+        "error": "Evaluation timed out after 0.1 seconds."
+    }
+    timings = evaluation["timings"]
+    assert set(timings) == {"coherence", "helpfulness", "correctness"}
+    assert 0.1 <= timings["helpfulness"] < 1
+    assert timings["coherence"] < 0.1
+
+
+@pytest.fixture
+def batch_components(components):
+    components.qa = SimpleNamespace(
+        combine_documents_chain=FakeCombineChain(), retriever=FakeBatchRetriever()
+    )
+    components.chat_limiter = asyncio.Semaphore(100)
+    return components
+
+
+def test_chat_batch_streams_the_answers_as_they_complete(batch_components):
+    queries = ["A slow question?", "What is diabetes?", "What is insulin?"]
+
+    [response] = asyncio.run(_post("/chat/batch", [{"queries": queries}]))
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = ndjson_lines(response.text)
+    assert {line["index"]: line["query"] for line in lines} == dict(enumerate(queries))
+    # The slow question is answered last despite being asked first
+    assert lines[-1]["index"] == 0
+    for line in lines:
+        [document] = line["source_documents"]
+        assert line["response"] == f"The answer from {document['page_content']}"
+
+
+def test_chat_batch_embeds_and_retrieves_once(batch_components):
+    queries = [f"Question {i}?" for i in range(5)]
+
+    asyncio.run(_post("/chat/batch", [{"queries": queries}]))
+
+    assert batch_components.embedding_model.calls == [queries]
+    [embeddings] = batch_components.qa.retriever.calls
+    assert len(embeddings) == 5
+
+
+def test_chat_batch_answers_repeated_queries_once(batch_components):
+    queries = ["What is diabetes?", "what is  DIABETES?", "Hello", "What is diabetes?"]
+
+    [response] = asyncio.run(_post("/chat/batch", [{"queries": queries}]))
+
+    lines = ndjson_lines(response.text)
+    assert sorted((line["index"], line["query"]) for line in lines) == list(
+        enumerate(queries)
+    )
+    assert len({line["response"] for line in lines}) == 2
+    assert batch_components.embedding_model.calls == [["What is diabetes?", "Hello"]]
+    combine_documents_chain = batch_components.qa.combine_documents_chain
+    assert sorted(combine_documents_chain.questions) == ["Hello", "What is diabetes?"]
+
+
+def test_chat_batch_looks_up_the_exact_then_the_semantic_cache(batch_components):
+    embedding_model = FakeBatchEmbeddings(
+        {
+            "What is diabetes?": [1.0, 0.0, 0.0],
+            "Define diabetes": [1.0, 0.1, 0.0],
+            "Hello": [0.0, 1.0, 0.0],
+        }
+    )
+    response_cache = SemanticCache(
+        embedding_model=embedding_model,
+        similarity_threshold=0.9,
+        max_entries=8,
+        ttl_seconds=60,
+    )
+    cached = {
+        "query": "What is diabetes?",
+        "response": "Cached",
+        "source_documents": [],
+    }
+    response_cache.update(
+        "What is diabetes?", SemanticCache.unit([1.0, 0.0, 0.0]), cached
+    )
+    batch_components.embedding_model = embedding_model
+    batch_components.response_cache = response_cache
+    queries = ["Define diabetes", "Hello", "WHAT is diabetes?"]
+
+    [response] = asyncio.run(_post("/chat/batch", [{"queries": queries}]))
+
+    lines = ndjson_lines(response.text)
+    # The exact hit is sent before anything is embedded
+    assert [(line["index"], line["response"]) for line in lines[:2]] == [
+        (2, "Cached"),
+        (0, "Cached"),
+    ]
+    assert lines[2]["index"] == 1
+    assert embedding_model.calls == [["Define diabetes", "Hello"]]
+    assert batch_components.qa.combine_documents_chain.questions == ["Hello"]
+    assert response_cache.stats()["exact_hits"] == 1
+    assert response_cache.stats()["semantic_hits"] == 1
+    # The new answer is cached for the next batch
+    assert response_cache.lookup_exact("hello")["response"] == lines[2]["response"]
+
+
+def test_chat_batch_caps_the_parallelism(batch_components):
+    batch_components.batch_parallelism = 2
+    queries = [f"Question {i}?" for i in range(8)]
+
+    [response] = asyncio.run(_post("/chat/batch", [{"queries": queries}]))
+
+    assert len(ndjson_lines(response.text)) == 8
+    assert batch_components.qa.combine_documents_chain.max_in_flight == 2
+
+
+def test_evaluate_batch_streams_every_message_once(components):
+    components.criterion_evaluators = {"coherence": FakeEvaluator(1)}
+    components.labelled_criterion_evaluators = {}
+    components.eval_timeout = 10
+    messages = [
+        {"query": f"Question {i}?", "response": "Answer.", "page_content": "Context."}
+        for i in range(5)
+    ]
+
+    [response] = asyncio.run(_post("/evaluate/batch", [{"messages": messages}]))
+
+    lines = ndjson_lines(response.text)
+    assert sorted((line["index"], line["query"]) for line in lines) == [
+        (i, message["query"]) for i, message in enumerate(messages)
+    ]
+    assert all(line["coherence"]["score"] == 1 for line in lines)
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from langchain_community.vectorstores.utils import (
+    maximal_marginal_relevance as langchain_maximal_marginal_relevance,
+)
+
+from healthcare_chatbot.mmr import (
+    batch_maximal_marginal_relevance,
+    maximal_marginal_relevance,
+)
+
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("lambda_mult", [0.0, 0.25, 0.5, 1.0])
+@pytest.mark.parametrize("k", [1, 3, 20, 25])
+def test_matches_langchain(seed, lambda_mult, k):
+    rng = np.random.default_rng(seed)
+    query = rng.normal(size=64)
+    # Candidates of different lengths, since only their directions should matter
+    candidates = rng.normal(size=(20, 64)) * rng.uniform(0.1, 5, size=(20, 1))
+
+    assert maximal_marginal_relevance(
+        query, candidates, lambda_mult=lambda_mult, k=k
+    ) == langchain_maximal_marginal_relevance(
+        query, candidates, lambda_mult=lambda_mult, k=k
+    )
+
+
+def test_batch_matches_single_queries():
+    rng = np.random.default_rng(0)
+    queries = rng.normal(size=(8, 64))
+    candidates = rng.normal(size=(8, 20, 64))
+
+    assert batch_maximal_marginal_relevance(queries, candidates, k=3) == [
+        maximal_marginal_relevance(query, query_candidates, k=3)
+        for query, query_candidates in zip(queries, candidates)
+    ]
+
+
+def test_selects_distinct_candidates():
+    rng = np.random.default_rng(0)
+    # Every candidate appears twice, so a diverse selection skips the duplicates
+    candidates = np.repeat(rng.normal(size=(10, 64)), 2, axis=0)
+
+    selected = maximal_marginal_relevance(rng.normal(size=64), candidates, k=10)
+
+    assert len(set(selected)) == 10
+    assert len({i // 2 for i in selected}) == 10
+
+
+def test_no_candidates():
+    assert maximal_marginal_relevance(np.ones(64), np.empty((0, 64))) == []
+    selected = batch_maximal_marginal_relevance(np.ones((2, 64)), np.empty((2, 0, 64)))
+    assert selected == [[], []]
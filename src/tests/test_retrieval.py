@@ -0,0 +1,52 @@
+import chromadb
+import numpy as np
+import pytest
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import Chroma
+
+from app.retrieval import batch_max_marginal_relevance_search
+
+
+@pytest.fixture
+def client():
+    client = chromadb.EphemeralClient()
+    yield client
+    client.delete_collection("test-retrieval")
+
+
+@pytest.fixture
+def store(client):
+    return Chroma.from_texts(
+        [f"Diabetes care tip number {i}." for i in range(50)],
+        DeterministicFakeEmbedding(size=16),
+        metadatas=[{"source": f"article-{i}"} for i in range(50)],
+        collection_name="test-retrieval",
+        client=client,
+    )
+
+
+def test_batch_search_matches_the_search_of_each_query(client, store):
+    collection = client.get_collection("test-retrieval")
+    embeddings = np.random.default_rng(0).normal(size=(3, 16)).tolist()
+
+    batch_docs = batch_max_marginal_relevance_search(
+        collection, embeddings, k=3, fetch_k=10, lambda_mult=0.5
+    )
+
+    # LangChain returns the selected documents in the order of the candidates rather
+    # than in the order they were selected
+    assert [sorted(doc.page_content for doc in docs) for docs in batch_docs] == [
+        sorted(
+            doc.page_content
+            for doc in store.max_marginal_relevance_search_by_vector(
+                embedding, k=3, fetch_k=10, lambda_mult=0.5
+            )
+        )
+        for embedding in embeddings
+    ]
+
+
+def test_batch_search_without_queries(client, store):
+    collection = client.get_collection("test-retrieval")
+
+    assert batch_max_marginal_relevance_search(collection, []) == []
@@ -0,0 +1,89 @@
+import json
+
+import numpy as np
+import pytest
+
+from healthcare_chatbot.snapshots import (
+    POINTER_FILE,
+    RECORDS_FILE,
+    VECTORS_FILE,
+    SnapshotReader,
+    VectorSnapshot,
+    export_snapshot,
+)
+
+
+class FakeCollection:
+    def __init__(self, embeddings: list[list[float]]):
+        self.embeddings = embeddings
+
+    def get(self, include: list[str]) -> dict:
+        n = len(self.embeddings)
+        return {
+            "ids": [f"id {i}" for i in range(n)],
+            "embeddings": self.embeddings,
+            "documents": [f"Document {i}" for i in range(n)],
+            "metadatas": [{"source": f"source {i}"} for i in range(n)],
+        }
+
+
+def snapshot_dirs(snapshot_dir) -> list[str]:
+    return sorted(path.name for path in snapshot_dir.iterdir() if path.is_dir())
+
+
+def test_export_writes_unit_vectors_and_records(tmp_path):
+    path = export_snapshot(FakeCollection([[3.0, 4.0], [0.0, 2.0]]), str(tmp_path))
+
+    vectors = np.load(f"{path}/{VECTORS_FILE}")
+    assert vectors.dtype == np.float32
+    np.testing.assert_allclose(vectors, [[0.6, 0.8], [0.0, 1.0]])
+    with open(f"{path}/{RECORDS_FILE}") as f:
+        records = json.load(f)
+    assert records["ids"] == ["id 0", "id 1"]
+    assert records["documents"] == ["Document 0", "Document 1"]
+    assert records["metadatas"] == [{"source": "source 0"}, {"source": "source 1"}]
+
+
+def test_export_publishes_the_snapshot_by_replacing_the_pointer(tmp_path):
+    first = export_snapshot(FakeCollection([[1.0, 0.0]]), str(tmp_path))
+    second = export_snapshot(FakeCollection([[0.0, 1.0]]), str(tmp_path))
+
+    assert (tmp_path / POINTER_FILE).read_text() == second.rsplit("/", 1)[-1]
+    assert first != second
+    # Only the pointer is left behind, never its temporary file
+    files = sorted(path.name for path in tmp_path.iterdir() if path.is_file())
+    assert files == [POINTER_FILE]
+
+
+def test_export_keeps_the_latest_snapshots(tmp_path):
+    paths = [
+        export_snapshot(FakeCollection([[1.0, float(i)]]), str(tmp_path), keep=2)
+        for i in range(4)
+    ]
+
+    assert snapshot_dirs(tmp_path) == [path.rsplit("/", 1)[-1] for path in paths[-2:]]
+
+
+def test_reader_swaps_to_a_newly_exported_snapshot(tmp_path):
+    reader = SnapshotReader(str(tmp_path))
+    export_snapshot(FakeCollection([[1.0, 0.0]]), str(tmp_path))
+
+    snapshot = reader.current()
+    assert isinstance(snapshot, VectorSnapshot)
+    assert isinstance(snapshot.vectors, np.memmap)
+    # The snapshot is only loaded again once a new one is published
+    assert reader.current() is snapshot
+
+    export_snapshot(FakeCollection([[0.0, 1.0], [1.0, 0.0]]), str(tmp_path))
+
+    new_snapshot = reader.current()
+    assert new_snapshot.name != snapshot.name
+    assert new_snapshot.ids == ["id 0", "id 1"]
+    np.testing.assert_allclose(new_snapshot.vectors, [[0.0, 1.0], [1.0, 0.0]])
+
+
+def test_reader_fails_clearly_before_the_first_export(tmp_path):
+    reader = SnapshotReader(str(tmp_path / "snapshots"))
+
+    with pytest.raises(FileNotFoundError, match="No snapshot has been exported"):
+        reader.current()
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.vector_index import (
+    INDEXES,
+    ExactIndex,
+    HnswIndex,
+    SnapshotIndex,
+    VectorIndex,
+    normalize,
+)
+from healthcare_chatbot.snapshots import SnapshotReader, export_snapshot
+
+
+class FakeCollection:
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+
+    def get(self, include: list[str]) -> dict:
+        n = len(self.embeddings)
+        return {
+            "ids": [f"id {i}" for i in range(n)],
+            "embeddings": self.embeddings.tolist(),
+            "documents": [f"Document {i}" for i in range(n)],
+            "metadatas": [None] * n,
+        }
+
+
+class BlockingIndex(ExactIndex):
+    """An exact index which waits for the test to let its build finish."""
+
+    release = threading.Event()
+
+    def __init__(self, *args, **kwargs):
+        self.release.wait(timeout=10)
+        super().__init__(*args, **kwargs)
+
+
+def clustered(rng: np.random.Generator, n: int, centres: np.ndarray) -> np.ndarray:
+    labels = rng.integers(len(centres), size=n)
+    return normalize(centres[labels] + 0.5 * rng.normal(size=(n, centres.shape[1])))
+
+
+def index_of(vectors: np.ndarray, engine: type[VectorIndex]):
+    return engine(
+        vectors, [f"Document {i}" for i in range(len(vectors))], [None] * len(vectors)
+    )
+
+
+def test_exact_index_returns_the_most_similar_first():
+    vectors = normalize([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0], [-1.0, 0.0]])
+    queries = normalize([[1.0, 0.2], [-1.0, -0.2]])
+
+    indices, similarities = index_of(vectors, ExactIndex).search(queries, 3)
+
+    assert indices.tolist() == [[0, 2, 1], [3, 1, 2]]
+    np.testing.assert_allclose(
+        similarities, np.take_along_axis(queries @ vectors.T, indices, axis=1)
+    )
+
+
+def test_hnsw_index_recalls_the_exact_neighbours():
+    rng = np.random.default_rng(0)
+    centres = rng.normal(size=(20, 32))
+    vectors = clustered(rng, 2000, centres)
+    queries = clustered(rng, 50, centres)
+
+    truth, _ = index_of(vectors, ExactIndex).search(queries, 10)
+    found, similarities = index_of(vectors, HnswIndex).search(queries, 10)
+
+    recall = np.mean([len(set(f) & set(t)) / 10 for f, t in zip(found, truth)])
+    assert recall >= 0.95
+    assert (np.diff(similarities, axis=1) <= 1e-6).all()
+    np.testing.assert_allclose(
+        similarities, np.take_along_axis(queries @ vectors.T, found, axis=1), atol=1e-5
+    )
+
+
+def test_snapshot_index_swaps_to_a_new_snapshot_in_the_background(
+    tmp_path, monkeypatch
+):
+    monkeypatch.setitem(INDEXES, "blocking", BlockingIndex)
+    BlockingIndex.release.set()
+    export_snapshot(FakeCollection(np.eye(2)), str(tmp_path))
+    index = SnapshotIndex(SnapshotReader(str(tmp_path)), "blocking")
+    first = index()
+    assert len(first) == 2
+
+    BlockingIndex.release.clear()
+    export_snapshot(FakeCollection(np.eye(3)), str(tmp_path))
+
+    # The searches keep using the previous index while the new one is built
+    assert index() is first
+    BlockingIndex.release.set()
+    deadline = time.monotonic() + 10
+    while index() is first and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert len(index()) == 3
+    np.testing.assert_allclose(index().vectors, np.eye(3))
+
+
+def test_snapshot_index_fails_without_a_snapshot(tmp_path):
+    with pytest.raises(FileNotFoundError, match="No snapshot has been exported"):
+        SnapshotIndex(SnapshotReader(str(tmp_path)))
@@ -0,0 +1,33 @@
+import pickle
+
+from healthcare_chatbot.vector_store import VectorStoreDataset
+
+
+def vector_store_dataset(tmp_path) -> VectorStoreDataset:
+    return VectorStoreDataset(
+        db_params={"path": str(tmp_path / "chroma"), "collection_name": "test"},
+        embedding_model_name="text-embedding-3-small",
+        embedding_cache_params={"max_entries": 10, "path": str(tmp_path / "cache.db")},
+        embedding_batching_params={},
+        credentials={"OPENAI_API_KEY": "sk-test"},
+    )
+
+
+def test_loads_one_shared_vector_store(tmp_path):
+    dataset = vector_store_dataset(tmp_path)
+    vector_store = dataset.load()
+
+    assert dataset.load() is vector_store
+    assert vector_store.collection is vector_store.collection
+    assert vector_store.collection.name == "test"
+    assert vector_store.embedding_model is vector_store.embedding_model
+
+
+def test_pickles_without_the_vector_store(tmp_path):
+    dataset = vector_store_dataset(tmp_path)
+    vector_store = dataset.load()
+
+    # As in the processes of a ParallelRunner
+    unpickled = pickle.loads(pickle.dumps(dataset))
+    assert unpickled.load() is not vector_store
+    assert unpickled.load().db_params == vector_store.db_params